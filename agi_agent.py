@@ -1,34 +1,39 @@
 import docker
-import requests
-import json
-import time
+from llm_client import get_client
+from sandbox_session import close_sandbox, open_sandbox
 
 # --- CONFIGURATION ---
-OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL_NAME = "qwen2.5-coder:7b"
 DOCKER_IMAGE = "python:3.10-slim"  # Lightweight Linux for testing
 
 class AgentZero:
-    def __init__(self):
+    def __init__(self, d_client=None, pool=None, llm=None, limits=None):
         print(f"[-] Initializing Docker Client...")
-        self.d_client = docker.from_env()
+        self.d_client = d_client or docker.from_env()
+        self.pool = pool  # Optional SandboxPool of warm containers
+        self.limits = limits  # containers.run() cgroup kwargs; None = sandbox_limits defaults
+        self.llm = llm or get_client()  # Shared keep-alive Ollama session
         print(f"[-] connecting to Local Brain ({MODEL_NAME})...")
         
     def think(self, prompt):
         """Send a prompt to the local Ollama model (System 1)"""
-        payload = {
-            "model": MODEL_NAME,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0.2} # Low temp for logic
-        }
         try:
-            response = requests.post(OLLAMA_URL, json=payload)
-            return response.json()['response']
+            return self.llm.generate(
+                prompt,
+                model=MODEL_NAME,
+                options={"temperature": 0.2} # Low temp for logic
+            )
         except Exception as e:
             print(f"Error talking to Ollama: {e}")
             return ""
 
+    def start_sandbox(self):
+        """Borrow a warm container from the pool, or cold-start one."""
+        return open_sandbox(self.d_client, self.pool, DOCKER_IMAGE, self.limits)
+
+    def release_sandbox(self, container):
+        close_sandbox(container, self.pool)
+
     def run_simulation(self):
         """
         Creates a Docker container, injects a BUGGY script, and asks AI to fix it.
@@ -53,11 +58,7 @@ if __name__ == "__main__":
 
         # Start the container
         print("[-] Spinning up Sandbox Container...")
-        container = self.d_client.containers.run(
-            DOCKER_IMAGE, 
-            command="tail -f /dev/null", # Keep it alive
-            detach=True
-        )
+        container = self.start_sandbox()
 
         try:
             # Inject buggy code
@@ -124,8 +125,9 @@ if __name__ == "__main__":
                 
         finally:
             print("[-] Cleaning up Docker Container...")
-            container.kill()
-            container.remove()
+            self.release_sandbox(container)
+
+        return {"solved": solved, "steps": attempts}
 
 if __name__ == "__main__":
     agent = AgentZero()
@@ -1,45 +1,161 @@
 import docker
-import requests
 import json
-import base64
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from code_check import CodeRejected, CodeValidator
+from llm_client import ROLE_MODELS, get_client
+from patching import PatchError, apply_patch
+from sandbox_fs import Snapshot, write_files
+from sandbox_limits import TIMEOUT_EXIT, TestTimeouts, with_timeout
+from sandbox_session import close_sandbox, open_sandbox
+from tracing import print_flame_summary, tracer
 
 # --- CONFIGURATION ---
-OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL_NAME = "qwen2.5-coder:7b"
 DOCKER_IMAGE = "python:3.10-slim" 
+CANDIDATE_TEMPERATURES = [0.0, 0.3, 0.6, 0.9]  # Spread used by best-of-N mode
+TEST_CMD = "python3 /broken.py"
+MAX_REPROMPTS = 2  # Answers rejected on the host are sent back this often before the sandbox gets the last one
+REJECTED = """
+                YOUR PREVIOUS ANSWER WAS REJECTED BEFORE IT WAS RUN: {error}
+                Return the whole fixed file again, as plain python code.
+                """
 
 class AgentZero:
-    def __init__(self):
+    def __init__(self, d_client=None, pool=None, llm=None, rollback=True, best_of=1, patch=False, limits=None,
+                 timeouts=None):
         print(f"[-] Initializing Docker Client...")
-        self.d_client = docker.from_env()
+        self.d_client = d_client or docker.from_env()
+        self.pool = pool  # Optional SandboxPool of warm containers
+        self.limits = limits  # containers.run() cgroup kwargs; None = sandbox_limits defaults
+        self.llm = llm or get_client()  # Shared keep-alive Ollama session
+        self.rollback = rollback  # Restore the original code before each new attempt
+        self.best_of = best_of  # >1: race N candidate fixes, each verified in its own sandbox
+        self.patch = patch  # Ask for SEARCH/REPLACE edits instead of the whole file
+        self.patch_stats = {"applied": 0, "fallbacks": 0}
+        self._stats_lock = threading.Lock()  # Best-of-N candidates propose fixes from worker threads
+        self.timeouts = timeouts or TestTimeouts()  # Test-run timeouts learned from past runs, kept across episodes
+        self.validator = CodeValidator()  # ast/signature check of every fix before it reaches the sandbox
         print(f"[-] Connecting to Local Brain ({MODEL_NAME})...")
         
-    def think(self, prompt):
+    def think(self, prompt, options=None):
         """Send a prompt to the local Ollama model"""
-        payload = {
-            "model": MODEL_NAME,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0.0} # Absolute logic, no creativity
-        }
+        span = tracer.start("think", prompt_chars=len(prompt))
         try:
             print("   [Brain]: Thinking...")
-            response = requests.post(OLLAMA_URL, json=payload)
-            return response.json()['response']
+            resp = self.llm.generate(
+                prompt,
+                model=ROLE_MODELS["patch"],  # Every AgentZero call writes a fix
+                options=options or {"temperature": 0.0} # Absolute logic, no creativity
+            )
+            span.end(response_chars=len(resp))
+            return resp
         except Exception as e:
+            span.end(error=str(e))
             print(f"Error talking to Ollama: {e}")
             return ""
 
     def write_to_container(self, container, filepath, content):
         """
-        BULLETPROOF WRITE: Encodes content to Base64 before sending to Docker.
-        This prevents shell quote escaping issues (The 'Telephone Game' bug).
+        BULLETPROOF WRITE: Ships the file inside a tar archive (put_archive).
+        No shell quoting (The 'Telephone Game' bug), no ARG_MAX limit, and no
+        python3 process spawned inside the container.
+        """
+        write_files(container, {filepath: content})
+
+    def run_tests(self, container):
+        """
+        TEST_CMD under the timeout learned from earlier runs, so a fix that
+        loops forever cannot stall the episode (or its best-of-N siblings).
+        """
+        timeout = self.timeouts.timeout(TEST_CMD)
+        start = time.perf_counter()
+        res = container.exec_run(with_timeout(TEST_CMD, timeout))
+        self.timeouts.record(TEST_CMD, time.perf_counter() - start, res.exit_code)
+        if res.exit_code == TIMEOUT_EXIT:
+            print(f"   [Timeout]: Tests killed after {timeout:g}s")
+        return res
+
+    def start_sandbox(self):
+        """Borrow a warm container from the pool, or cold-start one."""
+        return open_sandbox(self.d_client, self.pool, DOCKER_IMAGE, self.limits)
+
+    def release_sandbox(self, container):
+        close_sandbox(container, self.pool)
+
+    def propose_fix(self, prompt, patch_prompt, code, options=None):
+        """
+        The full corrected file. In patch mode the model first sends only the
+        edit; if that does not apply, fall back to asking for the whole file.
         """
-        b64_content = base64.b64encode(content.encode('utf-8')).decode('utf-8')
-        # We use python inside the container to decode and write the file
-        cmd = f"python3 -c \"import base64; open('{filepath}', 'w').write(base64.b64decode('{b64_content}').decode('utf-8'))\""
-        container.exec_run(cmd)
+        if self.patch:
+            try:
+                fixed = apply_patch(code, self.think(patch_prompt, options), "/broken.py")
+                fixed = self.validator.clean(fixed, "/broken.py", code)
+                self._count("applied")
+                return fixed
+            except (PatchError, CodeRejected) as e:
+                self._count("fallbacks")
+                print(f"   [Patch]: Not applied ({e}); asking for the full file")
+        solution = self.think(prompt, options)
+        for _ in range(MAX_REPROMPTS):
+            try:
+                # Fences and prose removed; a fix that cannot pass is bounced back with the reason
+                return self.validator.clean(solution, "/broken.py", code)
+            except CodeRejected as e:
+                print(f"   [Pre-check]: Rejected on the host ({e}); asking again")
+                solution = self.think(prompt + REJECTED.format(error=e), options)
+        return self.validator.clean(solution, "/broken.py", strict=False)  # Out of re-prompts: the tests decide
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.patch_stats[key] += 1
+
+    def race_candidates(self, prompt, patch_prompt, code, checkpoint):
+        """
+        Best-of-N: ask for N fixes at once (varied temperature + seed), verify
+        each in its own sandbox forked from the checkpoint, and return the first
+        one that passes. Candidates still in flight are cancelled or ignored.
+        Returns (winner_or_None, first_candidate_generated).
+        """
+        found = threading.Event()
+        generated = []
+        parent = tracer.current()  # Worker threads have their own span stacks
+
+        def attempt(i):
+            with tracer.span("candidate", parent=parent, index=i) as span:
+                options = {"temperature": CANDIDATE_TEMPERATURES[i % len(CANDIDATE_TEMPERATURES)], "seed": i}
+                fixed = self.propose_fix(prompt, patch_prompt, code, options)
+                generated.append(fixed)
+                if not fixed or found.is_set():
+                    return None
+                sandbox = self.start_sandbox()
+                try:
+                    checkpoint.restore(sandbox)
+                    self.write_to_container(sandbox, "/broken.py", fixed)
+                    with tracer.span("verify"):
+                        passed = self.run_tests(sandbox).exit_code == 0
+                finally:
+                    self.release_sandbox(sandbox)
+                span.set(passed=passed)
+                if passed:
+                    found.set()
+                    return fixed
+                return None
+
+        executor = ThreadPoolExecutor(max_workers=self.best_of)
+        futures = [executor.submit(attempt, i) for i in range(self.best_of)]
+        winner = None
+        try:
+            for future in as_completed(futures):
+                winner = future.result()
+                if winner:
+                    break
+        finally:
+            # Do not wait for the losers' model calls to come back
+            executor.shutdown(wait=False, cancel_futures=True)
+        return winner, (generated[0] if generated else "")
 
     def run_simulation(self):
         print("\n🚀 STARTING SIMULATION v2.0 (Base64 Transport)")
@@ -61,12 +177,17 @@ if __name__ == "__main__":
         """
 
         print("[-] Spinning up Sandbox Container...")
-        container = self.d_client.containers.run(DOCKER_IMAGE, command="tail -f /dev/null", detach=True)
+        episode = tracer.start("episode", agent="AgentZero", best_of=self.best_of)
+        container = self.start_sandbox()
 
         try:
             # Inject buggy code using the new safe method
             print("[-] Injecting Buggy Code...")
-            self.write_to_container(container, "/broken.py", buggy_code)
+            with tracer.span("container.seed", files=1):
+                self.write_to_container(container, "/broken.py", buggy_code)
+            checkpoint = Snapshot.from_files({"/broken.py": buggy_code})
+            original_code = buggy_code
+            failed_patch = None
             
             solved = False
             attempts = 0
@@ -76,7 +197,9 @@ if __name__ == "__main__":
                 print(f"\n--- Attempt {attempts}/3 ---")
                 
                 # A. Run Code
-                run_result = container.exec_run("python3 /broken.py")
+                with tracer.span("tool.run_test") as span:
+                    run_result = self.run_tests(container)
+                    span.set(exit_code=run_result.exit_code, output_bytes=len(run_result.output))
                 output = run_result.output.decode('utf-8')
                 exit_code = run_result.exit_code
                 
@@ -87,8 +210,24 @@ if __name__ == "__main__":
                     print("\n✅ SUCCESS! The agent fixed the code.")
                     solved = True
                     break
+
+                if self.rollback and attempts > 1:
+                    # The last patch did not work: branch again from the clean checkpoint
+                    # instead of patching on top of a broken patch.
+                    start = time.perf_counter()
+                    with tracer.span("rollback"):
+                        checkpoint.restore(container)
+                    print(f"   [Rollback]: Restored checkpoint in {(time.perf_counter() - start) * 1000:.1f} ms")
+                    failed_patch = buggy_code
+                    buggy_code = original_code
                 
                 # B. Think
+                previous = ""
+                if failed_patch:
+                    previous = f"""
+                THE ERROR OUTPUT ABOVE CAME FROM THIS PREVIOUS FIX ATTEMPT. Do not repeat it:
+                {failed_patch}
+                """
                 prompt = f"""
                 You are an expert python debugger.
                 The file '/broken.py' is failing.
@@ -98,6 +237,7 @@ if __name__ == "__main__":
 
                 ERROR OUTPUT:
                 {output}
+                {previous}
 
                 TASK: Return the FIXED code.
                 RULES:
@@ -106,27 +246,70 @@ if __name__ == "__main__":
                 3. Do not add markdown backticks (```).
                 4. Keep the print statements exactly as they are.
                 """
+                patch_prompt = f"""
+                You are an expert python debugger.
+                The file '/broken.py' is failing.
+
+                CODE:
+                {buggy_code}
+
+                ERROR OUTPUT:
+                {output}
+                {previous}
+
+                TASK: Fix the logic error with the smallest possible edit.
+                Reply ONLY with one or more blocks in exactly this format:
+                <<<<<<< SEARCH
+                (lines copied exactly from CODE)
+                =======
+                (the corrected lines)
+                >>>>>>> REPLACE
+                """
                 
-                solution_code = self.think(prompt)
-                
-                # Cleanup: remove markdown if the model ignores instruction
-                solution_code = solution_code.replace("```python", "").replace("```", "").strip()
+                mark = self.llm.metrics.mark()
+                start = time.perf_counter()
+                if self.best_of > 1:
+                    winner, fallback = self.race_candidates(prompt, patch_prompt, buggy_code, checkpoint)
+                    print(f"   [Best-of-{self.best_of}]: {'winner found' if winner else 'no candidate passed'}")
+                    solution_code = winner or fallback
+                else:
+                    solution_code = self.propose_fix(prompt, patch_prompt, buggy_code)
+                cost = self.llm.metrics.summary(since=mark)
+                print(f"   [Cost]: {time.perf_counter() - start:.2f}s, "
+                      f"{cost['completion_tokens']} output tokens over {cost['calls']} model calls")
                 
                 # C. Act (Safely)
-                print(f"   [Action]: Applying Patch via Base64...")
-                self.write_to_container(container, "/broken.py", solution_code)
+                print(f"   [Action]: Applying Patch via tar upload...")
+                with tracer.span("tool.write_file", path="/broken.py", input_bytes=len(solution_code)):
+                    self.write_to_container(container, "/broken.py", solution_code)
                 
                 # Update local memory
                 buggy_code = solution_code
 
+                if self.best_of > 1 and winner:
+                    # Already passed the tests in its own sandbox: no need for another run
+                    print("\n✅ SUCCESS! The agent fixed the code.")
+                    solved = True
+                    break
+
             if not solved:
                 print("\n❌ FAILED after 3 attempts.")
+            if self.validator.stats["checked"]:
+                print(f"   [Pre-check]: {self.validator.summary()}")
                 
         finally:
             print("[-] Cleaning up...")
-            container.kill()
-            container.remove()
+            self.release_sandbox(container)
+            episode.end(solved=solved, steps=attempts)
+            if tracer.enabled:
+                print_flame_summary(episode)
+
+        return {"solved": solved, "steps": attempts}
 
 if __name__ == "__main__":
-    agent = AgentZero()
+    import sys
+    # python3 agi_agent_v2.py --best-of 4
+    # python3 agi_agent_v2.py --patch
+    best_of = int(sys.argv[sys.argv.index("--best-of") + 1]) if "--best-of" in sys.argv else 1
+    agent = AgentZero(best_of=best_of, patch="--patch" in sys.argv)
     agent.run_simulation()
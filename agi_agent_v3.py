@@ -1,36 +1,69 @@
 import docker
-import requests
-import base64
 import time
-import re
+from context_builder import ContextBuilder
+from llm_client import ROLE_MODELS, get_client
+from prefetch import Prefetcher
+from prompt_layout import PromptLayout, report_prefill
+from repo_index import RepoIndex
+from sandbox_fs import write_files
+from sandbox_limits import ResourceMeter, TestTimeouts
+from sandbox_session import close_sandbox, open_sandbox, report_episode
+from stream_parsers import ExplorerActionParser
+from verify_cache import Workspace
+from tools import TOOLS, ToolContext
+from tracing import print_flame_summary, tracer
 
 # --- CONFIGURATION ---
-OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL_NAME = "qwen2.5-coder:7b"
 DOCKER_IMAGE = "python:3.10-slim" 
+NUM_CTX = 4096
+HISTORY_TOKENS = NUM_CTX // 2  # The other half is instructions + the model's answer
+TEST_CMD = "python3 /app/main.py"
+MAX_STEPS = 9
 
-class AgentExplorer:
-    def __init__(self):
-        self.d_client = docker.from_env()
-        print(f"[-] Connected to Brain ({MODEL_NAME})")
+# The default challenge: a multi-file project (entry point + broken dependency)
+DEFAULT_TASK = {
+    "name": "calculate_price",
+    "test_cmd": TEST_CMD,
+    "files": {
+        "/app/main.py": """
+from utils import calculate_price
 
-    def think(self, context, task):
-        """
-        System 2 Thinking: The agent decides WHICH tool to use next.
-        """
-        prompt = f"""
+def test_cart():
+    # We expect 2 items at $10 each = $20
+    total = calculate_price(10, 2)
+    if total != 20:
+        print(f"FAIL: Expected 20, got {total}")
+        exit(1)
+    else:
+        print("SUCCESS: Cart total is correct.")
+
+if __name__ == "__main__":
+    test_cart()
+""",
+        # The Bug is here: It subtracts instead of adds!
+        "/app/utils.py": """
+def calculate_price(price, quantity):
+    # TODO: Implement pricing logic
+    return price - quantity  # BUG: Should be multiply!
+""",
+    },
+}
+
+# Tools and examples first, then the task, then the context that changes every
+# step: the server reuses the KV cache of everything before the first change.
+PROMPT = PromptLayout("""
         You are an autonomous developer debugging a repository.
         
-        TASK: {task}
-        
-        CURRENT CONTEXT:
-        {context}
-        
         AVAILABLE TOOLS:
         1. LIST_FILES <dir_path>  (Example: LIST_FILES src/)
         2. READ_FILE <file_path>  (Example: READ_FILE src/utils.py)
         3. WRITE_FILE <file_path> (Overwrites file with code)
         4. RUN_TEST               (Runs the test suite)
+        5. FIND_DEFINITION <name> (Shows only the source of a function or class)
+        6. FIND_CALLERS <name>    (Lists the lines that call a function)
+        7. PATCH_FILE <file_path> (Followed by <<<<<<< SEARCH / ======= / >>>>>>> REPLACE blocks;
+                                   prefer it for small fixes, use WRITE_FILE if it is rejected)
 
         INSTRUCTIONS:
         - You cannot see the whole codebase at once. You must explore.
@@ -48,144 +81,143 @@ class AgentExplorer:
         def add(a, b):
             return a + b
         
+        """, suffix="""
+
         What is your next move?
+        """)
+
+class AgentExplorer:
+    def __init__(self, d_client=None, pool=None, llm=None, stream=False, use_executor=False, test_cache=None,
+                 prefetch=False, models=None, cap_output=True, kill_on_overflow=False, limits=None, timeouts=None):
+        self.d_client = d_client or docker.from_env()
+        self.pool = pool  # Optional SandboxPool of warm containers
+        self.llm = llm or get_client()  # Shared keep-alive Ollama session
+        self.stream = stream  # Stream tokens and stop once the action is known
+        self.use_executor = use_executor  # Serve tool actions from a resident in-sandbox daemon
+        self.test_cache = test_cache  # TestCache shared across episodes; None = one per episode
+        self.prefetch = prefetch  # Run the likely next reads while the model is thinking
+        self.models = dict(ROLE_MODELS, **(models or {}))  # role -> model name (navigate / patch)
+        self.cap_output = cap_output  # Stream exec output into head/tail buffers instead of keeping all of it
+        self.kill_on_overflow = kill_on_overflow  # Kill commands that print more than sandbox_output.KILL_AFTER
+        self.limits = limits  # containers.run() cgroup kwargs; None = sandbox_limits defaults
+        self.timeouts = timeouts or TestTimeouts()  # Test-run timeouts learned per task, kept across episodes
+        print(f"[-] Connected to Brain ({MODEL_NAME})")
+
+    def think(self, context, task, role="navigate"):
+        """
+        System 2 Thinking: The agent decides WHICH tool to use next.
         """
+        prompt = PROMPT.render(f"TASK: {task}", f"CURRENT CONTEXT:\n{context}")
         
-        payload = {
-            "model": MODEL_NAME,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0.1, "num_ctx": 4096}
-        }
+        span = tracer.start("think", prompt_chars=len(prompt), stream=self.stream, model=self.models[role])
+        mark = self.llm.metrics.mark()
         try:
-            resp = requests.post(OLLAMA_URL, json=payload).json()['response']
+            options = {"temperature": 0.1, "num_ctx": NUM_CTX}
+            if self.stream:
+                resp = self.llm.stream(prompt, parser=ExplorerActionParser(), model=self.models[role], options=options)
+            else:
+                resp = self.llm.generate(prompt, model=self.models[role], options=options)
+            span.end(response_chars=len(resp), prompt_eval_ms=report_prefill(self.llm, mark))
             return resp.strip()
         except Exception as e:
+            span.end(error=str(e))
             return f"ERROR: {e}"
 
     def write_to_container(self, container, filepath, content):
-        b64 = base64.b64encode(content.encode('utf-8')).decode('utf-8')
-        cmd = f"python3 -c \"import base64, os; os.makedirs(os.path.dirname('{filepath}'), exist_ok=True); open('{filepath}', 'w').write(base64.b64decode('{b64}').decode('utf-8'))\""
-        container.exec_run(cmd)
+        write_files(container, {filepath: content})
 
-    def run_simulation(self):
-        print("\n🚀 STARTING SIMULATION v3.0 (The Explorer)")
-        
-        # 1. Setup a Multi-File Project (The "Mini-Repo")
-        # Structure:
-        #   /app/main.py   (The entry point)
-        #   /app/utils.py  (The broken dependency)
-        
-        main_code = """
-from utils import calculate_price
+    def start_sandbox(self):
+        """Borrow a warm container from the pool, or cold-start one, wrapped for this agent's options."""
+        return open_sandbox(self.d_client, self.pool, DOCKER_IMAGE, self.limits, use_executor=self.use_executor,
+                            cap_output=self.cap_output, kill_on_overflow=self.kill_on_overflow)
 
-def test_cart():
-    # We expect 2 items at $10 each = $20
-    total = calculate_price(10, 2)
-    if total != 20:
-        print(f"FAIL: Expected 20, got {total}")
-        exit(1)
-    else:
-        print("SUCCESS: Cart total is correct.")
+    def release_sandbox(self, container):
+        close_sandbox(container, self.pool)
 
-if __name__ == "__main__":
-    test_cart()
-"""
-        # The Bug is here: It subtracts instead of adds!
-        utils_code = """
-def calculate_price(price, quantity):
-    # TODO: Implement pricing logic
-    return price - quantity  # BUG: Should be multiply!
-"""
+    def run_simulation(self, task=None, max_steps=MAX_STEPS):
+        """
+        Runs one exploration episode. task is a dict with "files" ({path: content})
+        and "test_cmd"; defaults to DEFAULT_TASK. Returns {"solved", "steps"}.
+        """
+        task = task or DEFAULT_TASK
+        test_cmd = task.get("test_cmd", TEST_CMD)
+        print("\n🚀 STARTING SIMULATION v3.0 (The Explorer)")
 
         print("[-] Creating Virtual Environment...")
-        container = self.d_client.containers.run(DOCKER_IMAGE, command="tail -f /dev/null", detach=True)
+        episode = tracer.start("episode", agent="AgentExplorer", task=task.get("name", ""))
+        container = self.start_sandbox()
+        meter = ResourceMeter(container)  # What this episode costs the host, for packing episodes densely
+        prefetcher = None
+        step = 0
+        solved = False
         
         try:
-            # Create the files inside Docker
-            self.write_to_container(container, "/app/main.py", main_code)
-            self.write_to_container(container, "/app/utils.py", utils_code)
+            # Create the files inside Docker (one tar upload for the whole project)
+            with tracer.span("container.seed", files=len(task["files"])):
+                write_files(container, task["files"])
             
             # --- THE LOOP ---
-            history = []
-            solved = False
+            # Latest file versions + summarized old steps, packed into the context budget
+            history = ContextBuilder(max_tokens=HISTORY_TOKENS)
+            # Re-running the tests on files we have already tested tells us nothing new
+            ctx = ToolContext(container, test_cmd, self.write_to_container, tests=self.test_cache,
+                              workspace=Workspace(task["files"]),
+                              index=RepoIndex(task["files"]),  # Symbol lookups without a round trip
+                              timeouts=self.timeouts, task=task.get("name", test_cmd))
+            if self.prefetch:
+                prefetcher = ctx.prefetch = Prefetcher(ctx, TOOLS)
+            skipped = 0
+            last = []
             
             print("[-] Agent started. Goal: Fix the test failure.")
             
-            for step in range(1, 10): # Max 10 steps
+            for step in range(1, max_steps + 1):
                 print(f"\n--- STEP {step} ---")
                 
-                # Context Management
-                context_str = "\n".join(history[-3:]) # Only keep last 3 actions in memory
+                # Decision Time (the sandbox prefetches likely reads meanwhile)
+                if prefetcher:
+                    prefetcher.speculate(last)
+                # Once a file is in view the next answer is probably a fix: use the patch model
+                role = "patch" if history.files else "navigate"
+                action = self.think(history.render(), "Run tests, locate the bug in the files, and fix it.", role)
+                
+                print(f"🤖 AGENT SAYS: {action.splitlines()[0] if action else ''} ...") # Print first line only
                 
-                # Decision Time
-                action = self.think(context_str, "Run tests, locate the bug in the files, and fix it.")
+                # Parsing the Action: the first line that starts with a command
+                call = TOOLS.parse_text(action)
+                if call is None:
+                    print("   [System]: Error - No command recognized")
+                    continue
                 
-                print(f"🤖 AGENT SAYS: {action.splitlines()[0]} ...") # Print first line only
+                result = TOOLS.dispatch(call, ctx)
+                last = [(call, result)]
+                skipped += result.cached
+                if call.name == "read_file" and result.exit_code == 0:
+                    print(f"   [System]: Read {call.args['path']} ({len(result.output)} chars)")
+                else:
+                    print(f"   [System]: {result.output}")
                 
-                # Parsing the Action
-                if "RUN_TEST" in action:
-                    res = container.exec_run("python3 /app/main.py")
-                    output = res.output.decode('utf-8').strip()
-                    exit_code = res.exit_code
-                    print(f"   [System]: Test Output -> {output}")
-                    history.append(f"Action: RUN_TEST\nResult: {output}")
-                    
-                    if exit_code == 0 and "SUCCESS" in output:
-                        print("\n🎉 VICTORY! The agent navigated the file system and fixed the bug.")
-                        solved = True
-                        break
-                        
-                elif "LIST_FILES" in action:
-                    target_dir = action.split(" ")[1] if len(action.split(" ")) > 1 else "."
-                    res = container.exec_run(f"ls -R {target_dir}")
-                    output = res.output.decode('utf-8').strip()
-                    print(f"   [System]: Files -> {output}")
-                    history.append(f"Action: LIST_FILES {target_dir}\nResult: {output}")
-
-                elif "READ_FILE" in action:
-                    # Extract filename
-                    match = re.search(r"READ_FILE\s+(\S+)", action)
-                    if match:
-                        filename = match.group(1)
-                        print(f"   [System]: Reading {filename}...")
-                        res = container.exec_run(f"cat {filename}")
-                        content = res.output.decode('utf-8')
-                        history.append(f"Action: READ_FILE {filename}\nContent:\n{content}")
-                    else:
-                        print("   [System]: Error - No filename specified")
-
-                elif "WRITE_FILE" in action:
-                    # Extract filename and code
-                    match = re.search(r"WRITE_FILE\s+(\S+)", action)
-                    if match:
-                        filename = match.group(1)
-                        # Assume the rest of the response is the code
-                        code = action.split(filename)[1].strip()
-                        # Clean code block format
-                        code = code.replace("```python", "").replace("```", "").strip()
-                        
-                        print(f"   [System]: Writing patch to {filename}...")
-                        self.write_to_container(container, filename, code)
-                        history.append(f"Action: WROTE_FILE {filename}")
-                        
-                        # Auto-trigger test after write
-                        print("   [System]: Auto-running verification...")
-                        res = container.exec_run("python3 /app/main.py")
-                        if res.exit_code == 0:
-                            print(f"   [System]: {res.output.decode('utf-8').strip()}")
-                            print("\n🎉 VICTORY! Bug fixed.")
-                            solved = True
-                            break
-                    else:
-                        print("   [System]: Error parsing WRITE command")
+                if result.passed:
+                    print("\n🎉 VICTORY! The agent navigated the file system and fixed the bug.")
+                    solved = True
+                    break
+                TOOLS.record(history, call, result)
 
             if not solved:
                 print("\n❌ DEFEAT. Agent got lost in the file system.")
+            if skipped:
+                print(f"   [Test Cache]: {skipped} redundant test runs skipped")
+            if ctx.validator.stats["checked"]:
+                print(f"   [Pre-check]: {ctx.validator.summary()}")
 
         finally:
-            container.kill()
-            container.remove()
+            usage = report_episode(container, meter, prefetcher)
+            self.release_sandbox(container)
+            episode.end(solved=solved, steps=step, **(usage or {}))
+            if tracer.enabled:
+                print_flame_summary(episode)
+
+        return {"solved": solved, "steps": step, "resources": usage}
 
 if __name__ == "__main__":
     agent = AgentExplorer()
@@ -1,24 +1,30 @@
 import docker
-import requests
-import base64
 import json
-import re
+from context_builder import ContextBuilder
+from llm_client import ROLE_MODELS, get_client
+from prefetch import Prefetcher
+from prompt_layout import PromptLayout, report_prefill
+from repo_index import RepoIndex
+from sandbox_fs import write_files
+from sandbox_limits import ResourceMeter, TestTimeouts
+from sandbox_session import close_sandbox, open_sandbox, report_episode
+from stream_parsers import JSONObjectParser
+from verify_cache import Workspace
+from tools import TOOLS, ToolContext
+from tracing import print_flame_summary, tracer
 
 # --- CONFIGURATION ---
-OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL_NAME = "qwen2.5-coder:7b"
 DOCKER_IMAGE = "python:3.10-slim" 
+TEST_CMD = "python3 /app/main.py"
+MAX_STEPS = 9
+MAX_ACTIONS = 5  # Tool calls the model may plan per turn
+NUM_CTX = 4096
+HISTORY_TOKENS = NUM_CTX // 2  # The other half is instructions + the model's answer
 
-class AgentJSON:
-    def __init__(self):
-        self.d_client = docker.from_env()
-        print(f"[-] Connected to Brain ({MODEL_NAME}) - JSON MODE ACTIVE")
-
-    def think(self, history):
-        """
-        Forces the LLM to output valid JSON only.
-        """
-        prompt = f"""
+# Static instructions first, the step's history last: the server keeps the KV
+# cache of the shared prefix, so each step only prefills what the history added.
+PROMPT = PromptLayout(f"""
         You are a robotic software engineer. You interact with a file system via JSON commands.
         
         GOAL: Fix the failing test in /app/main.py.
@@ -29,41 +35,29 @@ class AgentJSON:
         2. Read file:   {{"action": "read_file", "path": "filename.py"}}
         3. Write file:  {{"action": "write_file", "path": "filename.py", "content": "code_here"}}
         4. Run tests:   {{"action": "run_test", "cmd": "python3 /app/main.py"}}
+        5. Find definition: {{"action": "find_definition", "name": "function_or_class"}}  (returns just its source)
+        6. Find callers:    {{"action": "find_callers", "name": "function_name"}}
+        7. Patch file:  {{"action": "patch_file", "path": "filename.py", "patch": "<<<<<<< SEARCH\\nold lines\\n=======\\nnew lines\\n>>>>>>> REPLACE"}}
+           Prefer patch_file for small fixes: only the changed lines, copied exactly. Use write_file if a patch is rejected.
 
-        HISTORY:
-        {json.dumps(history, indent=2)}
+        BATCHING: To save turns, return several steps at once (up to {MAX_ACTIONS}):
+        {{"actions": [{{"action": "list_files", "path": "."}}, {{"action": "read_file", "path": "utils.py"}}]}}
+        Reads run together. The batch stops after a write_file or run_test, so put those last.
 
         INSTRUCTIONS:
         - Analyze the history. Determine the next logical step.
         - The bug is likely in a dependency, not the test file itself.
         - RETURN ONLY JSON. NO TEXT. NO MARKDOWN.
-        """
-        
-        payload = {
-            "model": MODEL_NAME,
-            "prompt": prompt,
-            "stream": False,
-            "format": "json",  # FORCE OLLAMA TO USE JSON MODE
-            "options": {"temperature": 0.0}
-        }
-        
-        try:
-            resp = requests.post(OLLAMA_URL, json=payload).json()['response']
-            return json.loads(resp) # Parse immediately to verify validity
-        except Exception as e:
-            print(f"   [Brain Error]: Generated invalid JSON. Retrying... {e}")
-            return None
 
-    def write_to_container(self, container, filepath, content):
-        b64 = base64.b64encode(content.encode('utf-8')).decode('utf-8')
-        cmd = f"python3 -c \"import base64, os; os.makedirs(os.path.dirname('{filepath}'), exist_ok=True); open('{filepath}', 'w').write(base64.b64decode('{b64}').decode('utf-8'))\""
-        container.exec_run(cmd)
+        HISTORY:
+        """)
 
-    def run_simulation(self):
-        print("\n🚀 STARTING SIMULATION v4.0 (JSON Control Loop)")
-        
-        # Setup Multi-File Project
-        main_code = """
+# The default challenge: a multi-file project with the bug in a dependency
+DEFAULT_TASK = {
+    "name": "calculate_price",
+    "test_cmd": TEST_CMD,
+    "files": {
+        "/app/main.py": """
 from utils import calculate_price
 if __name__ == "__main__":
     total = calculate_price(10, 2)
@@ -71,83 +65,163 @@ if __name__ == "__main__":
         print(f"FAIL: Expected 20, got {total}")
         exit(1)
     print("SUCCESS: Cart total is correct.")
-"""
-        utils_code = """
+""",
+        "/app/utils.py": """
 def calculate_price(price, quantity):
     return price - quantity  # BUG
-"""
+""",
+    },
+}
+
+class AgentJSON:
+    def __init__(self, d_client=None, pool=None, llm=None, stream=False, use_executor=False, test_cache=None,
+                 prefetch=False, models=None, cap_output=True, kill_on_overflow=False, limits=None, timeouts=None):
+        self.d_client = d_client or docker.from_env()
+        self.pool = pool  # Optional SandboxPool of warm containers
+        self.llm = llm or get_client()  # Shared keep-alive Ollama session
+        self.stream = stream  # Stream tokens and stop once the action is known
+        self.use_executor = use_executor  # Serve tool actions from a resident in-sandbox daemon
+        self.test_cache = test_cache  # TestCache shared across episodes; None = one per episode
+        self.prefetch = prefetch  # Run the likely next reads while the model is thinking
+        self.models = dict(ROLE_MODELS, **(models or {}))  # role -> model name (navigate / patch)
+        self.cap_output = cap_output  # Stream exec output into head/tail buffers instead of keeping all of it
+        self.kill_on_overflow = kill_on_overflow  # Kill commands that print more than sandbox_output.KILL_AFTER
+        self.limits = limits  # containers.run() cgroup kwargs; None = sandbox_limits defaults
+        self.timeouts = timeouts or TestTimeouts()  # Test-run timeouts learned per task, kept across episodes
+        print(f"[-] Connected to Brain ({MODEL_NAME}) - JSON MODE ACTIVE")
 
-        container = self.d_client.containers.run(DOCKER_IMAGE, command="tail -f /dev/null", detach=True)
+    def think(self, history, role="navigate"):
+        """
+        Forces the LLM to output valid JSON only.
+        history is the rendered ContextBuilder text.
+        """
+        prompt = PROMPT.render(history)
+        
+        span = tracer.start("think", prompt_chars=len(prompt), stream=self.stream, model=self.models[role])
+        mark = self.llm.metrics.mark()
+        try:
+            if self.stream:
+                # Hang up as soon as the JSON object is closed
+                resp = self.llm.stream(
+                    prompt,
+                    parser=JSONObjectParser(),
+                    model=self.models[role],
+                    format="json",
+                    options={"temperature": 0.0, "num_ctx": NUM_CTX}
+                )
+            else:
+                resp = self.llm.generate(
+                    prompt,
+                    model=self.models[role],
+                    format="json",  # FORCE OLLAMA TO USE JSON MODE
+                    options={"temperature": 0.0, "num_ctx": NUM_CTX}
+                )
+            span.end(response_chars=len(resp), prompt_eval_ms=report_prefill(self.llm, mark))
+            with tracer.span("parse"):
+                return json.loads(resp) # Parse immediately to verify validity
+        except Exception as e:
+            span.end(error=str(e))
+            print(f"   [Brain Error]: Generated invalid JSON. Retrying... {e}")
+            return None
+
+    def write_to_container(self, container, filepath, content):
+        write_files(container, {filepath: content})
+
+    def start_sandbox(self):
+        """Borrow a warm container from the pool, or cold-start one, wrapped for this agent's options."""
+        return open_sandbox(self.d_client, self.pool, DOCKER_IMAGE, self.limits, use_executor=self.use_executor,
+                            cap_output=self.cap_output, kill_on_overflow=self.kill_on_overflow)
+
+    def release_sandbox(self, container):
+        close_sandbox(container, self.pool)
+
+    def run_simulation(self, task=None, max_steps=MAX_STEPS):
+        """
+        Runs one repair episode. task is a dict with "files" ({path: content})
+        and "test_cmd"; defaults to DEFAULT_TASK. Returns {"solved", "steps"}.
+        """
+        task = task or DEFAULT_TASK
+        test_cmd = task.get("test_cmd", TEST_CMD)
+        print("\n🚀 STARTING SIMULATION v4.0 (JSON Control Loop)")
+
+        episode = tracer.start("episode", agent="AgentJSON", task=task.get("name", ""))
+        container = self.start_sandbox()
+        meter = ResourceMeter(container)  # What this episode costs the host, for packing episodes densely
+        step = 0
+        solved = False
+        prefetcher = None
         
         try:
-            # Initialize Environment
-            self.write_to_container(container, "/app/main.py", main_code)
-            self.write_to_container(container, "/app/utils.py", utils_code)
+            # Initialize Environment (one tar upload for the whole project)
+            with tracer.span("container.seed", files=len(task["files"])):
+                write_files(container, task["files"])
             
-            history = [{"role": "system", "content": "Environment started. Tests are failing."}]
-            solved = False
+            # Latest file versions + summarized old steps, packed into the context budget
+            history = ContextBuilder(max_tokens=HISTORY_TOKENS, style="json",
+                                     header="Environment started. Tests are failing.")
+            # Re-running the tests on files we have already tested tells us nothing new
+            ctx = ToolContext(container, test_cmd, self.write_to_container,
+                              tests=self.test_cache, workspace=Workspace(task["files"]),
+                              index=RepoIndex(task["files"]),  # Symbol lookups without a round trip
+                              timeouts=self.timeouts, task=task.get("name", test_cmd))
+            if self.prefetch:
+                prefetcher = ctx.prefetch = Prefetcher(ctx, TOOLS)
+            skipped = 0
+            last = []
             
-            for step in range(1, 10):
+            for step in range(1, max_steps + 1):
                 print(f"\n--- STEP {step} ---")
                 
-                # 1. THINK
-                decision = self.think(history[-4:]) # Keep context short
+                # 1. THINK (the sandbox prefetches likely reads meanwhile)
+                if prefetcher:
+                    prefetcher.speculate(last)
+                # Once a file is in view the next answer is probably a fix: use the patch model
+                role = "patch" if history.files else "navigate"
+                decision = self.think(history.render(), role)
                 if not decision: continue # Skip if JSON failed
                 
-                print(f"🤖 DECISION: {decision['action']} -> {decision.get('path', '')}")
-                
-                # 2. ACT
-                action = decision.get("action")
-                result = ""
+                calls = TOOLS.parse_json_batch(decision, MAX_ACTIONS)
+                for call in calls:
+                    print(f"🤖 DECISION: {call.name} -> {call.args.get('path', '')}")
                 
-                if action == "run_test":
-                    res = container.exec_run("python3 /app/main.py")
-                    result = res.output.decode('utf-8').strip()
-                    exit_code = res.exit_code
-                    print(f"   [Output]: {result}")
-                    
-                    if exit_code == 0 and "SUCCESS" in result:
-                        print("\n🎉 VICTORY! The JSON Agent solved the problem.")
+                # 2. ACT (independent reads run concurrently; a write or test ends the batch)
+                results = TOOLS.dispatch_many(calls, ctx)
+                last = list(zip(calls, results))
+                for call, result in zip(calls, results):
+                    skipped += result.cached
+                    if call.name == "read_file" and result.exit_code == 0:
+                        print(f"   [Output]: {call.args['path']} (Read {len(result.output)} chars)")
+                    else:
+                        print(f"   [Output]: {result.output}")
+                    if result.passed:
                         solved = True
-                        break
                 
-                elif action == "list_files":
-                    path = decision.get("path", ".")
-                    res = container.exec_run(f"ls -R {path}")
-                    result = res.output.decode('utf-8').strip()
-                    print(f"   [Output]: \n{result}")
-
-                elif action == "read_file":
-                    path = decision.get("path")
-                    res = container.exec_run(f"cat {path}")
-                    result = res.output.decode('utf-8')
-                    print(f"   [Output]: (Read {len(result)} chars)")
-
-                elif action == "write_file":
-                    path = decision.get("path")
-                    content = decision.get("content")
-                    print(f"   [Action]: Overwriting {path}...")
-                    self.write_to_container(container, path, content)
-                    result = "File updated successfully."
-                    
-                    # Heuristic: Immediately verify after writing
-                    print("   [Auto-Verify]: Running tests...")
-                    res = container.exec_run("python3 /app/main.py")
-                    if res.exit_code == 0:
-                        print(f"   [Output]: {res.output.decode('utf-8').strip()}")
-                        print("\n🎉 VICTORY! Bug fixed during verify.")
-                        solved = True
-                        break
+                if solved:
+                    print("\n🎉 VICTORY! The JSON Agent solved the problem.")
+                    break
 
                 # 3. OBSERVE (Update History)
-                history.append({"role": "agent", "action": action, "result": result})
+                for call, result in zip(calls, results):
+                    TOOLS.record(history, call, result)
+                if len(results) < len(calls):
+                    dropped = ", ".join(call.name for call in calls[len(results):])
+                    history.record("batch_stopped", result=f"Not run after {calls[len(results) - 1].name}: {dropped}")
 
             if not solved:
                 print("\n❌ DEFEAT. Max steps reached.")
+            if skipped:
+                print(f"   [Test Cache]: {skipped} redundant test runs skipped")
+            if ctx.validator.stats["checked"]:
+                print(f"   [Pre-check]: {ctx.validator.summary()}")
 
         finally:
-            container.kill()
-            container.remove()
+            usage = report_episode(container, meter, prefetcher)
+            self.release_sandbox(container)
+            episode.end(solved=solved, steps=step, **(usage or {}))
+            if tracer.enabled:
+                print_flame_summary(episode)
+
+        return {"solved": solved, "steps": step, "resources": usage}
 
 if __name__ == "__main__":
     agent = AgentJSON()
@@ -0,0 +1,170 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+from fake_docker import FakeDockerClient
+from llm_cache import CachedLLM
+from llm_replay import ReplayLLM
+
+# --- CONFIGURATION ---
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_fixtures")
+AGENTS = {
+    # name: (module, class[, constructor kwargs])
+    "agi_agent": ("agi_agent", "AgentZero"),
+    "agi_agent_v2": ("agi_agent_v2", "AgentZero"),
+    # SEARCH/REPLACE edits. Its fixture has no recorded latencies: compare output tokens, not --realtime timings
+    "agi_agent_v2_patch": ("agi_agent_v2", "AgentZero", {"patch": True}),
+    "agi_agent_v3": ("agi_agent_v3", "AgentExplorer"),
+    "agi_agent_v4": ("agi_agent_v4", "AgentJSON"),
+    "agi_agent_v4_batch": ("agi_agent_v4", "AgentJSON"),  # Same agent, multi-action answers
+}
+# Metric -> (direction that counts as a regression, smallest absolute change that matters)
+WATCHED = {
+    "success_rate": ("down", 0.0),
+    "e2e_latency_p50": ("up", 0.05),
+    "step_latency_p50": ("up", 0.02),
+    "model_calls_per_solved": ("up", 0.0),
+    "exec_runs_avg": ("up", 0.0),
+    "completion_tokens_per_solved": ("up", 0.0),
+    "bytes_transferred_avg": ("up", 0.0),
+}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def run_episode(name, realtime=False, cache=None):
+    """
+    One deterministic episode: recorded model answers, fake Docker. cache: a
+    CachedLLM kept across the repeats, answering the prompts it has seen
+    before; only its misses reach the replayed model.
+    """
+    module, cls, *kwargs = AGENTS[name]
+    agent_cls = getattr(__import__(module), cls)
+    llm = ReplayLLM.load(os.path.join(FIXTURES, f"{name}.json"), realtime=realtime)
+    d_client = FakeDockerClient()
+    if cache is not None:
+        cache.client = llm
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = agent_cls(d_client=d_client, llm=cache if cache is not None else llm,
+                          **(kwargs[0] if kwargs else {}))
+        start = time.perf_counter()
+        outcome = agent.run_simulation()
+        end = time.perf_counter()
+
+    # A step runs from one model call to the next (think + act + observe)
+    marks = llm.call_times + [end]
+    steps = [b - a for a, b in zip(marks, marks[1:])]
+    return {
+        "solved": bool(outcome and outcome["solved"]),
+        # A fixture without recorded latencies replays instantly: its timings leave out the model
+        "timed": not realtime or bool(llm.latencies),
+        "e2e_latency": end - start,
+        "step_latencies": steps,
+        "model_calls": len(llm.call_times),
+        "completion_tokens": llm.metrics.summary()["completion_tokens"],
+        "exec_runs": d_client.exec_count,
+        "api_calls": d_client.api_calls,
+        "bytes_transferred": d_client.bytes_sent + d_client.bytes_received,
+        "containers_started": d_client.containers.started,
+    }
+
+
+def summarize(episodes):
+    solved = [e for e in episodes if e["solved"]]
+    e2e = [e["e2e_latency"] for e in episodes]
+    steps = [s for e in episodes for s in e["step_latencies"]]
+    n = len(episodes)
+    timed = all(e["timed"] for e in episodes)
+    return {
+        "runs": n,
+        "success_rate": len(solved) / n,
+        "e2e_latency_avg": sum(e2e) / n if timed else None,
+        "e2e_latency_p50": percentile(e2e, 0.50) if timed else None,
+        "e2e_latency_p95": percentile(e2e, 0.95) if timed else None,
+        "step_latency_p50": percentile(steps, 0.50) if timed else None,
+        "step_latency_p95": percentile(steps, 0.95) if timed else None,
+        "model_calls_per_solved": (sum(e["model_calls"] for e in episodes) / len(solved)) if solved else None,
+        "completion_tokens_per_solved": (sum(e["completion_tokens"] for e in episodes) / len(solved)) if solved else None,
+        "exec_runs_avg": sum(e["exec_runs"] for e in episodes) / n,
+        "api_calls_avg": sum(e["api_calls"] for e in episodes) / n,
+        "bytes_transferred_avg": sum(e["bytes_transferred"] for e in episodes) / n,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """List metrics that moved the wrong way by more than tolerance (relative)."""
+    regressions = []
+    for name, stats in current["agents"].items():
+        old = baseline.get("agents", {}).get(name)
+        if not old:
+            continue
+        for metric, (bad, floor) in WATCHED.items():
+            new_v, old_v = stats.get(metric), old.get(metric)
+            if new_v is None or old_v is None:
+                continue
+            if bad == "up" and new_v > old_v * (1 + tolerance) and new_v - old_v > floor:
+                regressions.append(f"{name}.{metric}: {old_v:.4g} -> {new_v:.4g}")
+            if bad == "down" and new_v < old_v * (1 - tolerance) and old_v - new_v > floor:
+                regressions.append(f"{name}.{metric}: {old_v:.4g} -> {new_v:.4g}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the agent generations.")
+    parser.add_argument("--agents", nargs="+", default=list(AGENTS), choices=list(AGENTS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--realtime", action="store_true", help="sleep for the recorded model latencies")
+    parser.add_argument("--cache", action="store_true",
+                        help="put one CachedLLM per agent in front of think() across the repeats")
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="previous results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "realtime": args.realtime,
+            "cache": args.cache,
+        },
+        "agents": {},
+    }
+    for name in args.agents:
+        cache = CachedLLM(None) if args.cache else None
+        episodes = [run_episode(name, args.realtime, cache) for _ in range(args.repeat)]
+        results["agents"][name] = summarize(episodes)
+        if cache is not None:
+            results["agents"][name]["llm_cache_hit_rate"] = cache.hit_rate()
+
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import ast
+import re
+import textwrap
+import threading
+
+# --- HOST-SIDE PRE-CHECK ---
+# A model answer that does not parse, still carries its markdown, or drops a
+# function the tests import is certain to fail in the sandbox, after a tar
+# upload and a full test run. These checks run on the host in microseconds:
+#
+#   extract_code()   the code inside ``` fences, or the answer minus the
+#                    prose lines around it ("Here is the fixed code:")
+#   check_code()     ast.parse, and every public function / method of the
+#                    file being replaced still exists with the same parameters
+#
+# Anything rejected raises CodeRejected with a message meant for the model,
+# so the caller can ask again right away instead of running the tests.
+
+FENCE = re.compile(r"^[ \t]*```[ \t]*([\w+-]*)[^\n]*\n(.*?)(?:^[ \t]*```[ \t]*$|\Z)", re.S | re.M)
+# Lines that start Python code rather than prose
+CODE_LINE = re.compile(r"^(?:(?:async\s+)?def\s|class\s|import\s|from\s+[\w.]+\s+import\s|@|#|if\s|for\s|while\s|"
+                       r"try:|with\s|[A-Za-z_][\w.]*(?:\s*,\s*[A-Za-z_][\w.]*)*\s*[-+*/]?=|[A-Za-z_][\w.]*\()")
+
+
+class CodeRejected(ValueError):
+    pass
+
+
+def strip_fences(text):
+    """The longest ``` fenced block of text (an unclosed fence runs to the end), or text itself, stripped."""
+    return _fenced(text).strip()
+
+
+def extract_code(text):
+    """
+    The Python source in a model answer: the answer itself if it already
+    parses (a docstring may hold a ``` example), else the fenced block if
+    there is one, else the answer without the prose lines before and after
+    the code. An answer that does not parse either way is returned fenceless
+    but otherwise untouched, so the syntax error points at what the model sent.
+    """
+    if _parses(text):
+        return text
+    code = textwrap.dedent(_fenced(text)).strip()
+    if _parses(code):
+        return code
+    lines = code.splitlines()
+    start = next((i for i, line in enumerate(lines) if CODE_LINE.match(line)), 0)
+    lines = lines[start:]
+    while lines and not _parses("\n".join(lines)):
+        last = lines[-1]
+        if last.strip() and (last[0].isspace() or CODE_LINE.match(last)):
+            break  # Code that is broken, not trailing prose
+        lines.pop()
+    trimmed = "\n".join(lines).strip()
+    return trimmed if trimmed and _parses(trimmed) else code
+
+
+def public_signatures(source):
+    """{"name" or "Class.method": "(params)"} for the public functions of a module."""
+    signatures = {}
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_"):
+            signatures[node.name] = _params(node.args)
+        elif isinstance(node, ast.ClassDef) and not node.name.startswith("_"):
+            for item in node.body:
+                if (isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                        and (not item.name.startswith("_") or item.name == "__init__")):
+                    signatures[f"{node.name}.{item.name}"] = _params(item.args)
+    return signatures
+
+
+def check_code(code, original=None):
+    """Raises CodeRejected unless code parses and keeps every public signature of original."""
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        lines = code.splitlines()
+        line = lines[e.lineno - 1].strip() if e.lineno and 0 < e.lineno <= len(lines) else ""
+        raise CodeRejected(f"SyntaxError on line {e.lineno}: {e.msg}" + (f": {line!r}" if line else ""))
+    if not original:
+        return
+    try:
+        before = public_signatures(original)
+    except SyntaxError:
+        return  # Nothing to compare with: the file being replaced is broken itself
+    after = public_signatures(code)
+    problems = []
+    for name, params in before.items():
+        if name not in after:
+            problems.append(f"{name}{params} was removed")
+        elif after[name] != params:
+            problems.append(f"{name}{params} became {name}{after[name]}")
+    if problems:
+        raise CodeRejected("the existing public signatures must stay the same: " + "; ".join(problems))
+
+
+class CodeValidator:
+    """
+    extract_code() + check_code() for every .py file an agent is about to
+    write, with counters: checked, cleaned (fences or prose removed) and
+    rejected (each one a write and a test run the sandbox did not have to do).
+    Other files pass through unchanged.
+    """
+
+    def __init__(self):
+        self.stats = {"checked": 0, "cleaned": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def clean(self, text, path, original=None, strict=True):
+        """
+        The code to write to path; raises CodeRejected with a message for the
+        model. strict=False only cleans: the sandbox gets the code either way.
+        """
+        if not path.endswith(".py"):
+            return text
+        code = extract_code(text)
+        self._count(checked=1, cleaned=int(code.strip() != text.strip()))
+        if strict:
+            try:
+                check_code(code, original)
+            except CodeRejected:
+                self._count(rejected=1)
+                raise
+        return code
+
+    def _count(self, **counts):
+        with self._lock:
+            for key, n in counts.items():
+                self.stats[key] += n
+
+    def summary(self):
+        stats = self.stats
+        return (f"{stats['rejected']} of {stats['checked']} writes rejected on the host "
+                f"({stats['rejected']} sandbox test runs avoided), {stats['cleaned']} cleaned of markdown or prose")
+
+
+def _fenced(text):
+    blocks = [body for _, body in FENCE.findall(text)]
+    return max(blocks, key=len) if blocks else text
+
+
+def _parses(code):
+    try:
+        ast.parse(code)
+        return True
+    except SyntaxError:
+        return False
+
+
+def _params(args):
+    names = [a.arg for a in args.posonlyargs]
+    if names:
+        names.append("/")
+    names += [a.arg for a in args.args]
+    if args.vararg:
+        names.append("*" + args.vararg.arg)
+    elif args.kwonlyargs:
+        names.append("*")
+    names += [a.arg for a in args.kwonlyargs]
+    if args.kwarg:
+        names.append("**" + args.kwarg.arg)
+    return f"({', '.join(names)})"
@@ -0,0 +1,166 @@
+import json
+
+# --- CONFIGURATION ---
+CHARS_PER_TOKEN = 4     # Rough estimate for code-heavy English; no tokenizer needed
+RECENT_STEPS = 4        # Steps kept verbatim before they get folded into summaries
+FILES_SHARE = 0.6       # Max share of the budget spent on file contents
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class ContextBuilder:
+    """
+    Packs an episode's history into a fixed token budget.
+
+    - Every file the agent read or wrote is kept once, at its latest version,
+      so the model never has to READ_FILE it again.
+    - The last RECENT_STEPS steps are shown in full; older steps collapse to a
+      one-line summary that is computed once, when the step is added.
+    - render() is cached until the next change, so building the prompt each
+      step costs nothing when nothing happened.
+
+    style="text" renders "Action: ...\\nResult: ..." blocks (AgentExplorer);
+    style="json" renders one compact JSON object per step (AgentJSON).
+    """
+
+    def __init__(self, max_tokens=2048, style="text", header="", recent_steps=RECENT_STEPS):
+        self.max_tokens = max_tokens
+        self.style = style
+        self.header = header
+        self.recent_steps = recent_steps
+        self.files = {}        # path -> content, insertion order = least recently touched first
+        self.steps = []        # (full_text, summary_text, full_tokens, summary_tokens)
+        self._rendered = None
+
+    # --- Recording ---
+    def record(self, action, target="", result="", exit_code=None):
+        step = {"action": action}
+        if target:
+            step["path"] = target
+        if exit_code is not None:
+            step["exit_code"] = exit_code
+        step["result"] = result
+        self._add_step(step, _first_last(result))
+
+    def record_read(self, path, content):
+        unchanged = self.files.get(path) == content
+        self._touch(path, content)
+        shown = self._shown(content)
+        if shown != "full":
+            # "unchanged, see FILES" would send the model back to a file it cannot see in full
+            note = f"({len(content)} chars: too long for the context, {shown} in FILES)"
+        else:
+            note = "(unchanged, see FILES)" if unchanged else "(latest version in FILES)"
+        self._add_step({"action": "read_file", "path": path, "result": note}, note)
+
+    def record_write(self, path, content):
+        self._touch(path, content)
+        shown = self._shown(content)
+        where = "latest version in FILES" if shown == "full" else f"too long for the context, {shown} in FILES"
+        note = f"(wrote {content.count(chr(10)) + 1} lines, {where})"
+        self._add_step({"action": "write_file", "path": path, "result": note}, note)
+
+    def _shown(self, content):
+        """How much of the newest file FILES can show: "full", "start and end only" or "not shown"."""
+        budget = int((self.max_tokens - (estimate_tokens(self.header) if self.header else 0)) * FILES_SHARE)
+        return _fit(content, budget)[0]
+
+    def _touch(self, path, content):
+        self.files.pop(path, None)
+        self.files[path] = content
+        self._rendered = None
+
+    def _add_step(self, step, summary):
+        full = self._format(step)
+        short = self._format({k: v for k, v in step.items() if k != "result"}, summary)
+        self.steps.append((full, short, estimate_tokens(full), estimate_tokens(short)))
+        self._rendered = None
+
+    def _format(self, step, summary=None):
+        if self.style == "json":
+            if summary is not None:
+                step = dict(step, summary=summary)
+            return json.dumps(step, separators=(",", ":"))
+        target = f" {step['path']}" if step.get("path") else ""
+        if summary is not None:
+            return f"- {step['action'].upper()}{target}: {summary}"
+        code = f" (exit {step['exit_code']})" if "exit_code" in step else ""
+        return f"Action: {step['action'].upper()}{target}{code}\nResult: {step['result']}"
+
+    # --- Rendering ---
+    def render(self):
+        if self._rendered is None:
+            self._rendered = self._build()
+        return self._rendered
+
+    def tokens(self):
+        return estimate_tokens(self.render())
+
+    def _build(self):
+        budget = self.max_tokens - (estimate_tokens(self.header) if self.header else 0)
+
+        files_text = self._render_files(int(budget * FILES_SHARE))
+        budget -= estimate_tokens(files_text) if files_text else 0
+
+        # Walk backwards: newest steps verbatim, older ones as summaries
+        lines = []
+        for i in range(len(self.steps) - 1, -1, -1):
+            full, short, full_tokens, short_tokens = self.steps[i]
+            recent = len(self.steps) - i <= self.recent_steps
+            text, cost = (full, full_tokens) if recent and full_tokens <= budget else (short, short_tokens)
+            if cost > budget:
+                lines.append(f"... {i + 1} earlier steps omitted")
+                break
+            lines.append(text)
+            budget -= cost
+        lines.reverse()
+
+        parts = []
+        if self.header:
+            parts.append(self.header)
+        if files_text:
+            parts.append(files_text)
+        if lines:
+            parts.append("STEPS:\n" + "\n".join(lines))
+        return "\n\n".join(parts)
+
+    def _render_files(self, budget):
+        if not self.files:
+            return ""
+        # Newest files get first claim on the budget; older ones are clipped
+        full_budget = budget
+        blocks = []
+        for path in reversed(list(self.files)):
+            shown, content, cost = _fit(self.files[path], budget)
+            if shown == "not shown":
+                # Re-reading only helps a file that fits once it is the newest
+                fits = _fit(self.files[path], full_budget)[0] != "not shown"
+                blocks.append(f"=== {path} ({'omitted, re-read if needed' if fits else 'too long to show'}) ===")
+                continue
+            blocks.append(f"=== {path} ===\n{content.rstrip()}")
+            budget -= cost
+        blocks.reverse()
+        return "FILES (latest version):\n" + "\n".join(blocks)
+
+
+def _fit(content, budget):
+    """(how it is shown, the text shown, its tokens) for a file given `budget` tokens."""
+    cost = estimate_tokens(content) + 4
+    if cost <= budget:
+        return "full", content, cost
+    keep = max(0, (budget - 8) * CHARS_PER_TOKEN)
+    if keep < 200:
+        return "not shown", "", 0
+    content = content[:keep // 2] + "\n... [clipped] ...\n" + content[-(keep // 2):]
+    return "start and end only", content, estimate_tokens(content) + 4
+
+
+def _first_last(text):
+    lines = [l for l in text.strip().splitlines() if l.strip()]
+    if not lines:
+        return "(no output)"
+    if len(lines) == 1:
+        return lines[0][:160]
+    return f"{lines[0][:80]} ... {lines[-1][:80]}"
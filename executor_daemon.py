@@ -0,0 +1,209 @@
+"""
+Resident executor that runs INSIDE the sandbox (stdlib only, python3.10+).
+
+It reads length-prefixed JSON requests on stdin and answers on stdout, so one
+long-lived process serves every READ / WRITE / LIST / RUN of an episode
+instead of exec_run forking a fresh shell or interpreter per action.
+
+Python test runs fork from this process, which already has the common stdlib
+modules imported, so each run starts from a warm interpreter.
+
+Frame: 4-byte big-endian length + UTF-8 JSON.
+"""
+import json
+import os
+import runpy
+import select
+import signal
+import struct
+import subprocess
+import sys
+import time
+import traceback
+
+# Warmed once at start-up; forked test runs inherit them for free.
+PRELOAD = ["json", "re", "collections", "functools", "itertools", "math",
+           "decimal", "datetime", "unittest", "typing", "dataclasses", "traceback"]
+
+ROOT = "/"
+
+
+def real(path):
+    return os.path.normpath(os.path.join(ROOT, path.lstrip("/")))
+
+
+def read_frame(stream):
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    (size,) = struct.unpack(">I", header)
+    return json.loads(stream.read(size))
+
+
+def write_frame(stream, obj):
+    data = json.dumps(obj).encode("utf-8")
+    stream.write(struct.pack(">I", len(data)) + data)
+    stream.flush()
+
+
+# --- Operations ---
+def op_read(req):
+    try:
+        with open(real(req["path"]), encoding="utf-8", errors="replace") as fh:
+            return {"exit_code": 0, "output": fh.read()}
+    except OSError as e:
+        return {"exit_code": 1, "output": f"cat: {req['path']}: {e.strerror}"}
+
+
+def op_write(req):
+    path = real(req["path"])
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(req["content"])
+        return {"exit_code": 0, "output": ""}
+    except OSError as e:
+        return {"exit_code": 1, "output": f"write: {req['path']}: {e.strerror}"}
+
+
+def op_list(req):
+    top = real(req.get("path", "."))
+    if not os.path.isdir(top):
+        return {"exit_code": 2, "output": f"ls: cannot access '{req.get('path')}': No such file or directory"}
+    lines = []
+    for dirpath, dirnames, filenames in os.walk(top):
+        dirnames.sort()
+        shown = "/" + os.path.relpath(dirpath, ROOT) if ROOT != "/" else dirpath
+        lines.append(f"{os.path.normpath(shown)}:")
+        lines.extend(sorted(dirnames + filenames))
+        lines.append("")
+    return {"exit_code": 0, "output": "\n".join(lines)}
+
+
+def kill_group(pid):
+    """SIGKILL a run and everything it started (it leads its own session)."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def op_run(req):
+    proc = subprocess.Popen(req["cmd"], shell=isinstance(req["cmd"], str), cwd=real(req.get("cwd", "/")),
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                            start_new_session=True)
+    try:
+        out, _ = proc.communicate(timeout=req.get("timeout"))
+        return {"exit_code": proc.returncode, "output": out.decode("utf-8", errors="replace")}
+    except subprocess.TimeoutExpired:
+        kill_group(proc.pid)
+        out, _ = proc.communicate()
+        return {"exit_code": 124, "output": out.decode("utf-8", errors="replace") + "\nTIMEOUT", "timed_out": True}
+
+
+def op_python(req):
+    """
+    Run a script in a fork of this (pre-warmed) interpreter. The fork leads
+    its own session, so a timeout kills the processes the script started too.
+    """
+    script = real(req["path"])
+    read_fd, write_fd = os.pipe()
+    sys.stdout.flush()
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            os.setsid()
+            os.close(read_fd)
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(write_fd, 1)
+            os.dup2(write_fd, 2)
+            sys.stdin = open(0, closefd=False)
+            sys.stdout = open(1, "w", closefd=False)
+            sys.stderr = open(2, "w", closefd=False)
+            os.chdir(real(req.get("cwd", "/")))
+            sys.argv = [req["path"]] + list(req.get("args", []))
+            sys.path[0] = os.path.dirname(script)
+            runpy.run_path(script, run_name="__main__")
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except BaseException:
+            frames = [f for f in traceback.extract_tb(sys.exc_info()[2])
+                      if "runpy" not in f.filename and not f.filename.endswith("executor_daemon.py")]
+            etype, value = sys.exc_info()[:2]
+            sys.stderr.write("Traceback (most recent call last):\n")
+            sys.stderr.write("".join(traceback.format_list(frames)))
+            sys.stderr.write("".join(traceback.format_exception_only(etype, value)))
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    os.close(write_fd)
+    chunks = []
+    timeout = req.get("timeout")
+    deadline = time.monotonic() + timeout if timeout else None
+    timed_out = False
+    while True:
+        wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+        ready, _, _ = select.select([read_fd], [], [], wait)
+        if not ready:
+            timed_out = True
+            kill_group(pid)
+            break
+        data = os.read(read_fd, 65536)
+        if not data:
+            break
+        chunks.append(data)
+    os.close(read_fd)
+    _, status = os.waitpid(pid, 0)
+    output = b"".join(chunks).decode("utf-8", errors="replace")
+    if timed_out:
+        return {"exit_code": 124, "output": output + "\nTIMEOUT", "timed_out": True}
+    return {"exit_code": os.waitstatus_to_exitcode(status), "output": output}
+
+
+OPS = {
+    "ping": lambda req: {"exit_code": 0, "output": "pong"},
+    "read": op_read,
+    "write": op_write,
+    "list": op_list,
+    "run": op_run,
+    "python": op_python,
+}
+
+
+def main():
+    global ROOT
+    if len(sys.argv) > 2 and sys.argv[1] == "--root":
+        ROOT = sys.argv[2]
+    for name in PRELOAD:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    while True:
+        req = read_frame(stdin)
+        if req is None:
+            break
+        try:
+            resp = OPS[req["op"]](req)
+        except Exception as e:
+            resp = {"exit_code": 1, "output": f"executor error: {e!r}"}
+        resp["id"] = req.get("id")
+        write_frame(stdout, resp)
+
+
+if __name__ == "__main__":
+    main()
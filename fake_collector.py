@@ -0,0 +1,71 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- FAKE OTLP COLLECTOR ---
+# Accepts OTLP/HTTP JSON on /v1/traces and keeps the spans in memory (and
+# optionally in a JSONL file), standing in for an OpenTelemetry collector.
+
+
+class FakeCollector:
+    def __init__(self, jsonl_path=None, host="127.0.0.1", port=0):
+        self.spans = []
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/traces"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _receive(self, payload):
+        spans = [span
+                 for resource in payload.get("resourceSpans", [])
+                 for scope in resource.get("scopeSpans", [])
+                 for span in scope.get("spans", [])]
+        with self._lock:
+            self.spans.extend(spans)
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a") as fh:
+                    for span in spans:
+                        fh.write(json.dumps(span) + "\n")
+
+    def _handler(self):
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if self.path != "/v1/traces":
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                collector._receive(json.loads(self.rfile.read(length) or b"{}"))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+        return Handler
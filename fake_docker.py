@@ -0,0 +1,366 @@
+import base64
+import io
+import os
+import re
+import resource
+import shlex
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import itertools
+
+# --- FAKE DOCKER ---
+# A stand-in for docker.from_env() that needs no daemon. Files live in a dict,
+# and "python3 <file>" runs the real script on the host in a scratch directory
+# so the buggy-program challenges still pass or fail for real.
+
+_ids = itertools.count(1)
+PID_PREFIX = "echo $$ >&2; exec "   # sandbox_output's kill-on-overflow wrapper
+TIMEOUT_EXIT = 124                  # What coreutils `timeout` exits with
+IMAGE_DIRS = {"/", "/tmp", "/root", "/home", "/usr", "/etc", "/var", "/opt"}  # What diff() reports as changed
+
+
+def _split_timeout(argv):
+    """`timeout [-k N] [-s SIG] SECONDS cmd...` -> (seconds, cmd); (None, argv) for anything else."""
+    if not argv or argv[0] != "timeout":
+        return None, argv
+    rest = argv[1:]
+    while rest and rest[0].startswith("-"):
+        rest = rest[2:] if rest[0] in ("-k", "-s") else rest[1:]
+    return float(rest[0].rstrip("s")), rest[1:]
+
+
+class ExecResult:
+    def __init__(self, exit_code, output):
+        self.exit_code = exit_code
+        self.output = output
+
+    def __iter__(self):
+        return iter((self.exit_code, self.output))
+
+
+class FakeContainer:
+    def __init__(self, client, image, command, limits=None):
+        self.client = client
+        self.image = image
+        self.command = command
+        self.limits = limits or {}   # nano_cpus / mem_limit / pids_limit, recorded, not enforced
+        self.cpu_ns = 0              # Wall time of the scripts run here, standing in for CPU time
+        self.id = f"fake{next(_ids):08d}"
+        self.status = "running"
+        self.files = {}
+        self.exec_count = 0
+        self.procs = {}   # pid -> running Popen, for kill
+
+    # --- Lifecycle ---
+    def reload(self):
+        pass
+
+    def kill(self):
+        self.status = "exited"
+
+    def remove(self, force=False):
+        self.status = "removed"
+        self.client.containers.removed += 1
+
+    # --- Execution ---
+    def exec_run(self, cmd, **kwargs):
+        self.exec_count += 1
+        self.client.exec_count += 1
+        self.client.api_calls += 1
+        self.client.bytes_sent += len(cmd) if isinstance(cmd, str) else sum(len(a) for a in cmd)
+        result = self._dispatch(cmd)
+        self.client.bytes_received += len(result.output)
+        return result
+
+    def _dispatch(self, cmd):
+        if self.status != "running":
+            return ExecResult(1, b"container is not running")
+        argv = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+        seconds, argv = _split_timeout(argv)
+        if argv[:2] == ["sh", "-c"]:
+            return self._sh(argv[2])
+        if argv[0] == "python3" and len(argv) > 2 and argv[1] == "-c":
+            return self._python_c(argv[2])
+        if argv[0] == "python3":
+            return self._run_script(argv[1], seconds)
+        if argv[0] == "cat":
+            return self._cat(argv[1])
+        if argv[:2] == ["ls", "-R"]:
+            return self._ls(argv[2] if len(argv) > 2 else ".")
+        if argv[:2] == ["rm", "-rf"]:
+            for path in argv[2:]:
+                if path != "--":
+                    self._rm(path)
+            return ExecResult(0, b"")
+        if argv[0] == "true":
+            return ExecResult(0, b"")
+
+        return ExecResult(127, f"sh: {argv[0]}: not found".encode())
+
+    def exec_stream(self, cmd, state):
+        """
+        Low-level exec_start(stream=True, demux=True): yields (stdout, stderr)
+        chunks as the command prints them and sets state["ExitCode"] at the end.
+        Understands the `sh -c 'echo $$ >&2; exec ...'` pid wrapper.
+        """
+        self.exec_count += 1
+        self.client.exec_count += 1
+        self.client.api_calls += 1
+        self.client.bytes_sent += len(cmd) if isinstance(cmd, str) else sum(len(a) for a in cmd)
+        argv = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+        announce = argv[:2] == ["sh", "-c"] and argv[2].startswith(PID_PREFIX)
+        if announce:
+            argv = shlex.split(argv[2][len(PID_PREFIX):])
+        seconds, argv = _split_timeout(argv)
+        if self.status == "running" and argv[0] == "python3" and len(argv) == 2:
+            yield from self._stream_script(argv[1], state, announce, seconds)
+            return
+        result = self._dispatch(argv)
+        if announce:
+            yield None, b"0\n"
+        self.client.bytes_received += len(result.output)
+        state["ExitCode"] = result.exit_code
+        yield result.output, None
+
+    def _stream_script(self, path, state, announce, timeout=None):
+        path = self._abs(path)
+        if path not in self.files:
+            msg = f"python3: can't open file '{path}': [Errno 2] No such file or directory"
+            state["ExitCode"] = 2
+            yield None, msg.encode()
+            return
+        with tempfile.TemporaryDirectory() as root:
+            self._materialize(root)
+            start = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, os.path.join(root, path.lstrip("/"))],
+                                    cwd=root, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            self.procs[proc.pid] = proc
+            timer = threading.Timer(timeout, proc.kill) if timeout else None
+            if timer:
+                timer.start()
+            try:
+                if announce:
+                    yield None, b"%d\n" % proc.pid
+                while True:
+                    chunk = os.read(proc.stdout.fileno(), 65536)
+                    if not chunk:
+                        break
+                    self.client.bytes_received += len(chunk)
+                    yield chunk.replace(root.encode(), b""), None
+                state["ExitCode"] = proc.wait()
+                if timer and not timer.is_alive() and state["ExitCode"] < 0:
+                    state["ExitCode"] = TIMEOUT_EXIT
+            finally:
+                if timer:
+                    timer.cancel()
+                self.cpu_ns += int((time.perf_counter() - start) * 1e9)
+                # A client that hangs up early leaves nothing running behind
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+                proc.stdout.close()
+                del self.procs[proc.pid]
+
+    # --- Stats ---
+    def stats(self, stream=True, one_shot=None, **kwargs):
+        """A docker stats snapshot: CPU from the scripts' wall time, memory from their peak RSS."""
+        self.client.api_calls += 1
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+        return {
+            "cpu_stats": {"cpu_usage": {"total_usage": self.cpu_ns}},
+            "memory_stats": {"usage": peak, "max_usage": peak},
+            "pids_stats": {"current": 1 + len(self.procs)},
+        }
+
+    # --- Archives ---
+    def put_archive(self, path, data):
+        self.client.api_calls += 1
+        self.client.bytes_sent += len(data)
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            for member in tar:
+                if member.isfile():
+                    name = self._abs(os.path.join(path, member.name))
+                    self.files[name] = tar.extractfile(member).read().decode("utf-8")
+        return True
+
+    def get_archive(self, path):
+        self.client.api_calls += 1
+        root = self._abs(path)
+        names = [n for n in self.files if n == root or n.startswith(root.rstrip("/") + "/")]
+        if not names:
+            raise FileNotFoundError(f"Could not find the file {path} in container {self.id}")
+        base = os.path.dirname(root.rstrip("/")) or "/"
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            for name in sorted(names):
+                data = self.files[name].encode("utf-8")
+                info = tarfile.TarInfo(os.path.relpath(name, base))
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        data = buf.getvalue()
+        self.client.bytes_received += len(data)
+        return iter([data]), {"name": os.path.basename(root), "size": len(data)}
+
+    def _abs(self, path):
+        return os.path.normpath(os.path.join("/", path))
+
+    def diff(self):
+        """Container.diff(): every file written is added, and so is each parent outside IMAGE_DIRS."""
+        self.client.api_calls += 1
+        kinds = {}
+        for name in self.files:
+            kinds[name] = 1
+            parent = os.path.dirname(name)
+            while parent not in kinds:
+                kinds[parent] = 0 if parent in IMAGE_DIRS else 1
+                if parent == "/":
+                    break
+                parent = os.path.dirname(parent)
+        return [{"Path": path, "Kind": kind} for path, kind in sorted(kinds.items()) if path != "/"]
+
+    def _sh(self, script):
+        if script.startswith("kill -9 -1"):
+            # SandboxPool.reset: everything but PID 1
+            for proc in list(self.procs.values()):
+                proc.kill()
+            return ExecResult(0, b"")
+        kill = re.match(r"kill -9 -- -(\d+)", script)
+        if kill:
+            # sandbox_output's kill-on-overflow; script processes stand in for their group
+            proc = self.procs.get(int(kill.group(1)))
+            if proc is None:
+                return ExecResult(1, f"sh: kill: ({kill.group(1)}) - No such process".encode())
+            proc.kill()
+            return ExecResult(0, b"")
+        # Only the v1 "echo ... > file" injection; quotes are stripped the way sh would
+        match = re.match(r'echo (.*) > (\S+)$', script, re.S)
+        if match:
+            try:
+                words = shlex.split(match.group(1))
+            except ValueError:
+                return ExecResult(2, b"sh: syntax error: unterminated quoted string")
+            self.files[self._abs(match.group(2))] = " ".join(words) + "\n"
+        return ExecResult(0, b"")
+
+    def _python_c(self, code):
+        # The base64 write helper used by the agents.
+        match = re.search(r"open\('([^']+)', 'w'\)\.write\(base64\.b64decode\('([^']*)'\)", code)
+        if not match:
+            return ExecResult(1, b"fake docker: unsupported python3 -c")
+        self.files[self._abs(match.group(1))] = base64.b64decode(match.group(2)).decode("utf-8")
+        return ExecResult(0, b"")
+
+    def _cat(self, path):
+        path = self._abs(path)
+        if path not in self.files:
+            return ExecResult(1, f"cat: {path}: No such file or directory".encode())
+        return ExecResult(0, self.files[path].encode("utf-8"))
+
+    def _ls(self, path):
+        root = self._abs(path)
+        dirs = {}
+        for name in self.files:
+            if not name.startswith(root.rstrip("/") + "/"):
+                continue
+            parent, base = os.path.split(name)
+            dirs.setdefault(parent, []).append(base)
+        if not dirs:
+            return ExecResult(2, f"ls: cannot access '{path}': No such file or directory".encode())
+        out = []
+        for parent in sorted(dirs):
+            out.append(f"{parent}:")
+            out.extend(sorted(dirs[parent]))
+            out.append("")
+        return ExecResult(0, "\n".join(out).encode())
+
+    def _rm(self, path):
+        path = self._abs(path)
+        for name in list(self.files):
+            if name == path or name.startswith(path.rstrip("/") + "/"):
+                del self.files[name]
+
+    def _run_script(self, path, timeout=None):
+        path = self._abs(path)
+        if path not in self.files:
+            msg = f"python3: can't open file '{path}': [Errno 2] No such file or directory"
+            return ExecResult(2, msg.encode())
+        with tempfile.TemporaryDirectory() as root:
+            self._materialize(root)
+            start = time.perf_counter()
+            try:
+                proc = subprocess.run(
+                    [sys.executable, os.path.join(root, path.lstrip("/"))],
+                    cwd=root, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout or 60,
+                )
+                code, output = proc.returncode, proc.stdout
+            except subprocess.TimeoutExpired as e:
+                code, output = TIMEOUT_EXIT, e.stdout or b""
+            self.cpu_ns += int((time.perf_counter() - start) * 1e9)
+        return ExecResult(code, output.replace(root.encode(), b""))
+
+    def _materialize(self, root):
+        for name, content in self.files.items():
+            local = os.path.join(root, name.lstrip("/"))
+            os.makedirs(os.path.dirname(local), exist_ok=True)
+            with open(local, "w") as fh:
+                fh.write(content)
+
+
+class FakeContainers:
+    def __init__(self, client):
+        self.client = client
+        self.started = 0
+        self.removed = 0
+        self.all = []
+
+    def run(self, image, command=None, detach=False, **kwargs):
+        self.started += 1
+        container = FakeContainer(self.client, image, command, kwargs)
+        self.all.append(container)
+        return container
+
+    def list(self):
+        return [c for c in self.all if c.status == "running"]
+
+
+class FakeAPI:
+    """The low-level exec calls sandbox_output streams through."""
+
+    def __init__(self, client):
+        self.client = client
+        self.execs = {}
+
+    def exec_create(self, container, cmd, stdout=True, stderr=True, **kwargs):
+        container_id = getattr(container, "id", container)
+        target = next(c for c in self.client.containers.all if c.id == container_id)
+        exec_id = f"exec{next(_ids):08d}"
+        self.execs[exec_id] = {"container": target, "cmd": cmd, "ExitCode": None}
+        return {"Id": exec_id}
+
+    def exec_start(self, exec_id, stream=False, demux=False, **kwargs):
+        state = self.execs[exec_id]
+        chunks = state["container"].exec_stream(state["cmd"], state)
+        if stream:
+            return chunks
+        chunks = list(chunks)
+        return b"".join(out for out, _ in chunks if out), b"".join(err for _, err in chunks if err)
+
+    def exec_inspect(self, exec_id):
+        state = self.execs[exec_id]
+        return {"ExitCode": state["ExitCode"], "Running": state["ExitCode"] is None}
+
+
+class FakeDockerClient:
+    """Drop-in for docker.from_env() in offline runs."""
+
+    def __init__(self):
+        self.exec_count = 0
+        self.api_calls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.containers = FakeContainers(self)
+        self.api = FakeAPI(self)
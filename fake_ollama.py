@@ -0,0 +1,206 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_backends import scripted
+from prompt_layout import new_tokens
+
+# --- FAKE OLLAMA ---
+# A local /api/generate stand-in so the LLM client and the agent loops can be
+# exercised and benchmarked without a GPU or a model download. It also answers
+# OpenAI-style /v1/completions (a list prompt is one batched request).
+
+
+class FakeOllamaServer:
+    """
+    responder: a callable(payload) -> str, or a list of canned responses that are
+    handed out in order (the last one repeats). latency: seconds added per call.
+    token_latency: seconds per streamed token when the client asks for stream=True.
+    prefill_latency: seconds per prompt token evaluated. Like llama.cpp's slot
+    cache, only the tokens after the prefix shared with the model's previous
+    prompt are evaluated; prompt_eval_count/_duration report just those.
+    """
+
+    def __init__(self, responder=None, latency=0.0, token_latency=0.0, prefill_latency=0.0,
+                 host="127.0.0.1", port=0):
+        if responder is None:
+            responder = lambda payload: "OK"
+        elif isinstance(responder, (list, tuple)):
+            responder = scripted(responder)
+        self.responder = responder
+        self.latency = latency
+        self.token_latency = token_latency
+        self.prefill_latency = prefill_latency
+        self.prompt_tokens = {}   # model -> tokens of its last prompt (the cached prefix)
+        self.requests = []
+        self.batch_sizes = []     # Prompts per /v1/completions request
+        self.tokens_sent = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/generate"
+
+    @property
+    def openai_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _prefill(self, payload):
+        """Returns (tokens evaluated, seconds spent) for this prompt and caches it."""
+        model = payload.get("model", "")
+        with self._lock:
+            tokens, fresh = new_tokens(self.prompt_tokens.get(model, ()), payload.get("prompt", ""))
+            self.prompt_tokens[model] = tokens
+        seconds = fresh * self.prefill_latency
+        if seconds:
+            time.sleep(seconds)
+        return fresh, seconds
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real server
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if self.path not in ("/api/generate", "/v1/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/v1/completions":
+                    self._completions(payload)
+                    return
+                with server._lock:
+                    server.requests.append(payload)
+                start = time.perf_counter()
+                if server.latency:
+                    time.sleep(server.latency)
+                prefill = server._prefill(payload)
+                text = server.responder(payload)
+                if payload.get("stream", True):
+                    self._stream(payload, text, start, prefill)
+                    return
+                body = json.dumps({
+                    "model": payload.get("model", ""),
+                    "response": text,
+                    "done": True,
+                    "prompt_eval_count": prefill[0],
+                    "prompt_eval_duration": int(prefill[1] * 1e9),
+                    "eval_count": len(text.split()),
+                    "total_duration": int((time.perf_counter() - start) * 1e9),
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, payload, text, start, prefill):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                tokens = re.findall(r"\s*\S+|\s+", text)
+                try:
+                    for token in tokens:
+                        if server.token_latency:
+                            time.sleep(server.token_latency)
+                        self._chunk({"model": payload.get("model", ""), "response": token, "done": False})
+                        with server._lock:
+                            server.tokens_sent += 1
+                    self._chunk({
+                        "model": payload.get("model", ""),
+                        "response": "",
+                        "done": True,
+                        "prompt_eval_count": prefill[0],
+                        "prompt_eval_duration": int(prefill[1] * 1e9),
+                        "eval_count": len(tokens),
+                        "total_duration": int((time.perf_counter() - start) * 1e9),
+                    })
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client hung up early; a real Ollama aborts generation here.
+                    with server._lock:
+                        server.cancelled += 1
+                    self.close_connection = True
+
+            def _completions(self, payload):
+                prompts = payload.get("prompt", "")
+                prompts = prompts if isinstance(prompts, list) else [prompts]
+                with server._lock:
+                    server.requests.append(payload)
+                    server.batch_sizes.append(len(prompts))
+                if server.latency:
+                    time.sleep(server.latency)  # One forward pass for the whole batch
+                texts = [server.responder(dict(payload, prompt=p)) for p in prompts]
+                if payload.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    try:
+                        for token in re.findall(r"\s*\S+|\s+", texts[0]):
+                            if server.token_latency:
+                                time.sleep(server.token_latency)
+                            self._sse({"choices": [{"index": 0, "text": token}]})
+                        self._sse("[DONE]")
+                        self.wfile.write(b"0\r\n\r\n")
+                    except (BrokenPipeError, ConnectionResetError):
+                        with server._lock:
+                            server.cancelled += 1
+                        self.close_connection = True
+                    return
+                body = json.dumps({
+                    "object": "text_completion",
+                    "model": payload.get("model", ""),
+                    "choices": [{"index": i, "text": t, "finish_reason": "stop"} for i, t in enumerate(texts)],
+                    "usage": {
+                        "prompt_tokens": sum(len(p.split()) for p in prompts),
+                        "completion_tokens": sum(len(t.split()) for t in texts),
+                    },
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _sse(self, obj):
+                data = b"data: " + (obj.encode() if isinstance(obj, str) else json.dumps(obj).encode()) + b"\n\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def _chunk(self, obj):
+                data = json.dumps(obj).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
@@ -0,0 +1,375 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+
+from llm_client import LLMError, LLMMetrics, MODEL_NAME, ROLE_MODELS, OllamaClient
+
+# --- CONFIGURATION ---
+OPENAI_URL = os.environ.get("AGENT_LLM_URL", "http://localhost:8000/v1")   # vLLM / llama.cpp server
+MAX_BATCH = 8            # Prompts per batched request
+MAX_WAIT = 0.005         # Seconds the batcher waits for more prompts to join a batch
+
+# --- BACKENDS ---
+# Every backend has the OllamaClient interface: generate(), stream(),
+# .model, .metrics, close(). Backends that can take several prompts in one
+# request also set supports_batch and implement generate_batch().
+
+
+class OpenAIClient(OllamaClient):
+    """
+    OpenAI-compatible /v1/completions (vLLM, llama.cpp server, LM Studio...).
+    Ollama-style options are translated; the prompt field takes a list, so
+    generate_batch() sends many prompts in one request.
+    """
+
+    name = "OpenAI-compatible server"
+    supports_batch = True
+
+    def __init__(self, url=OPENAI_URL, model=MODEL_NAME, api_key=None, **kwargs):
+        super().__init__(url=url.rstrip("/") + "/completions", model=model, **kwargs)
+        api_key = api_key or os.environ.get("AGENT_LLM_API_KEY")
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _payload(self, prompt, options, format, model):
+        options = options or {}
+        payload = {"model": model or self.model, "prompt": prompt}
+        for ours, theirs in (("temperature", "temperature"), ("top_p", "top_p"), ("seed", "seed"),
+                             ("stop", "stop"), ("num_predict", "max_tokens")):
+            if ours in options:
+                payload[theirs] = options[ours]
+        payload.setdefault("max_tokens", 1024)
+        if format == "json":
+            payload["response_format"] = {"type": "json_object"}  # Servers without it just ignore it
+        return payload
+
+    def generate(self, prompt, options=None, format=None, model=None):
+        return self.generate_batch([prompt], options=options, format=format, model=model)[0]
+
+    def generate_batch(self, prompts, options=None, format=None, model=None):
+        """One request for all prompts (same model and options); answers in prompt order."""
+        payload = self._payload(list(prompts), options, format, model)
+        start = time.perf_counter()
+        chars = sum(len(p) for p in prompts)
+        try:
+            body, retries = self._post(payload)
+        except LLMError as e:
+            self.metrics.record(ok=False, latency=time.perf_counter() - start, retries=e.attempts - 1,
+                                prompt_chars=chars, prompt_tokens=0, completion_tokens=0)
+            raise
+        choices = sorted(body.get("choices", []), key=lambda c: c.get("index", 0))
+        if len(choices) != len(prompts):
+            raise LLMError(f"{self.name} answered {len(choices)} of {len(prompts)} prompts")
+        usage = body.get("usage", {})
+        self.metrics.record(ok=True, latency=time.perf_counter() - start, retries=retries,
+                            prompt_chars=chars, prompt_tokens=usage.get("prompt_tokens", 0),
+                            completion_tokens=usage.get("completion_tokens", 0), batch=len(prompts))
+        return [c.get("text", "") for c in choices]
+
+    def stream(self, prompt, parser=None, options=None, format=None, model=None):
+        """Server-sent events; hangs up once the parser has what it needs."""
+        payload = dict(self._payload(prompt, options, format, model), stream=True)
+        start = time.perf_counter()
+        try:
+            resp, attempt = self._open_stream(payload)
+        except LLMError as e:
+            self.metrics.record(ok=False, latency=time.perf_counter() - start, retries=e.attempts - 1,
+                                prompt_chars=len(prompt), prompt_tokens=0, completion_tokens=0)
+            raise
+
+        pieces = []
+        ttft = None
+        cancelled = False
+        try:
+            for line in resp.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                piece = choices[0].get("text", "")
+                if piece and ttft is None:
+                    ttft = time.perf_counter() - start
+                pieces.append(piece)
+                if parser and parser.feed(piece):
+                    cancelled = True
+                    break
+        except (requests.RequestException, ValueError) as e:
+            raise LLMError(f"{self.name} stream broke off: {e}")
+        finally:
+            resp.close()
+
+        self.metrics.record(ok=True, latency=time.perf_counter() - start, retries=attempt,
+                            prompt_chars=len(prompt), prompt_tokens=0, completion_tokens=len(pieces),
+                            ttft=ttft, cancelled=cancelled)
+        return parser.result if cancelled else "".join(pieces)
+
+
+class FakeBackend:
+    """
+    In-process model for fleet and batching tests. responder is a callable
+    (prompt) -> str or a list of answers handed out in order. Requests are
+    served one at a time and each takes `latency` seconds, batched or not,
+    the way one forward pass of a GPU serves a whole batch.
+    """
+
+    supports_batch = True
+
+    def __init__(self, responder=None, latency=0.0, model=MODEL_NAME):
+        if responder is None:
+            responder = lambda prompt: "OK"
+        elif isinstance(responder, (list, tuple)):
+            responder = scripted(responder)
+        self.responder = responder
+        self.latency = latency
+        self.model = model
+        self.metrics = LLMMetrics()
+        self.batch_sizes = []
+        self._device = threading.Lock()
+
+    def generate(self, prompt, options=None, format=None, model=None):
+        return self.generate_batch([prompt], options=options, format=format, model=model)[0]
+
+    def generate_batch(self, prompts, options=None, format=None, model=None):
+        start = time.perf_counter()
+        with self._device:
+            if self.latency:
+                time.sleep(self.latency)
+        texts = [self.responder(prompt) for prompt in prompts]
+        self.batch_sizes.append(len(prompts))
+        self.metrics.record(ok=True, latency=time.perf_counter() - start, retries=0,
+                            prompt_chars=sum(len(p) for p in prompts),
+                            prompt_tokens=sum(len(p.split()) for p in prompts),
+                            completion_tokens=sum(len(t.split()) for t in texts), batch=len(prompts))
+        return texts
+
+    def stream(self, prompt, parser=None, options=None, format=None, model=None):
+        text = self.generate(prompt, options=options, format=format, model=model)
+        if parser:
+            for token in re.findall(r"\s*\S+|\s+", text):
+                if parser.feed(token):
+                    return parser.result
+        return text
+
+    def close(self):
+        pass
+
+
+# --- MICRO-BATCHING ---
+class MicroBatcher:
+    """
+    Coalesces concurrent generate() calls (many episodes thinking at once)
+    into batched requests. A call waits at most max_wait for company; calls
+    with the same model, options and format share one generate_batch().
+    Backends without batch support, and streams, pass straight through.
+    """
+
+    def __init__(self, backend, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = {"requests": 0, "batches": 0, "largest": 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._senders = ThreadPoolExecutor(max_workers=4, thread_name_prefix="llm-batch")
+        self._closed = False
+        self._thread = threading.Thread(target=self._collect, daemon=True)
+        self._thread.start()
+
+    @property
+    def metrics(self):
+        return self.backend.metrics
+
+    @metrics.setter
+    def metrics(self, value):
+        self.backend.metrics = value
+
+    @property
+    def model(self):
+        return self.backend.model
+
+    def generate(self, prompt, options=None, format=None, model=None):
+        if not getattr(self.backend, "supports_batch", False):
+            return self.backend.generate(prompt, options=options, format=format, model=model)
+        future = Future()
+        key = (model or self.backend.model, json.dumps(options or {}, sort_keys=True), format)
+        self._queue.put((key, prompt, future))
+        return future.result()
+
+    def stream(self, prompt, parser=None, options=None, format=None, model=None):
+        return self.backend.stream(prompt, parser=parser, options=options, format=format, model=model)
+
+    def _collect(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            pending = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # Finish this round, then stop
+                    break
+                pending.append(item)
+            groups = {}
+            for key, prompt, future in pending:
+                groups.setdefault(key, []).append((prompt, future))
+            for key, group in groups.items():
+                self._senders.submit(self._send, key, group)
+
+    def _send(self, key, group):
+        model, options, format = key
+        with self._lock:
+            self.stats["requests"] += len(group)
+            self.stats["batches"] += 1
+            self.stats["largest"] = max(self.stats["largest"], len(group))
+        try:
+            texts = self.backend.generate_batch([p for p, _ in group], options=json.loads(options),
+                                                format=format, model=model)
+        except Exception as e:
+            for _, future in group:
+                future.set_exception(e)
+            return
+        for (_, future), text in zip(group, texts):
+            future.set_result(text)
+
+    def average_batch(self):
+        return self.stats["requests"] / self.stats["batches"] if self.stats["batches"] else 0.0
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+            self._senders.shutdown(wait=True)
+        self.backend.close()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+# --- ROUTING ---
+class Router:
+    """
+    Sends each call to a backend chosen by model name, e.g. a small local
+    model on Ollama for navigation and the coder model on a vLLM box for
+    patches: Router({"ollama": OllamaClient(), "vllm": OpenAIClient(...)},
+    routes={"qwen2.5-coder:1.5b": "ollama"}, default="vllm").
+    All backends record into one shared LLMMetrics.
+    """
+
+    def __init__(self, backends, routes=None, default=None):
+        self.backends = dict(backends)
+        self.routes = dict(routes or {})
+        self.default = default or next(iter(self.backends))
+        self.metrics = LLMMetrics()
+        for backend in self.backends.values():
+            backend.metrics = self.metrics
+
+    @property
+    def model(self):
+        return self.backends[self.default].model
+
+    def backend_for(self, model):
+        return self.backends[self.routes.get(model, self.default)]
+
+    def generate(self, prompt, options=None, format=None, model=None):
+        return self.backend_for(model).generate(prompt, options=options, format=format, model=model)
+
+    def stream(self, prompt, parser=None, options=None, format=None, model=None):
+        return self.backend_for(model).stream(prompt, parser=parser, options=options, format=format, model=model)
+
+    def close(self):
+        for backend in self.backends.values():
+            backend.close()
+
+
+def make_backend(kind, url=None, model=MODEL_NAME):
+    if kind == "ollama":
+        return OllamaClient(url=url or os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate"),
+                            model=model)
+    if kind == "openai":
+        return OpenAIClient(url=url or OPENAI_URL, model=model)
+    if kind == "fake":
+        return FakeBackend(model=model)
+    raise ValueError(f"Unknown model backend {kind!r} (expected ollama, openai or fake)")
+
+
+def from_env():
+    """
+    AGENT_LLM_BACKEND=ollama|openai|fake, AGENT_LLM_URL=..., AGENT_LLM_BATCH=8
+    (max prompts per batch; batching is off when unset).
+
+    AGENT_LLM_NAVIGATE_BACKEND / _URL and AGENT_LLM_PATCH_BACKEND / _URL
+    send one role's model (llm_client.ROLE_MODELS) to a server of its own;
+    the client is then a Router. E.g. patches on a vLLM box, the rest local:
+
+        AGENT_MODEL_PATCH=Qwen/Qwen2.5-Coder-7B AGENT_LLM_PATCH_BACKEND=openai
+        AGENT_LLM_PATCH_URL=http://gpu-box:8000/v1
+    """
+    kind = os.environ.get("AGENT_LLM_BACKEND", "ollama")
+    url = os.environ.get("AGENT_LLM_URL")
+    batch = int(os.environ.get("AGENT_LLM_BATCH", "0") or 0)
+
+    def build(kind, url, model=MODEL_NAME):
+        backend = make_backend(kind, url, model)
+        return MicroBatcher(backend, max_batch=batch) if batch > 1 else backend
+
+    targets = {}   # model -> (kind, url)
+    for role, model in ROLE_MODELS.items():
+        prefix = f"AGENT_LLM_{role.upper()}_"
+        target = (os.environ.get(prefix + "BACKEND", kind), os.environ.get(prefix + "URL", url))
+        if targets.setdefault(model, target) != target:
+            raise ValueError(f"Two roles use the model {model!r} but different backends: give them "
+                             f"different model names (AGENT_MODEL_{role.upper()}=...)")
+    routed = {model: target for model, target in targets.items() if target != (kind, url)}
+    if not routed:
+        return build(kind, url)
+    backends = {"default": build(kind, url)}
+    for model, target in routed.items():
+        backends[model] = build(*target, model=model)
+    return Router(backends, routes={model: model for model in routed}, default="default")
+
+
+def scripted(responses):
+    """A responder handing out responses in order; the last one repeats once they run out."""
+    responses = list(responses)
+    lock = threading.Lock()
+    state = {"i": 0}
+
+    def responder(payload):
+        with lock:
+            i = min(state["i"], len(responses) - 1)
+            state["i"] += 1
+        return responses[i]
+
+    return responder
+
+
+if __name__ == "__main__":
+    # Fleet throughput: 32 episodes thinking at once against a model that takes
+    # 100 ms per request regardless of batch size.
+    n = 32
+    for label, client in (("unbatched", FakeBackend(latency=0.1)),
+                          ("micro-batched", MicroBatcher(FakeBackend(latency=0.1)))):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            list(pool.map(lambda i: client.generate(f"step {i}"), range(n)))
+        elapsed = time.perf_counter() - start
+        print(f"{label:<14}: {n / elapsed:6.1f} calls/s, {len(client.metrics.calls)} model requests")
+        client.close()
+
@@ -0,0 +1,139 @@
+import collections
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# --- CONFIGURATION ---
+MAX_ENTRIES = 1024        # In-memory LRU size
+TTL = 7 * 24 * 3600       # Seconds before a cached answer is considered stale
+MAX_DISK_ENTRIES = 100000
+
+
+class CachedLLM:
+    """
+    Content-addressed cache in front of an OllamaClient. Same generate() /
+    stream() interface, so it drops into any agent as llm=CachedLLM(client).
+
+    Key = sha256(model + options + format + prompt). Only deterministic calls
+    (temperature == 0) are cached; anything else goes straight to the model.
+    Tier 1 is an in-memory LRU, tier 2 an optional SQLite file that survives
+    across processes (regression replays).
+    """
+
+    def __init__(self, client, max_entries=MAX_ENTRIES, ttl=TTL, db_path=None, max_disk_entries=MAX_DISK_ENTRIES):
+        self.client = client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0}
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses "
+                             "(key TEXT PRIMARY KEY, response TEXT, created REAL)")
+            self._db.commit()
+
+    # --- Client interface ---
+    def generate(self, prompt, options=None, format=None, model=None):
+        return self._cached("generate", prompt, options, format, model,
+                            lambda: self.client.generate(prompt, options=options, format=format, model=model))
+
+    def stream(self, prompt, parser=None, options=None, format=None, model=None):
+        # A parser can cut a stream short, so the parser type is part of the key
+        kind = "stream:" + (type(parser).__name__ if parser else "")
+        return self._cached(kind, prompt, options, format, model,
+                            lambda: self.client.stream(prompt, parser=parser, options=options,
+                                                       format=format, model=model))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    # --- Cache ---
+    def key(self, kind, prompt, options, format, model):
+        blob = json.dumps({
+            "kind": kind,
+            "model": model or self.client.model,
+            "options": options or {},
+            "format": format,
+            "prompt": prompt,
+        }, sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _cached(self, kind, prompt, options, format, model, call):
+        if (options or {}).get("temperature", 0.8) != 0:  # Ollama's default temperature is 0.8
+            self._count("bypassed")
+            return call()
+
+        key = self.key(kind, prompt, options, format, model)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[0]
+            if entry:
+                del self._memory[key]
+
+        response = self._disk_get(key, now)
+        if response is not None:
+            self._count("disk_hits")
+            self._remember(key, response, now)
+            return response
+
+        self._count("misses")
+        response = call()
+        self._remember(key, response, now)
+        self._disk_put(key, response, now)
+        return response
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _remember(self, key, response, now):
+        with self._lock:
+            self._memory[key] = (response, now)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key, now):
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row and now - row[1] <= self.ttl:
+            return row[0]
+        return None
+
+    def _disk_put(self, key, response, now):
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, response, now))
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._db.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                             "ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,))
+            self._db.commit()
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
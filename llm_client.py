@@ -0,0 +1,308 @@
+import collections
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- CONFIGURATION ---
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
+MODEL_NAME = os.environ.get("AGENT_MODEL", "qwen2.5-coder:7b")
+CONNECT_TIMEOUT = 5.0     # Seconds to open the TCP connection
+READ_TIMEOUT = 300.0      # Seconds to wait for a completion (7B models are slow)
+MAX_RETRIES = 3
+BACKOFF = 0.5             # Sleep BACKOFF * 2**attempt between retries
+MAX_CALLS = 10000         # Calls LLMMetrics keeps; the shared client lives as long as a whole suite run
+# How long Ollama keeps the model (and its prompt KV cache) loaded after a
+# call. The default 5m unloads it between slow episodes; every reload starts
+# with a cold prefix cache.
+KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+# Which model each kind of step uses. A small model can pick the next file to
+# read; the coder model writes the patch. AGENT_LLM_<ROLE>_BACKEND / _URL send
+# them to different servers through a Router (llm_backends.from_env).
+ROLE_MODELS = {
+    "navigate": os.environ.get("AGENT_MODEL_NAVIGATE", MODEL_NAME),
+    "patch": os.environ.get("AGENT_MODEL_PATCH", MODEL_NAME),
+}
+# Any of these set: get_client() builds the client with llm_backends.from_env()
+BACKEND_ENV = ("AGENT_LLM_BACKEND", "AGENT_LLM_BATCH", "AGENT_LLM_NAVIGATE_BACKEND", "AGENT_LLM_NAVIGATE_URL",
+               "AGENT_LLM_PATCH_BACKEND", "AGENT_LLM_PATCH_URL")
+
+
+class LLMError(Exception):
+    def __init__(self, message, attempts=1):
+        super().__init__(message)
+        self.attempts = attempts
+
+
+class LLMMetrics:
+    """
+    Per-call latency and token counts, safe to share between threads. Only
+    the last max_calls calls are kept, so summaries cover at most those.
+    """
+
+    def __init__(self, max_calls=MAX_CALLS):
+        self.calls = collections.deque(maxlen=max_calls)
+        self.total = 0  # Calls ever recorded, kept or not
+        self._lock = threading.Lock()
+
+    def record(self, **call):
+        with self._lock:
+            self.calls.append(call)
+            self.total += 1
+
+    def mark(self):
+        with self._lock:
+            return self.total
+
+    def summary(self, since=0):
+        """Aggregate over the calls made after mark() returned since, e.g. just those of one attempt."""
+        with self._lock:
+            calls = list(self.calls)[max(0, len(self.calls) - (self.total - since)):]
+        ok = [c for c in calls if c["ok"]]
+        latencies = sorted(c["latency"] for c in ok)
+        ttfts = [c["ttft"] for c in ok if c.get("ttft") is not None]
+        prefills = [c["prompt_eval"] for c in ok if c.get("prompt_eval") is not None]
+        return {
+            "calls": len(calls),
+            "failed": len(calls) - len(ok),
+            "retries": sum(c["retries"] for c in calls),
+            "prompt_tokens": sum(c["prompt_tokens"] for c in ok),
+            "completion_tokens": sum(c["completion_tokens"] for c in ok),
+            "latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+            "latency_max": latencies[-1] if latencies else 0.0,
+            "ttft_avg": sum(ttfts) / len(ttfts) if ttfts else 0.0,
+            "prompt_eval_total": sum(prefills),   # Seconds the server spent on prefill
+            "prompt_eval_avg": sum(prefills) / len(prefills) if prefills else 0.0,
+            "cancelled": sum(1 for c in ok if c.get("cancelled")),
+        }
+
+
+class OllamaClient:
+    """
+    Shared client for /api/generate. One keep-alive requests.Session means one
+    TCP connection per worker thread instead of one per reasoning step.
+    """
+
+    name = "Ollama"
+    supports_batch = False  # One prompt per /api/generate request
+
+    def __init__(self, url=OLLAMA_URL, model=MODEL_NAME, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES, backoff=BACKOFF, pool_size=10,
+                 keep_alive=KEEP_ALIVE):
+        self.url = url
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.metrics = LLMMetrics()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate(self, prompt, options=None, format=None, model=None):
+        """Return the completion text. Raises LLMError once the retries are used up."""
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": False,
+            "options": options or {},
+            "keep_alive": self.keep_alive,
+        }
+        if format:
+            payload["format"] = format
+        return self.generate_raw(payload)["response"]
+
+    def generate_raw(self, payload):
+        """POST a full payload and return Ollama's decoded JSON body."""
+        start = time.perf_counter()
+        try:
+            body, retries = self._post(payload)
+        except LLMError as e:
+            self.metrics.record(ok=False, latency=time.perf_counter() - start, retries=e.attempts - 1,
+                                prompt_chars=len(payload.get("prompt", "")),
+                                prompt_tokens=0, completion_tokens=0)
+            raise
+        self.metrics.record(
+            ok=True,
+            latency=time.perf_counter() - start,
+            retries=retries,
+            prompt_chars=len(payload.get("prompt", "")),
+            prompt_tokens=body.get("prompt_eval_count", 0),
+            completion_tokens=body.get("eval_count", 0),
+            prompt_eval=_seconds(body.get("prompt_eval_duration")),
+        )
+        return body
+
+    def _post(self, payload):
+        """POST with retries on connection errors and 5xx. Returns (decoded body, retries used)."""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                resp = self.session.post(self.url, json=payload, timeout=self.timeout)
+                if resp.status_code >= 500:
+                    raise LLMError(f"{self.name} returned HTTP {resp.status_code}")
+                resp.raise_for_status()
+                return resp.json(), attempt
+            except (requests.ConnectionError, requests.Timeout, LLMError) as e:
+                last_error = e
+                continue
+            except (requests.RequestException, ValueError) as e:
+                # 4xx or a garbled body will not get better on retry
+                last_error = e
+                break
+        raise LLMError(f"{self.name} request failed after {attempt + 1} attempts: {last_error}", attempt + 1)
+
+    def _open_stream(self, payload):
+        """Like _post, but returns (open streaming response, retries used)."""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                resp = self.session.post(self.url, json=payload, timeout=self.timeout, stream=True)
+                if resp.status_code >= 500:
+                    resp.close()
+                    raise LLMError(f"{self.name} returned HTTP {resp.status_code}")
+                resp.raise_for_status()
+                return resp, attempt
+            except (requests.ConnectionError, requests.Timeout, LLMError) as e:
+                last_error = e
+            except requests.RequestException as e:
+                last_error = e
+                break
+        raise LLMError(f"{self.name} request failed after {attempt + 1} attempts: {last_error}", attempt + 1)
+
+    def stream(self, prompt, parser=None, options=None, format=None, model=None):
+        """
+        Consume Ollama's NDJSON stream chunk by chunk. When parser.feed() reports
+        the action is complete the connection is closed, which makes Ollama stop
+        generating. Returns parser.result if it finished early, else the full text.
+        """
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": options or {},
+            "keep_alive": self.keep_alive,
+        }
+        if format:
+            payload["format"] = format
+
+        start = time.perf_counter()
+        try:
+            resp, attempt = self._open_stream(payload)
+        except LLMError as e:
+            self.metrics.record(ok=False, latency=time.perf_counter() - start, retries=e.attempts - 1,
+                                prompt_chars=len(prompt), prompt_tokens=0, completion_tokens=0)
+            raise
+
+        pieces = []
+        ttft = None
+        final = {}
+        cancelled = False
+        try:
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                piece = chunk.get("response", "")
+                if piece and ttft is None:
+                    ttft = time.perf_counter() - start
+                pieces.append(piece)
+                if chunk.get("done"):
+                    final = chunk
+                    break
+                if parser and parser.feed(piece):
+                    cancelled = True
+                    break
+        except (requests.RequestException, ValueError) as e:
+            self.metrics.record(ok=False, latency=time.perf_counter() - start, retries=attempt,
+                                prompt_chars=len(prompt), prompt_tokens=0, completion_tokens=0)
+            raise LLMError(f"Ollama stream broke off: {e}")
+        finally:
+            resp.close()
+
+        self.metrics.record(
+            ok=True,
+            latency=time.perf_counter() - start,
+            retries=attempt,
+            prompt_chars=len(prompt),
+            prompt_tokens=final.get("prompt_eval_count", 0),
+            completion_tokens=final.get("eval_count", len(pieces)),
+            ttft=ttft,
+            cancelled=cancelled,
+            prompt_eval=_seconds(final.get("prompt_eval_duration")),
+        )
+        if cancelled:
+            return parser.result
+        return "".join(pieces)
+
+    def close(self):
+        self.session.close()
+
+
+def _seconds(nanoseconds):
+    return nanoseconds / 1e9 if nanoseconds is not None else None
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """
+    The process-wide client every agent shares unless it is handed its own.
+    AGENT_LLM_BACKEND=openai|fake, batching and per-role backends (see
+    llm_backends.from_env) swap the single Ollama client out.
+    AGENT_LLM_CACHE=1 puts a CachedLLM (llm_cache) in front of it; a file
+    path instead of 1 keeps the answers in that SQLite file as well.
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            if any(os.environ.get(name) for name in BACKEND_ENV):
+                from llm_backends import from_env
+                client = from_env()
+            else:
+                client = OllamaClient()
+            cache = os.environ.get("AGENT_LLM_CACHE")
+            if cache:
+                from llm_cache import CachedLLM
+                client = CachedLLM(client, db_path=None if cache in ("1", "memory") else cache)
+            _default_client = client
+        return _default_client
+
+
+if __name__ == "__main__":
+    # Offline benchmark: fresh connection per call (the old requests.post path)
+    # versus the pooled session, both against the fake Ollama server.
+    from fake_ollama import FakeOllamaServer
+
+    n = 200
+    with FakeOllamaServer() as server:
+        payload = {"model": MODEL_NAME, "prompt": "ping", "stream": False, "options": {}}
+
+        start = time.perf_counter()
+        for _ in range(n):
+            requests.post(server.url, json=payload).json()
+        cold = time.perf_counter() - start
+
+        client = OllamaClient(url=server.url)
+        start = time.perf_counter()
+        for _ in range(n):
+            client.generate("ping")
+        warm = time.perf_counter() - start
+
+    print(f"requests.post : {cold / n * 1000:.2f} ms/call")
+    print(f"OllamaClient  : {warm / n * 1000:.2f} ms/call")
+    print(f"metrics       : {client.metrics.summary()}")
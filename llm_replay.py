@@ -0,0 +1,98 @@
+import json
+import re
+import threading
+import time
+
+from llm_client import LLMMetrics, MODEL_NAME
+
+# --- RECORD / REPLAY ---
+# Deterministic stand-ins for OllamaClient. RecordingLLM sits in front of a
+# real client and saves every answer to a fixture file; ReplayLLM plays a
+# fixture back in-process, with no server and no network.
+
+
+class ReplayLLM:
+    """
+    Hands out recorded responses in order (the last one repeats once the
+    script runs out). With realtime=True each call sleeps for the latency that
+    was recorded with it, so end-to-end timings resemble the live run.
+    """
+
+    def __init__(self, responses, latencies=None, realtime=False, model=MODEL_NAME):
+        self.responses = list(responses)
+        self.latencies = list(latencies or [])
+        self.realtime = realtime
+        self.model = model
+        self.metrics = LLMMetrics()
+        self.prompts = []
+        self.call_times = []    # perf_counter() at the start of each call, for per-step timing
+        self._index = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, realtime=False):
+        with open(path) as fh:
+            fixture = json.load(fh)
+        return cls(fixture["responses"], fixture.get("latencies"), realtime=realtime)
+
+    def _next(self, prompt):
+        with self._lock:
+            i = min(self._index, len(self.responses) - 1)
+            self._index += 1
+            self.prompts.append(prompt)
+            self.call_times.append(time.perf_counter())
+        if self.realtime and i < len(self.latencies):
+            time.sleep(self.latencies[i])
+        return self.responses[i]
+
+    def generate(self, prompt, options=None, format=None, model=None):
+        start = time.perf_counter()
+        text = self._next(prompt)
+        self._record(prompt, text, start)
+        return text
+
+    def stream(self, prompt, parser=None, options=None, format=None, model=None):
+        start = time.perf_counter()
+        text = self._next(prompt)
+        cancelled = False
+        if parser:
+            # Same chunking as the fake server: one whitespace-delimited token at a time
+            for token in re.findall(r"\s*\S+|\s+", text):
+                if parser.feed(token):
+                    cancelled = True
+                    break
+        self._record(prompt, parser.result if cancelled else text, start, cancelled)
+        return parser.result if cancelled else text
+
+    def _record(self, prompt, text, start, cancelled=False):
+        self.metrics.record(ok=True, latency=time.perf_counter() - start, retries=0,
+                            prompt_chars=len(prompt), prompt_tokens=len(prompt.split()),
+                            completion_tokens=len(text.split()), cancelled=cancelled)
+
+
+class RecordingLLM:
+    """Wraps a live client and writes every response (and its latency) to a fixture."""
+
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self.fixture = {"responses": [], "latencies": []}
+
+    def generate(self, prompt, options=None, format=None, model=None):
+        start = time.perf_counter()
+        text = self.client.generate(prompt, options=options, format=format, model=model)
+        self._save(text, time.perf_counter() - start)
+        return text
+
+    def stream(self, prompt, parser=None, options=None, format=None, model=None):
+        # Record the full completion so the fixture works with or without a parser
+        return self.generate(prompt, options=options, format=format, model=model)
+
+    def _save(self, text, latency):
+        self.fixture["responses"].append(text)
+        self.fixture["latencies"].append(round(latency, 4))
+        with open(self.path, "w") as fh:
+            json.dump(self.fixture, fh, indent=2)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
@@ -0,0 +1,139 @@
+import ast
+import re
+
+# --- PATCH FORMATS ---
+# A fix usually touches a line or two, but asking the model for the whole
+# corrected file makes it regenerate (and us transfer) every line. These
+# helpers apply the two compact formats models produce reliably:
+#
+#   <<<<<<< SEARCH            --- a/utils.py
+#   return price - quantity   +++ b/utils.py
+#   =======                   @@ -2,2 +2,2 @@
+#   return price * quantity    def calculate_price(price, quantity):
+#   >>>>>>> REPLACE           -    return price - quantity
+#                             +    return price * quantity
+#
+# Anything that does not apply cleanly raises PatchError, so the caller can
+# fall back to a full-file write.
+
+SEARCH_REPLACE = re.compile(r"^<{5,9} ?SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} ?REPLACE", re.S | re.M)
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+class PatchError(ValueError):
+    pass
+
+
+def is_patch(text):
+    return bool(SEARCH_REPLACE.search(text) or re.search(HUNK_HEADER.pattern, text, re.M))
+
+
+def apply_patch(original, patch, path=""):
+    """
+    Apply search/replace blocks or a unified diff to `original`. For .py files
+    the result must still parse. Raises PatchError if anything does not apply.
+    """
+    blocks = SEARCH_REPLACE.findall(patch)
+    if blocks:
+        patched = apply_edits(original, blocks)
+    elif re.search(HUNK_HEADER.pattern, patch, re.M):
+        patched = apply_unified_diff(original, patch)
+    else:
+        raise PatchError("no SEARCH/REPLACE block or @@ hunk found")
+    if path.endswith(".py"):
+        try:
+            ast.parse(patched)
+        except SyntaxError as e:
+            raise PatchError(f"patched file does not parse (line {e.lineno}: {e.msg})")
+    return patched
+
+
+def apply_edits(original, edits):
+    """edits: [(search, replace)]; each search must match exactly one place."""
+    text = original
+    for search, replace in edits:
+        if not search.strip():
+            raise PatchError("empty SEARCH block")
+        count = text.count(search)
+        if count == 1:
+            text = text.replace(search, replace, 1)
+            continue
+        if count > 1:
+            raise PatchError(f"SEARCH block matches {count} places: {_first_line(search)!r}")
+        text = _replace_lines_loosely(text, search, replace)
+    return text
+
+
+def _replace_lines_loosely(text, search, replace):
+    """Retry a SEARCH block ignoring indentation and trailing whitespace."""
+    lines = text.splitlines(keepends=True)
+    wanted = [l.strip() for l in search.strip("\n").splitlines()]
+    n = len(wanted)
+    hits = [i for i in range(len(lines) - n + 1) if [l.strip() for l in lines[i:i + n]] == wanted]
+    if len(hits) != 1:
+        problem = "not found" if not hits else f"matches {len(hits)} places"
+        raise PatchError(f"SEARCH block {problem}: {_first_line(search)!r}")
+    i = hits[0]
+    # Re-indent the replacement the way the matched block was indented
+    found_indent = _indent(lines[i])
+    given_indent = _indent(search.strip("\n").splitlines()[0])
+    new_lines = []
+    for line in replace.strip("\n").splitlines():
+        if line.startswith(given_indent):
+            line = found_indent + line[len(given_indent):]
+        new_lines.append(line + "\n")
+    if replace.strip("\n") == "":
+        new_lines = []
+    return "".join(lines[:i] + new_lines + lines[i + n:])
+
+
+def apply_unified_diff(original, diff):
+    lines = original.splitlines(keepends=True)
+    offset = 0
+    for start, old, new in _hunks(diff):
+        at = _locate(lines, old, start - 1 + offset)
+        if at is None:
+            raise PatchError(f"hunk at line {start} does not match the file")
+        lines[at:at + len(old)] = new
+        offset += len(new) - len(old)
+    return "".join(lines)
+
+
+def _hunks(diff):
+    hunk = None
+    for line in diff.splitlines():
+        header = HUNK_HEADER.match(line)
+        if header:
+            if hunk:
+                yield hunk
+            hunk = (int(header.group(1)), [], [])
+            continue
+        if hunk is None or line.startswith(("---", "+++", "\\")):
+            continue
+        tag, body = (line[0], line[1:]) if line else (" ", "")
+        if tag in " -":
+            hunk[1].append(body + "\n")
+        if tag in " +":
+            hunk[2].append(body + "\n")
+    if hunk:
+        yield hunk
+
+
+def _locate(lines, old, expected):
+    """Position of the hunk's old lines closest to where the header says they are."""
+    if not old:
+        return max(0, min(expected + 1, len(lines)))
+    norm = [l.rstrip() for l in old]
+    hits = [i for i in range(len(lines) - len(old) + 1)
+            if [l.rstrip() for l in lines[i:i + len(old)]] == norm]
+    if not hits:
+        return None
+    return min(hits, key=lambda i: abs(i - expected))
+
+
+def _indent(line):
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _first_line(text):
+    return text.strip().splitlines()[0][:60] if text.strip() else ""
@@ -0,0 +1,127 @@
+import posixpath
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import tracer
+
+# --- CONFIGURATION ---
+MAX_SPECULATIVE = 4     # Reads started per think()
+WORKERS = 2
+
+TRACEBACK_FILE = re.compile(r'File "([^"]+\.py)", line')
+SCRIPT = re.compile(r"(\S+\.py)\b")
+
+
+class Prefetcher:
+    """
+    Uses the sandbox while think() waits on the model. Before each model call
+    the agent hands over the last results; speculate() guesses the reads the
+    model is about to ask for (files in the traceback, the test script and
+    the modules it imports, ls of its directory) and runs them on a small
+    thread pool. ToolRegistry.dispatch() asks take() first, so a correct guess
+    costs nothing by the time the model answers.
+
+    Every prefetch is tagged with the workspace digest it was taken at; a
+    write clears the buffer, and anything older than the current digest is
+    thrown away rather than served.
+    """
+
+    def __init__(self, ctx, registry, workers=WORKERS, max_speculative=MAX_SPECULATIVE):
+        self.ctx = ctx
+        self.registry = registry
+        self.max_speculative = max_speculative
+        self.stats = {"issued": 0, "hits": 0, "misses": 0, "discarded": 0}
+        self._buffer = {}       # key -> (workspace digest, Future)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    # --- Prediction ---
+    def predict(self, results):
+        """Likely next reads given the last [(ToolCall, ToolResult)]."""
+        ctx = self.ctx
+        known = ctx.workspace.contents
+        script = SCRIPT.search(ctx.test_cmd)
+        script = script.group(1) if script else None
+        wanted = []
+
+        for call, result in results:
+            # After a failure, the files named in the traceback come first
+            if result.exit_code not in (0, None):
+                for path in TRACEBACK_FILE.findall(result.output):
+                    if path in known:
+                        wanted.append(("read_file", path))
+        if script:
+            wanted.append(("read_file", script))
+            folder = posixpath.dirname(script)
+            imports = ctx.index.imports.get(script, []) if ctx.index is not None else []
+            for name in imports:
+                path = posixpath.join(folder, name.replace(".", "/") + ".py")
+                if path in known:
+                    wanted.append(("read_file", path))
+            wanted.append(("list_files", folder))
+
+        calls = []
+        for name, path in dict.fromkeys(wanted):
+            calls.append(self.registry.parse_json({"action": name, "path": path}))
+        return calls[:self.max_speculative]
+
+    def speculate(self, results=()):
+        """Start prefetching for the next step; returns immediately."""
+        digest = self.ctx.workspace.digest()
+        parent = tracer.current()
+        for call in self.predict(results):
+            try:
+                tool, args = self.registry.validate(call, self.ctx)
+            except ValueError:
+                continue
+            if not tool.read_only or tool.barrier:
+                continue
+            key = _key(call.name, args)
+            with self._lock:
+                entry = self._buffer.get(key)
+                if entry and entry[0] == digest:
+                    continue
+                future = self._pool.submit(self._run, tool, args, parent)
+                self._buffer[key] = (digest, future)
+                self.stats["issued"] += 1
+
+    def _run(self, tool, args, parent):
+        with tracer.span(f"prefetch.{tool.name}", parent=parent, path=args.get("path", "")):
+            return tool.handler(self.ctx, **args)
+
+    # --- Serving ---
+    def take(self, name, args):
+        """The prefetched result for this call, or None."""
+        key = _key(name, args)
+        with self._lock:
+            entry = self._buffer.pop(key, None)
+            if entry is None or entry[0] != self.ctx.workspace.digest():
+                self.stats["misses"] += 1
+                if entry is not None:
+                    self.stats["discarded"] += 1
+                return None
+            self.stats["hits"] += 1
+        try:
+            return entry[1].result()   # Usually done long ago; otherwise wait the remainder
+        except Exception:
+            return None
+
+    def invalidate(self):
+        """The workspace changed: nothing in the buffer may be served any more."""
+        with self._lock:
+            self.stats["discarded"] += len(self._buffer)
+            self._buffer.clear()
+
+    def hit_rate(self):
+        return self.stats["hits"] / self.stats["issued"] if self.stats["issued"] else 0.0
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        with self._lock:
+            self.stats["discarded"] += len(self._buffer)  # Never asked for
+            self._buffer.clear()
+
+
+def _key(name, args):
+    return name, tuple(sorted(args.items()))
@@ -0,0 +1,83 @@
+import os
+import re
+import textwrap
+
+# --- PROMPT LAYOUT ---
+# llama.cpp (and so Ollama) keeps the KV cache of the last prompt a model
+# slot processed and only prefills the tokens after the longest common
+# prefix with the new one. A prompt whose changing part sits in the middle
+# throws that away: everything after the first difference is evaluated again,
+# tool docs and instructions included. PromptLayout puts the text that never
+# changes first, the per-episode text next and the per-step history last, so
+# a step only pays for the history it added.
+
+TOKEN = re.compile(r"\s*\S+|\s+")
+
+
+class PromptLayout:
+    """
+    prefix: static text (tool docs, instructions, examples), dedented and
+    built once. render(*parts) appends the dynamic parts in order, stable
+    ones first, then the optional fixed suffix (kept short: it is re-evaluated
+    every step).
+    """
+
+    def __init__(self, prefix, suffix=""):
+        self.prefix = textwrap.dedent(prefix).lstrip("\n")
+        self.suffix = textwrap.dedent(suffix)
+
+    def render(self, *parts):
+        return self.prefix + "\n\n".join(parts) + self.suffix
+
+
+def shared_prefix(previous, prompt):
+    """Characters of `prompt` a prefix cache holding `previous` would not re-evaluate."""
+    return len(os.path.commonprefix([previous, prompt]))
+
+
+def new_tokens(previous_tokens, prompt):
+    """(tokens of prompt, how many of them come after the prefix shared with previous_tokens)."""
+    tokens = TOKEN.findall(prompt)
+    shared = 0
+    for old, new in zip(previous_tokens, tokens):
+        if old != new:
+            break
+        shared += 1
+    return tokens, len(tokens) - shared
+
+
+def report_prefill(llm, mark):
+    """Print the prompt-eval time of the calls made since llm.metrics.mark(); returns it in ms."""
+    cost = llm.metrics.summary(since=mark)
+    if not cost["prompt_eval_total"]:
+        return None  # The backend does not report it (OpenAI-style servers, replays)
+    ms = cost["prompt_eval_total"] * 1000
+    print(f"   [Prefill]: {ms:.0f} ms for {cost['prompt_tokens']} new prompt tokens")
+    return round(ms, 1)
+
+
+if __name__ == "__main__":
+    # Prompt-eval time per step, old layout (history in the middle) versus
+    # new (history last), against the fake server's prefix-cache emulation.
+    from context_builder import ContextBuilder
+    from fake_ollama import FakeOllamaServer
+    from llm_client import OllamaClient
+    from agi_agent_v4 import PROMPT
+
+    schema, instructions = PROMPT.prefix.split("INSTRUCTIONS:")
+    instructions = "INSTRUCTIONS:" + instructions.split("HISTORY:")[0]
+    old_layout = lambda history: f"{schema}HISTORY:\n{history}\n\n{instructions}"
+
+    steps = 8
+    for name, layout in (("history in the middle", old_layout), ("history last", PROMPT.render)):
+        history = ContextBuilder(max_tokens=3000, style="json")
+        with FakeOllamaServer(responder=lambda payload: "{}", prefill_latency=0.0005) as server:
+            client = OllamaClient(url=server.url)
+            per_step = []
+            for step in range(steps):
+                mark = client.metrics.mark()
+                client.generate(layout(history.render()), format="json")
+                per_step.append(client.metrics.summary(since=mark)["prompt_eval_total"])
+                history.record("run_test", "", f"Traceback line {step}\nAssertionError: step {step}", 1)
+        print(f"{name:22s}: " + " ".join(f"{s * 1000:5.0f}" for s in per_step)
+              + f"  ms/step, total {sum(per_step) * 1000:.0f} ms")
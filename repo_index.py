@@ -0,0 +1,171 @@
+import ast
+import collections
+
+from sandbox_fs import read_tree
+
+# --- CONFIGURATION ---
+MAX_SNIPPET_LINES = 60   # A definition longer than this is clipped
+MAX_MATCHES = 8          # Results returned per lookup
+
+Symbol = collections.namedtuple("Symbol", "name qualname kind path lineno end_lineno")
+CallSite = collections.namedtuple("CallSite", "path caller lineno")
+
+
+class RepoIndex:
+    """
+    Symbol, import and call-graph index of the Python files in a sandbox.
+
+    Built once per episode (from the seed files, or with one get_archive of
+    the project root), then kept current with update() on every write, which
+    re-parses only the file that changed. Lookups are dict hits, so
+    "where is calculate_price defined" costs microseconds instead of a model
+    step spent on ls -R and another on cat.
+
+    The call graph is name-based: a call to x.calculate_price() counts as a
+    caller of every calculate_price. Cheap, and good enough to point the model
+    at the right file.
+    """
+
+    def __init__(self, files=None):
+        self.sources = {}                              # path -> list of lines
+        self.symbols = collections.defaultdict(list)   # name -> [Symbol]
+        self.calls = collections.defaultdict(list)     # callee name -> [CallSite]
+        self.imports = {}                              # path -> [imported module or name]
+        self.errors = {}                               # path -> SyntaxError text
+        self._by_path = {}                             # path -> (symbol names, callee names)
+        for path, source in (files or {}).items():
+            self.update(path, source)
+
+    @classmethod
+    def from_container(cls, container, root="/app"):
+        return cls(read_tree(container, root, suffix=".py"))
+
+    # --- Maintenance ---
+    def update(self, path, source):
+        """(Re)index one file. Non-Python files are ignored."""
+        if not path.endswith(".py"):
+            return
+        self.remove(path)
+        self.sources[path] = source.splitlines()
+        try:
+            tree = ast.parse(source, filename=path)
+        except SyntaxError as e:
+            self.errors[path] = f"line {e.lineno}: {e.msg}"
+            self._by_path[path] = ((), ())
+            return
+        visitor = _Indexer(path)
+        visitor.visit(tree)
+        for symbol in visitor.symbols:
+            self.symbols[symbol.name].append(symbol)
+        for name, site in visitor.calls:
+            self.calls[name].append(site)
+        self.imports[path] = visitor.imports
+        self._by_path[path] = ({s.name for s in visitor.symbols}, {name for name, _ in visitor.calls})
+
+    def remove(self, path):
+        names, callees = self._by_path.pop(path, ((), ()))
+        for name in names:
+            self.symbols[name] = [s for s in self.symbols[name] if s.path != path]
+            if not self.symbols[name]:
+                del self.symbols[name]
+        for name in callees:
+            self.calls[name] = [c for c in self.calls[name] if c.path != path]
+            if not self.calls[name]:
+                del self.calls[name]
+        self.sources.pop(path, None)
+        self.imports.pop(path, None)
+        self.errors.pop(path, None)
+
+    # --- Queries ---
+    def definitions(self, name):
+        """Symbols called `name`; "Class.method" matches on the qualified name."""
+        short = name.rsplit(".", 1)[-1]
+        return [s for s in self.symbols.get(short, ()) if "." not in name or s.qualname == name]
+
+    def callers(self, name):
+        return self.calls.get(name.rsplit(".", 1)[-1], [])
+
+    def importers(self, name):
+        """Files that import `name` (a module or a symbol)."""
+        return [path for path, names in self.imports.items() if name in names]
+
+    def snippet(self, symbol):
+        lines = self.sources[symbol.path][symbol.lineno - 1:symbol.end_lineno]
+        if len(lines) > MAX_SNIPPET_LINES:
+            lines = lines[:MAX_SNIPPET_LINES] + [f"... [{len(lines) - MAX_SNIPPET_LINES} more lines]"]
+        return "\n".join(lines)
+
+    def describe_definition(self, name):
+        found = self.definitions(name)
+        if not found:
+            return None
+        blocks = []
+        for symbol in found[:MAX_MATCHES]:
+            blocks.append(f"=== {symbol.path}:{symbol.lineno} ({symbol.kind} {symbol.qualname}) ===\n"
+                          f"{self.snippet(symbol)}")
+        users = self.importers(name.rsplit(".", 1)[-1])
+        if users:
+            blocks.append("Imported by: " + ", ".join(users))
+        return "\n".join(blocks)
+
+    def describe_callers(self, name):
+        sites = self.callers(name)
+        if not sites:
+            return None
+        lines = [f"{site.path}:{site.lineno} in {site.caller}: {self.sources[site.path][site.lineno - 1].strip()}"
+                 for site in sites[:MAX_MATCHES]]
+        if len(sites) > MAX_MATCHES:
+            lines.append(f"... {len(sites) - MAX_MATCHES} more call sites")
+        return "\n".join(lines)
+
+
+class _Indexer(ast.NodeVisitor):
+    def __init__(self, path):
+        self.path = path
+        self.symbols = []
+        self.calls = []
+        self.imports = []
+        self._scope = []   # Enclosing names, innermost last
+        self._kinds = []   # Their kinds ("class" / "function" / "method")
+
+    def _define(self, node, kind):
+        qualname = ".".join(self._scope + [node.name])
+        self.symbols.append(Symbol(node.name, qualname, kind, self.path, node.lineno, node.end_lineno))
+        self._scope.append(node.name)
+        self._kinds.append(kind)
+        self.generic_visit(node)
+        self._scope.pop()
+        self._kinds.pop()
+
+    def visit_FunctionDef(self, node):
+        self._define(node, "method" if self._kinds[-1:] == ["class"] else "function")
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self._define(node, "class")
+
+    def visit_Assign(self, node):
+        if not self._scope:
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self.symbols.append(Symbol(target.id, target.id, "variable", self.path,
+                                               node.lineno, node.end_lineno))
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.imports.append(alias.name)
+
+    def visit_ImportFrom(self, node):
+        if node.module:
+            self.imports.append(node.module)
+        for alias in node.names:
+            self.imports.append(alias.name)
+
+    def visit_Call(self, node):
+        func = node.func
+        name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+        if name:
+            self.calls.append((name, CallSite(self.path, ".".join(self._scope) or "<module>", node.lineno)))
+        self.generic_visit(node)
@@ -0,0 +1,155 @@
+import io
+import posixpath
+import tarfile
+import time
+
+# --- BULK FILE TRANSFER ---
+# One put_archive / get_archive round trip moves a whole set of files, instead
+# of one exec_run (and one in-container python3 process) per file. Nothing goes
+# through a command line, so file size is not bounded by ARG_MAX either.
+
+
+def build_tar(files):
+    """
+    Pack {absolute_path: text} into an in-memory tar rooted at '/'. Files
+    only: Docker creates missing parent directories (0755) when it extracts,
+    and an entry for one that exists, like /tmp (1777), would reset its mode.
+    """
+    buf = io.BytesIO()
+    now = time.time()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for path, content in files.items():
+            name = posixpath.normpath(path).lstrip("/")
+            data = content.encode("utf-8") if isinstance(content, str) else content
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = now
+            tar.addfile(info, io.BytesIO(data))
+        end = tar.offset
+    # Drop tarfile's padding to a 10 KiB record; two zero blocks end the archive
+    return buf.getvalue()[:end + 2 * tarfile.BLOCKSIZE]
+
+
+def write_files(container, files):
+    """Write every {path: content} pair into the container in a single round trip."""
+    if not files:
+        return True
+    files = {absolute(path): content for path, content in files.items()}
+    return container.put_archive("/", build_tar(files))
+
+
+def read_files(container, paths):
+    """
+    Read several files with one get_archive call on their common directory.
+    Returns {path: text}; paths that do not exist are left out.
+    """
+    paths = [absolute(p) for p in paths]
+    if not paths:
+        return {}
+    root = posixpath.commonpath(paths) if len(paths) > 1 else paths[0]
+    if root == "/":
+        # Never archive the whole filesystem; split by top-level directory instead
+        groups = {}
+        for path in paths:
+            groups.setdefault(path.split("/")[1], []).append(path)
+        out = {}
+        for group in groups.values():
+            out.update(read_files(container, group))
+        return out
+    try:
+        stream, _ = container.get_archive(root)
+    except Exception:
+        # Missing common root; fall back to one archive per file
+        if len(paths) == 1:
+            return {}
+        out = {}
+        for path in paths:
+            out.update(read_files(container, [path]))
+        return out
+
+    data = b"".join(stream)
+    # get_archive names members relative to the parent of root
+    base = posixpath.dirname(root.rstrip("/")) or "/"
+    wanted = set(paths)
+    out = {}
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            path = posixpath.join(base, member.name)
+            if path in wanted:
+                out[path] = tar.extractfile(member).read().decode("utf-8", errors="replace")
+    return out
+
+
+def read_tree(container, root, suffix=""):
+    """Every file under root whose name ends with suffix, in one get_archive call."""
+    root = absolute(root)
+    try:
+        stream, _ = container.get_archive(root)
+    except Exception:
+        return {}
+    base = posixpath.dirname(root.rstrip("/")) or "/"
+    out = {}
+    with tarfile.open(fileobj=io.BytesIO(b"".join(stream))) as tar:
+        for member in tar:
+            if member.isfile() and member.name.endswith(suffix):
+                path = posixpath.join(base, member.name)
+                out[path] = tar.extractfile(member).read().decode("utf-8", errors="replace")
+    return out
+
+
+def absolute(path, cwd="/"):
+    """path resolved from cwd: from /app, "utils.py" and "/app/./utils.py" are both "/app/utils.py"."""
+    return posixpath.normpath(posixpath.join("/", cwd, path))
+
+
+class Snapshot:
+    """
+    In-memory checkpoint of part of a sandbox's working tree.
+
+    take() archives the given paths once; restore() wipes them and unpacks the
+    archive again (one exec_run + one put_archive), so rolling back a bad patch
+    or forking the same starting point into several sandboxes costs
+    milliseconds instead of a container start.
+    """
+
+    def __init__(self, paths, data):
+        self.paths = paths
+        self.data = data        # A single tar rooted at '/'
+        self.size = len(data)
+
+    @classmethod
+    def take(cls, container, paths):
+        paths = [absolute(p) for p in paths]
+        out = io.BytesIO()
+        with tarfile.open(fileobj=out, mode="w") as merged:
+            for path in paths:
+                try:
+                    stream, _ = container.get_archive(path)
+                except Exception:
+                    continue  # Did not exist yet; restore() will simply remove it
+                base = posixpath.dirname(path.rstrip("/")).lstrip("/")
+                with tarfile.open(fileobj=io.BytesIO(b"".join(stream))) as tar:
+                    for member in tar:
+                        data = tar.extractfile(member) if member.isfile() else None
+                        member.name = posixpath.join(base, member.name)
+                        merged.addfile(member, data)
+        return cls(paths, out.getvalue())
+
+    @classmethod
+    def from_files(cls, files):
+        """A snapshot of known content, without a round trip to read it back."""
+        paths = [absolute(p) for p in files]
+        return cls(paths, build_tar({p: c for p, c in zip(paths, files.values())}))
+
+    def restore(self, container):
+        container.exec_run(["rm", "-rf", *self.paths])
+        return container.put_archive("/", self.data)
+
+    def fork(self, containers):
+        """Restore this snapshot into several sandboxes (one per candidate attempt)."""
+        for container in containers:
+            self.restore(container)
+        return containers
@@ -0,0 +1,158 @@
+import collections
+import os
+import shlex
+import threading
+import time
+
+# --- CONFIGURATION ---
+# cgroup limits every sandbox starts with, so one runaway patch (fork bomb,
+# memory leak, busy loop) cannot take cores or memory from the episodes
+# running next to it.
+CPUS = float(os.environ.get("AGENT_SANDBOX_CPUS", "1.0"))
+MEM_LIMIT = os.environ.get("AGENT_SANDBOX_MEM", "512m")
+PIDS_LIMIT = int(os.environ.get("AGENT_SANDBOX_PIDS", "128"))
+
+DEFAULT_TIMEOUT = 30.0   # Seconds for a task's first test run, before there is any history
+MIN_TIMEOUT = 2.0
+MAX_TIMEOUT = 120.0
+TIMEOUT_FACTOR = 3.0     # Allowed slowdown over the slowest recent run
+HISTORY = 20             # Runtimes remembered per task
+TIMEOUT_EXIT = 124       # Exit status of coreutils `timeout` when the limit was hit
+
+
+def container_limits(cpus=CPUS, mem_limit=MEM_LIMIT, pids_limit=PIDS_LIMIT):
+    """containers.run() keyword arguments for the sandbox cgroup."""
+    return {
+        "nano_cpus": int(cpus * 1e9),
+        "mem_limit": mem_limit,
+        "memswap_limit": mem_limit,   # Same as mem_limit: no swap to thrash in
+        "pids_limit": pids_limit,
+    }
+
+
+def start_container(d_client, image, limits=None):
+    """An idle sandbox container with the given (default) limits."""
+    limits = container_limits() if limits is None else limits
+    return d_client.containers.run(image, command="tail -f /dev/null", detach=True, **limits)
+
+
+def with_timeout(cmd, seconds):
+    """cmd wrapped in coreutils timeout: SIGTERM after `seconds`, SIGKILL one second later."""
+    prefix = ["timeout", "-k", "1", f"{seconds:g}"]
+    if isinstance(cmd, str):
+        return shlex.join(prefix) + " " + cmd
+    return prefix + list(cmd)
+
+
+def split_timeout(argv):
+    """The inverse of with_timeout: (seconds, argv without the prefix), or (None, argv) when not wrapped."""
+    if len(argv) < 3 or argv[0] != "timeout":
+        return None, argv
+    rest = argv[1:]
+    while rest and rest[0].startswith("-"):
+        rest = rest[2:] if rest[0] in ("-k", "-s") else rest[1:]
+    if not rest:
+        return None, argv
+    return float(rest[0].rstrip("s")), rest[1:]
+
+
+class TestTimeouts:
+    """
+    Test-run timeouts learned per task. Until a task has a passing run it
+    gets DEFAULT_TIMEOUT; after that the limit is TIMEOUT_FACTOR times the
+    slowest of its last HISTORY passing runs (within MIN_TIMEOUT..MAX_TIMEOUT),
+    so an infinite loop in a 0.1 s test costs MIN_TIMEOUT seconds instead of
+    stalling the episode. Failing runs are not remembered: a bug that fails on
+    the first assertion says nothing about how long the full tests take.
+    Share one instance across episodes.
+    """
+
+    def __init__(self, default=DEFAULT_TIMEOUT, factor=TIMEOUT_FACTOR, history=HISTORY):
+        self.default = default
+        self.factor = factor
+        self.history = history
+        self.stats = {"runs": 0, "timeouts": 0}
+        self._runtimes = {}
+        self._lock = threading.Lock()
+
+    def timeout(self, task):
+        with self._lock:
+            runs = self._runtimes.get(task)
+            if not runs:
+                return self.default
+            return min(MAX_TIMEOUT, max(MIN_TIMEOUT, self.factor * max(runs)))
+
+    def record(self, task, seconds, exit_code):
+        with self._lock:
+            self.stats["runs"] += 1
+            if exit_code == TIMEOUT_EXIT:
+                self.stats["timeouts"] += 1
+            if exit_code != 0:
+                return
+            self._runtimes.setdefault(task, collections.deque(maxlen=self.history)).append(seconds)
+
+
+class ResourceMeter:
+    """
+    CPU time, memory and pids one sandbox used during an episode, from two
+    docker stats snapshots (start and stop). CPU is the difference between
+    them, so a pooled container is charged only for its current episode.
+    Memory cannot be split that way: the cgroup's max_usage (cgroup v1) is
+    the peak over the container's whole life. mem_scope says what
+    mem_peak_mb covers:
+
+        "episode"    max_usage rose during this episode: the peak is its own
+        "container"  an earlier episode on this (pooled) container set it
+        "end"        no max_usage (cgroup v2): the usage when the episode ended
+    """
+
+    def __init__(self, container):
+        self.container = container
+        self.start = time.perf_counter()
+        first = self._stats()
+        self.start_cpu = _cpu_ns(first) if first else None
+        self.start_peak = (first.get("memory_stats") or {}).get("max_usage") if first else None
+
+    def _stats(self):
+        try:
+            try:
+                return self.container.stats(stream=False, one_shot=True)
+            except TypeError:
+                return self.container.stats(stream=False)   # docker-py < 6 has no one_shot
+        except Exception:
+            return None
+
+    def stop(self):
+        """{"cpu_s", "wall_s", "cpu_share", "mem_peak_mb", "mem_scope", "pids"}, or None without stats."""
+        wall = time.perf_counter() - self.start
+        last = self._stats()
+        if last is None or self.start_cpu is None:
+            return None
+        cpu = max(0, _cpu_ns(last) - self.start_cpu) / 1e9
+        memory = last.get("memory_stats") or {}
+        peak = memory.get("max_usage")
+        if not peak:
+            peak, scope = memory.get("usage") or 0, "end"
+        elif self.start_peak is None or peak > self.start_peak:
+            scope = "episode"
+        else:
+            scope = "container"
+        return {
+            "cpu_s": round(cpu, 3),
+            "wall_s": round(wall, 3),
+            "cpu_share": round(cpu / wall, 3) if wall else 0.0,   # Cores kept busy on average
+            "mem_peak_mb": round(peak / 2 ** 20, 1),
+            "mem_scope": scope,
+            "pids": (last.get("pids_stats") or {}).get("current", 0),
+        }
+
+
+def format_usage(usage):
+    """One line for the episode summary."""
+    memory = {"episode": "peak", "container": "container lifetime peak", "end": "at the end"}[usage["mem_scope"]]
+    return (f"{usage['cpu_s']:.2f} CPU-s in {usage['wall_s']:.2f}s ({usage['cpu_share']:.0%} of a core), "
+            f"{usage['mem_peak_mb']:.0f} MB {memory}, {usage['pids']} pids")
+
+
+def _cpu_ns(stats):
+    return ((stats.get("cpu_stats") or {}).get("cpu_usage") or {}).get("total_usage", 0)
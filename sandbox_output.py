@@ -0,0 +1,215 @@
+import collections
+import re
+import shlex
+import time
+
+# --- CONFIGURATION ---
+# Bytes kept per action as (head, tail). Anything in between is counted and
+# dropped as it streams in, so a 50 MB log never sits in memory, in the
+# history or in a prompt.
+LIMITS = {
+    "cat": (32768, 32768),   # read_file: the ContextBuilder clips files further
+    "ls": (4096, 4096),      # list_files
+    "run": (4096, 12288),    # Tests and anything else: the end of a log matters most
+}
+KILL_AFTER = 1 << 20         # With kill_on_overflow, a command is killed after this many output bytes
+MAX_FAILURE_LINES = 20
+MAX_TRACEBACK_LINES = 40
+MAX_LINE = 4096              # Longer lines are cut before they are scanned
+EXIT_POLL = 0.01             # Seconds between exec_inspect calls while the exec is still winding down
+EXIT_WAIT = 5.0              # Give up waiting for Running=false after this long
+
+PID_PREFIX = "echo $$ >&2; exec "   # Shell wrapper that announces the pid before running the command
+TRACEBACK_START = b"Traceback (most recent call last):"
+FAILURE_LINE = re.compile(rb"^(?:FAIL|ERROR|E\s{2,}|\w*(?:Error|Exception)\b|AssertionError|assert\b)")
+
+ExecResult = collections.namedtuple("ExecResult", "exit_code output truncated", defaults=(False,))
+
+
+class OutputCapture:
+    """
+    Head/tail buffers over a byte stream. feed() keeps the first `head` bytes
+    and a ring of the last `tail` bytes, and scans complete lines as they pass
+    for the last traceback and other failure lines, so the error is still
+    reported when it scrolled out of both buffers.
+    """
+
+    def __init__(self, head, tail):
+        self.head_limit = head
+        self.tail_limit = tail
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+        self.failures = collections.deque(maxlen=MAX_FAILURE_LINES)
+        self.traceback = []        # Last complete traceback, exception line included
+        self._frames = None        # Traceback being read, None outside one
+        self._partial = bytearray()
+
+    def feed(self, data):
+        self.total += len(data)
+        self._scan(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.tail_limit:
+                del self.tail[:len(self.tail) - self.tail_limit]
+
+    def _scan(self, data):
+        self._partial += data
+        *lines, rest = self._partial.split(b"\n")
+        self._partial = bytearray(rest[:MAX_LINE])
+        for line in lines:
+            self._line(bytes(line[:MAX_LINE]).rstrip(b"\r"))
+
+    def _line(self, line):
+        if line.startswith(TRACEBACK_START):
+            self._frames = [line]
+            return
+        if self._frames is not None:
+            if line[:1] in (b" ", b"\t"):
+                self._frames.append(line)
+                del self._frames[1:-MAX_TRACEBACK_LINES]
+                return
+            self._frames.append(line)   # The exception line ends the traceback
+            self.traceback, self._frames = self._frames, None
+            return
+        if FAILURE_LINE.match(line):
+            self.failures.append(line)
+
+    @property
+    def truncated(self):
+        return self.total > len(self.head) + len(self.tail)
+
+    def kept(self):
+        return len(self.head) + len(self.tail)
+
+    def render(self):
+        """The kept output; when bytes were dropped, a marker plus the failure lines found in them."""
+        if not self.truncated:
+            return _clean(self.head + self.tail)
+        if self._partial:
+            self._line(bytes(self._partial))  # Unterminated last line
+            self._partial.clear()
+        omitted = self.total - self.kept()
+        parts = [_clean(self.head), f"\n... [{omitted} bytes omitted] ...\n".encode(), _clean(self.tail)]
+        kept = bytes(self.head + self.tail)
+        lost = [line for line in self.traceback if line not in kept]
+        if lost:
+            parts.append(b"\n\nLAST TRACEBACK (from the omitted output):\n" + b"\n".join(self.traceback))
+        lost = [line for line in self.failures if line not in kept and line not in self.traceback]
+        if lost:
+            parts.append(b"\n\nFAILURE LINES (from the omitted output):\n" + b"\n".join(lost))
+        return b"".join(parts)
+
+
+class CappedSandbox:
+    """
+    Container stand-in whose exec_run() streams the command's output through
+    an OutputCapture instead of buffering all of it, and returns an
+    ExecResult whose `truncated` flag tells the tools a file or log was cut.
+
+    stream=False (the SandboxExecutor, which answers in one message) caps
+    the output after the fact: it still keeps the history and the prompts
+    small. kill_on_overflow stops a command once it has printed KILL_AFTER
+    bytes, for runaway tests that would otherwise print until the timeout.
+    Other attributes (put_archive, id, ...) are forwarded to the container.
+    """
+
+    def __init__(self, container, stream=True, kill_on_overflow=False, limits=None, kill_after=KILL_AFTER):
+        self.container = container
+        self.stream = stream
+        self.kill_on_overflow = kill_on_overflow
+        self.limits = dict(LIMITS, **(limits or {}))
+        self.kill_after = kill_after
+        self.output_stats = {"seen": 0, "kept": 0, "truncated": 0, "killed": 0}
+
+    def limit_for(self, cmd):
+        argv = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+        verb = argv[0] if argv else ""
+        return self.limits.get(verb, self.limits["run"])
+
+    def exec_run(self, cmd, **kwargs):
+        capture = OutputCapture(*self.limit_for(cmd))
+        killed = False
+        if self.stream:
+            exit_code, killed = stream_exec(self.container, cmd, capture,
+                                            self.kill_after if self.kill_on_overflow else None)
+        else:
+            res = self.container.exec_run(cmd, **kwargs)
+            exit_code = res.exit_code
+            capture.feed(res.output)
+        output = capture.render()
+        self.output_stats["seen"] += capture.total
+        self.output_stats["kept"] += min(len(output), capture.total)
+        self.output_stats["truncated"] += capture.truncated
+        self.output_stats["killed"] += killed
+        if killed:
+            output += f"\n[killed after {capture.total} bytes of output]".encode()
+        return ExecResult(exit_code, output, capture.truncated)
+
+    def saved(self):
+        return self.output_stats["seen"] - self.output_stats["kept"]
+
+    def __getattr__(self, name):
+        return getattr(self.container, name)
+
+
+def stream_exec(container, cmd, capture, kill_after=None):
+    """
+    Run cmd through the low-level exec API (stream=True, demux=True), feeding
+    stdout and stderr into `capture` as they arrive. Returns (exit code, killed).
+    With kill_after, the command is wrapped so it reports its pid on stderr,
+    and is killed with SIGKILL once it has printed that many bytes.
+    """
+    api = container.client.api
+    if kill_after is not None:
+        cmd = ["sh", "-c", PID_PREFIX + (cmd if isinstance(cmd, str) else shlex.join(cmd))]
+    exec_id = api.exec_create(container.id, cmd, stdout=True, stderr=True)["Id"]
+    chunks = api.exec_start(exec_id, stream=True, demux=True)
+    pid = b"" if kill_after is not None else None
+    killed = False
+    try:
+        for stdout, stderr in chunks:
+            if stderr and pid is not None and not pid.endswith(b"\n"):
+                # The wrapper's first stderr line is the pid; the rest is the command's
+                cut = stderr.find(b"\n") + 1 or len(stderr)
+                pid, stderr = pid + stderr[:cut], stderr[cut:]
+            for data in (stdout, stderr):
+                if data:
+                    capture.feed(data)
+            if kill_after is not None and capture.total > kill_after and pid.strip().isdigit():
+                # The whole process group when it leads one (coreutils timeout does), else the pid;
+                # the shell builtin, since slim images ship no /bin/kill
+                pid = pid.strip().decode()
+                container.exec_run(["sh", "-c", f"kill -9 -- -{pid} 2>/dev/null || kill -9 {pid}"])
+                killed = True
+                break
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+    if killed:
+        return 137, True   # 128 + SIGKILL, whether or not the daemon has noticed yet
+    return _exit_code(api, exec_id), False
+
+
+def _exit_code(api, exec_id, wait=EXIT_WAIT):
+    """
+    The exit code of a finished exec. The output stream can close before the
+    daemon has reaped the process, when exec_inspect still says Running with
+    ExitCode None, so it is polled until Running turns false (or `wait` is up).
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        info = api.exec_inspect(exec_id)
+        if not info.get("Running") or time.monotonic() >= deadline:
+            return info.get("ExitCode")
+        time.sleep(EXIT_POLL)
+
+
+def _clean(data):
+    """A buffer cut at an arbitrary byte may split a UTF-8 sequence; the tools decode strictly."""
+    return bytes(data).decode("utf-8", errors="replace").encode("utf-8")
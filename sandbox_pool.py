@@ -0,0 +1,226 @@
+import posixpath
+import threading
+import time
+
+from sandbox_limits import start_container
+
+# --- CONFIGURATION ---
+DOCKER_IMAGE = "python:3.10-slim"
+POOL_SIZE = 4
+RESET_PATHS = ("/app", "/broken.py")  # Wiped on checkin when the daemon cannot say what changed (no diff())
+KILL_ALL = ["sh", "-c", "kill -9 -1 2>/dev/null; true"]  # Every process but PID 1 (and this shell)
+CHANGED, ADDED, DELETED = 0, 1, 2  # container.diff() "Kind"
+
+
+class SandboxPool:
+    """
+    Keeps a set of pre-started sandbox containers warm so agents skip the
+    containers.run() / kill() / remove() cycle on every simulation.
+
+    Usage:
+        pool = SandboxPool(docker.from_env(), size=4)
+        container = pool.checkout()
+        try: ...
+        finally: pool.checkin(container)
+    """
+
+    def __init__(self, d_client, size=POOL_SIZE, image=DOCKER_IMAGE,
+                 reset_paths=RESET_PATHS, max_uses=50, refill_interval=5.0, limits=None):
+        self.d_client = d_client
+        self.size = size
+        self.image = image
+        self.limits = limits  # containers.run() cgroup kwargs; None = sandbox_limits defaults
+        self.reset_paths = tuple(reset_paths)
+        self.max_uses = max_uses
+        self.refill_interval = refill_interval
+
+        self._idle = []
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"created": 0, "destroyed": 0, "warm_hits": 0, "cold_starts": 0, "unhealthy": 0}
+
+    # --- Lifecycle ---
+    def start(self, background=True):
+        """Fill the pool, then (optionally) keep it topped up from a daemon thread."""
+        self.refill()
+        if background and self._thread is None:
+            self._thread = threading.Thread(target=self._refill_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for container in idle:
+            self._destroy(container)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Checkout / Checkin ---
+    def checkout(self):
+        """Hand out a healthy, clean container. Falls back to a cold start when the pool is empty."""
+        while True:
+            with self._lock:
+                container = self._idle.pop() if self._idle else None
+            if container is None:
+                break
+            if self.is_healthy(container):
+                self._count("warm_hits")
+                self._wake.set()
+                return container
+            self._count("unhealthy")
+            self._destroy(container)
+
+        self._count("cold_starts")
+        self._wake.set()
+        return self._create()
+
+    def checkin(self, container, healthy=True):
+        """Return a container. It is wiped back to a clean filesystem or destroyed."""
+        with self._lock:
+            uses = self._uses[container.id] = self._uses.get(container.id, 0) + 1
+        if not healthy or uses >= self.max_uses or not self.reset(container):
+            self._destroy(container)
+            self._wake.set()
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(container)
+                return
+        self._destroy(container)
+
+    def reset(self, container):
+        """
+        Back to the image's filesystem with nothing left running: kills every
+        process but PID 1 (tests left behind by a timeout or a kill), then
+        deletes whatever container.diff() reports as added, wherever the agent
+        wrote it. An image file that was changed or deleted cannot be restored
+        in place, so that container counts as dirty and is replaced. Without
+        diff(), reset_paths are wiped instead. Returns False if the container
+        could not be cleaned.
+        """
+        try:
+            container.exec_run(KILL_ALL)
+            try:
+                changes = container.diff() or []
+            except Exception:
+                paths = list(self.reset_paths)
+            else:
+                paths = _added_roots(changes)
+                if paths is None:
+                    return False
+            if not paths:
+                return True
+            return container.exec_run(["rm", "-rf", "--", *paths]).exit_code == 0
+        except Exception:
+            return False
+
+    def is_healthy(self, container):
+        try:
+            container.reload()
+            if container.status != "running":
+                return False
+            return container.exec_run(["true"]).exit_code == 0
+        except Exception:
+            return False
+
+    # --- Refill ---
+    def refill(self):
+        """
+        Drop dead idle containers and start new ones until the pool is full.
+        Idle containers are checked one at a time, so the rest stay available
+        to a checkout() running meanwhile.
+        """
+        with self._lock:
+            idle = list(self._idle)
+        for container in idle:
+            with self._lock:
+                if container not in self._idle:
+                    continue  # Checked out meanwhile: checkout() checks it itself
+                self._idle.remove(container)
+            if not self.is_healthy(container):
+                self._count("unhealthy")
+                self._destroy(container)
+                continue
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(container)
+                    continue
+            self._destroy(container)
+        while not self._stop.is_set():
+            with self._lock:
+                if len(self._idle) >= self.size:
+                    return
+            container = self._create()
+            with self._lock:
+                # checkin() may have filled the pool while this one started
+                if len(self._idle) < self.size:
+                    self._idle.append(container)
+                    continue
+            self._destroy(container)
+            return
+
+    def _refill_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.refill_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.refill()
+            except Exception as e:
+                print(f"   [Pool Error]: Refill failed: {e}")
+                time.sleep(self.refill_interval)
+
+    def _create(self):
+        container = start_container(self.d_client, self.image, self.limits)
+        self._count("created")
+        return container
+
+    def _destroy(self, container):
+        with self._lock:
+            self._uses.pop(container.id, None)
+            self.stats["destroyed"] += 1
+        try:
+            container.kill()
+        except Exception:
+            pass
+        try:
+            container.remove()
+        except Exception:
+            pass
+
+    def _count(self, key):
+        # checkout()/checkin() run on many agent threads at once
+        with self._lock:
+            self.stats[key] += 1
+
+    def idle_count(self):
+        with self._lock:
+            return len(self._idle)
+
+
+def _added_roots(changes):
+    """The top-most added paths in a container.diff(), or None if an image file was changed or deleted."""
+    parents = {posixpath.dirname(c["Path"]) for c in changes}
+    for change in changes:
+        # A changed directory is only the parent of something added
+        if change["Kind"] == DELETED or (change["Kind"] == CHANGED and change["Path"] not in parents):
+            return None
+    roots = []
+    for path in sorted(c["Path"] for c in changes if c["Kind"] == ADDED):
+        if not any(path.startswith(root.rstrip("/") + "/") for root in roots):
+            roots.append(path)
+    return roots
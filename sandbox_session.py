@@ -0,0 +1,59 @@
+from sandbox_exec import SandboxExecutor
+from sandbox_limits import format_usage, start_container
+from sandbox_output import CappedSandbox
+from sandbox_pool import DOCKER_IMAGE
+from tracing import tracer
+
+# --- SANDBOX LIFECYCLE ---
+# How every agent gets a sandbox for an episode and gives it back. The
+# wrappers stack as CappedSandbox(SandboxExecutor(container)); close_sandbox()
+# takes them off in the reverse order, so the pool only ever sees the bare
+# container.
+
+
+def open_sandbox(d_client, pool=None, image=DOCKER_IMAGE, limits=None, use_executor=False, cap_output=False,
+                 kill_on_overflow=False):
+    """Borrow a warm container from the pool, or cold-start one, and wrap it as asked."""
+    with tracer.span("container.start", pooled=bool(pool)):
+        if pool:
+            container = pool.checkout()
+        else:
+            container = start_container(d_client, image, limits)
+        if use_executor:
+            container = SandboxExecutor.attach(container)
+        if cap_output:
+            # The daemon answers in one message, so its output is capped after the fact
+            container = CappedSandbox(container, stream=not use_executor, kill_on_overflow=kill_on_overflow)
+        return container
+
+
+def close_sandbox(container, pool=None):
+    """Unwrap what open_sandbox() returned and check the container back in (or remove it)."""
+    with tracer.span("container.release", pooled=bool(pool)):
+        if isinstance(container, CappedSandbox):
+            container = container.container
+        if isinstance(container, SandboxExecutor):
+            container.close()
+            container = container.container
+        if pool:
+            pool.checkin(container)
+        else:
+            container.kill()
+            container.remove()
+
+
+def report_episode(container, meter, prefetcher=None):
+    """Print the episode's prefetch, output-cap and resource stats. Returns the ResourceMeter usage."""
+    if prefetcher:
+        prefetcher.close()
+        stats = prefetcher.stats
+        print(f"   [Prefetch]: {stats['hits']}/{stats['issued']} prefetched reads used "
+              f"({prefetcher.hit_rate():.0%}), {stats['discarded']} discarded")
+    if isinstance(container, CappedSandbox):
+        stats = container.output_stats
+        print(f"   [Output Cap]: {container.saved()} of {stats['seen']} output bytes dropped, "
+              f"{stats['truncated']} outputs truncated, {stats['killed']} commands killed")
+    usage = meter.stop()
+    if usage:
+        print(f"   [Resources]: {format_usage(usage)}")
+    return usage
@@ -0,0 +1,128 @@
+import asyncio
+import collections
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIGURATION ---
+CONCURRENCY = 8      # Episodes in flight at once across the whole batch
+STEP_BUDGET = 9      # Default per-task step budget
+
+
+class EpisodeScheduler:
+    """
+    Runs many repair episodes concurrently against one model endpoint and one
+    container pool. Each episode is the agent's normal blocking
+    run_simulation(task, max_steps), executed on a worker thread so the
+    requests/docker calls of one episode overlap with the others.
+
+    Fair queueing: tasks are grouped by task["group"] and handed out
+    round-robin across groups, so one large submission cannot starve the rest.
+    """
+
+    def __init__(self, agent, concurrency=CONCURRENCY, step_budget=STEP_BUDGET):
+        self.agent = agent
+        self.concurrency = concurrency
+        self.step_budget = step_budget
+
+    def run(self, tasks):
+        """Blocking entry point for scripts."""
+        return asyncio.run(self.run_batch(tasks))
+
+    async def run_batch(self, tasks):
+        queue = _fair_order(tasks)
+        results = []
+        start = time.perf_counter()
+
+        async def worker(executor):
+            while queue:
+                task = queue.popleft()
+                results.append(await self._run_episode(executor, task))
+
+        # A dedicated executor: the default one is capped at cpu_count + 4 threads
+        n_workers = max(1, min(self.concurrency, len(queue)))
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            await asyncio.gather(*(worker(executor) for _ in range(n_workers)))
+        return batch_report(results, time.perf_counter() - start)
+
+    async def _run_episode(self, executor, task):
+        budget = task.get("max_steps", self.step_budget)
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            outcome = await loop.run_in_executor(executor, self.agent.run_simulation, task, budget)
+            error = None
+        except Exception as e:
+            outcome = {"solved": False, "steps": 0}
+            error = str(e)
+        return {
+            "name": task.get("name", ""),
+            "group": task.get("group", ""),
+            "solved": outcome["solved"],
+            "steps": outcome["steps"],
+            "latency": time.perf_counter() - start,
+            "error": error,
+        }
+
+
+def _fair_order(tasks):
+    groups = collections.OrderedDict()
+    for task in tasks:
+        groups.setdefault(task.get("group", ""), collections.deque()).append(task)
+    ordered = collections.deque()
+    while groups:
+        for key in list(groups):
+            ordered.append(groups[key].popleft())
+            if not groups[key]:
+                del groups[key]
+    return ordered
+
+
+def batch_report(results, wall_time):
+    latencies = sorted(r["latency"] for r in results)
+
+    def pct(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    return {
+        "episodes": len(results),
+        "solved": sum(1 for r in results if r["solved"]),
+        "errors": sum(1 for r in results if r["error"]),
+        "wall_time": wall_time,
+        "throughput": len(results) / wall_time if wall_time else 0.0,
+        "latency_p50": pct(0.50),
+        "latency_p95": pct(0.95),
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    # Offline demo: 16 AgentJSON episodes on fake Docker + fake Ollama.
+    import contextlib
+    import io
+    import json
+
+    from agi_agent_v4 import AgentJSON, DEFAULT_TASK
+    from fake_docker import FakeDockerClient
+    from fake_ollama import FakeOllamaServer
+    from llm_client import OllamaClient
+    from sandbox_pool import SandboxPool
+
+    fix = "def calculate_price(price, quantity):\n    return price * quantity\n"
+
+    def responder(payload):
+        if '"run_test"' not in payload["prompt"].split("HISTORY:")[1]:
+            return json.dumps({"action": "run_test"})
+        return json.dumps({"action": "write_file", "path": "/app/utils.py", "content": fix})
+
+    tasks = [dict(DEFAULT_TASK, name=f"task-{i}", group=f"user-{i % 3}") for i in range(16)]
+    d_client = FakeDockerClient()
+    with FakeOllamaServer(responder, latency=0.2) as server, SandboxPool(d_client, size=4) as pool:
+        agent = AgentJSON(d_client=d_client, pool=pool, llm=OllamaClient(url=server.url))
+        for concurrency in (1, 8):
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = EpisodeScheduler(agent, concurrency=concurrency).run(tasks)
+            print(f"concurrency={concurrency}: {report['solved']}/{report['episodes']} solved, "
+                  f"{report['throughput']:.2f} episodes/s, "
+                  f"p50 {report['latency_p50']:.2f}s, p95 {report['latency_p95']:.2f}s")
@@ -0,0 +1,84 @@
+import re
+
+# --- INCREMENTAL ACTION PARSERS ---
+# Fed one streamed chunk at a time by OllamaClient.stream(). feed() returns True
+# as soon as the action is unambiguous, which lets the client hang up on the
+# model instead of paying for the rest of the generation.
+
+SHORT_COMMANDS = re.compile(r"(LIST_FILES|READ_FILE|RUN_TEST|FIND_DEFINITION|FIND_CALLERS)\b")
+
+
+class ExplorerActionParser:
+    """
+    AgentExplorer answers with a command on the first line. LIST_FILES,
+    READ_FILE, RUN_TEST and the FIND_* lookups are complete once that line
+    is; WRITE_FILE needs the code that follows, so it is always streamed to
+    the end.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
+        self._decided = False
+
+    def feed(self, chunk):
+        if self._decided:
+            return self.done
+        self.buffer += chunk
+        text = self.buffer.lstrip()
+        if "\n" not in text:
+            return False
+        self._decided = True
+        self.done = bool(SHORT_COMMANDS.match(text.split("\n", 1)[0].strip()))
+        return self.done
+
+    @property
+    def result(self):
+        text = self.buffer.lstrip()
+        return text.split("\n", 1)[0].strip() if self.done else text
+
+
+class JSONObjectParser:
+    """Stops once the first top-level JSON object has been closed."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
+        self._start = None
+        self._end = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk):
+        if self.done:
+            return True
+        offset = len(self.buffer)
+        self.buffer += chunk
+        for i, ch in enumerate(chunk, offset):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._start is None:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}" and self._start is not None:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end = i + 1
+                    self.done = True
+                    return True
+        return False
+
+    @property
+    def result(self):
+        if self.done:
+            return self.buffer[self._start:self._end]
+        return self.buffer
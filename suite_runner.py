@@ -0,0 +1,259 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+
+from benchmark import percentile
+from llm_client import LLMMetrics, MODEL_NAME
+from task_suite import load_suite
+
+# --- CONFIGURATION ---
+WORKERS = min(4, os.cpu_count() or 1)
+POOL_SIZE = 2        # Warm sandboxes per worker process
+STEP_BUDGET = 9
+RESULTS = os.path.join(tempfile.gettempdir(), "suite_results.jsonl")  # Outside the checkout; --resume finds it again
+AGENTS = {
+    # name: (module, class[, constructor kwargs]); the agent must take run_simulation(task, max_steps)
+    "agi_agent_v3": ("agi_agent_v3", "AgentExplorer"),
+    "agi_agent_v4": ("agi_agent_v4", "AgentJSON"),
+}
+
+
+class SolutionLLM:
+    """
+    Offline stand-in for the model that knows each task's solution: it reads
+    the file the bug is in, then writes the fix (JSON answers when asked for
+    format="json", AgentExplorer's text commands otherwise). With it, a suite
+    run measures the harness (sandboxes, tools, scheduling) at scale; latency
+    adds a fixed model time per call.
+    """
+
+    def __init__(self, latency=0.0, model=MODEL_NAME):
+        self.latency = latency
+        self.model = model
+        self.metrics = LLMMetrics()
+        self.task = None
+
+    def generate(self, prompt, options=None, format=None, model=None):
+        start = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        text = self._answer(prompt, format == "json")
+        self.metrics.record(ok=True, latency=time.perf_counter() - start, retries=0,
+                            prompt_chars=len(prompt), prompt_tokens=len(prompt.split()),
+                            completion_tokens=len(text.split()))
+        return text
+
+    def stream(self, prompt, parser=None, options=None, format=None, model=None):
+        return self.generate(prompt, options, format, model)
+
+    def _answer(self, prompt, as_json):
+        action, args = "run_test", {}
+        for path, fixed in (self.task.get("solution") or {}).items():
+            if f"=== {path} ===" not in prompt:
+                action, args = "read_file", {"path": path}
+                break
+            if fixed.rstrip() not in prompt:
+                action, args = "write_file", {"path": path, "content": fixed}
+                break
+        if as_json:
+            return json.dumps(dict(args, action=action))
+        text = action.upper()
+        if "path" in args:
+            text += f" {args['path']}"
+        if "content" in args:
+            text += f"\n{args['content']}"
+        return text
+
+
+# --- WORKER PROCESS ---
+# Each worker loads the suite once, and keeps one Docker client, one warm
+# SandboxPool and one instance of every agent for all the episodes it runs.
+_worker = {}
+
+
+def _init_worker(suite, llm, docker_mode, pool_size, latency):
+    from sandbox_pool import RESET_PATHS, SandboxPool
+
+    if docker_mode == "real":
+        import docker
+        d_client = docker.from_env()
+    else:
+        from fake_docker import FakeDockerClient
+        d_client = FakeDockerClient()
+    tasks = {task["name"]: task for task in load_suite(suite)}
+    # Without container.diff() the pool wipes fixed paths: those of the suite's repos
+    roots = {"/" + path.lstrip("/").split("/")[0] for task in tasks.values() for path in task["files"]}
+    pool = SandboxPool(d_client, size=pool_size, reset_paths=sorted(set(RESET_PATHS) | roots))
+    with contextlib.redirect_stdout(io.StringIO()):
+        pool.start()
+    # Pool processes leave through os._exit, past atexit; this finalizer still runs
+    Finalize(pool, pool.close, exitpriority=10)
+    if llm == "oracle":
+        model = SolutionLLM(latency)
+    else:
+        from llm_client import get_client
+        model = get_client()
+    _worker.update(tasks=tasks, d_client=d_client, pool=pool, llm=model, agents={})
+
+
+def _run_task(agent_name, task_name):
+    task = _worker["tasks"][task_name]
+    llm = _worker["llm"]
+    if isinstance(llm, SolutionLLM):
+        llm.task = task
+    mark = llm.metrics.mark()
+    error = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = _worker["agents"].get(agent_name)
+        if agent is None:
+            module, cls, *kwargs = AGENTS[agent_name]
+            agent_cls = getattr(__import__(module), cls)
+            agent = agent_cls(d_client=_worker["d_client"], pool=_worker["pool"], llm=llm,
+                              **(kwargs[0] if kwargs else {}))
+            _worker["agents"][agent_name] = agent
+        start = time.perf_counter()
+        try:
+            outcome = agent.run_simulation(task, task.get("max_steps", STEP_BUDGET))
+        except Exception as e:
+            outcome = {"solved": False, "steps": 0}
+            error = repr(e)
+        elapsed = time.perf_counter() - start
+    cost = llm.metrics.summary(since=mark)
+    return {
+        "agent": agent_name,
+        "task": task_name,
+        "group": task.get("group", ""),
+        "solved": bool(outcome["solved"]),
+        "steps": outcome["steps"],
+        "time": elapsed,
+        "model_calls": cost["calls"],
+        "prompt_tokens": cost["prompt_tokens"],
+        "completion_tokens": cost["completion_tokens"],
+        "error": error,
+        "worker": os.getpid(),
+    }
+
+
+# --- PARENT ---
+def load_results(path):
+    """{(agent, task): row} from a results file; a line cut short by a crash is ignored."""
+    rows = {}
+    if not os.path.exists(path):
+        return rows
+    with open(path) as fh:
+        for line in fh:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            rows[(row["agent"], row["task"])] = row
+    return rows
+
+
+def run_suite(suite, agents, results_path, workers=WORKERS, resume=False, llm="oracle", docker_mode="fake",
+              pool_size=POOL_SIZE, latency=0.0, progress=None):
+    """
+    Runs every (agent, task) pair on a process pool, appending one JSON line
+    per finished episode to results_path. With resume=True the pairs already
+    in the file are skipped, so an interrupted run picks up where it stopped.
+    Returns (rows, seconds spent on this run's episodes).
+    """
+    tasks = load_suite(suite)
+    done = load_results(results_path) if resume else {}
+    if not resume and os.path.exists(results_path):
+        os.remove(results_path)
+    # Interleaved, so a run cut short still has results for every agent
+    todo = [(agent, task["name"]) for task in tasks for agent in agents if (agent, task["name"]) not in done]
+
+    start = time.perf_counter()
+    if todo:
+        executor = ProcessPoolExecutor(max_workers=max(1, min(workers, len(todo))), initializer=_init_worker,
+                                       initargs=(suite, llm, docker_mode, pool_size, latency))
+        try:
+            with open(results_path, "a") as out:
+                if out.tell() and not _ends_line(results_path):
+                    out.write("\n")   # After a line cut short by a crash
+                futures = [executor.submit(_run_task, agent, name) for agent, name in todo]
+                for i, future in enumerate(as_completed(futures), 1):
+                    row = future.result()
+                    out.write(json.dumps(row) + "\n")
+                    out.flush()
+                    if progress:
+                        progress(i, len(todo), row)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+    return list(load_results(results_path).values()), time.perf_counter() - start
+
+
+def _ends_line(path):
+    with open(path, "rb") as fh:
+        fh.seek(-1, os.SEEK_END)
+        return fh.read(1) == b"\n"
+
+
+def summarize(rows):
+    """Per agent: solve rate, p50/p95 time-to-fix over the solved tasks, model tokens per fix."""
+    by_agent = {}
+    for row in rows:
+        by_agent.setdefault(row["agent"], []).append(row)
+    report = {}
+    for agent, episodes in sorted(by_agent.items()):
+        solved = [e for e in episodes if e["solved"]]
+        fix_times = [e["time"] for e in solved]
+        tokens = sum(e["prompt_tokens"] + e["completion_tokens"] for e in episodes)
+        report[agent] = {
+            "tasks": len(episodes),
+            "solved": len(solved),
+            "solve_rate": len(solved) / len(episodes),
+            "time_to_fix_p50": percentile(fix_times, 0.50) if solved else None,
+            "time_to_fix_p95": percentile(fix_times, 0.95) if solved else None,
+            "tokens_per_fix": tokens / len(solved) if solved else None,
+            "model_calls_per_fix": sum(e["model_calls"] for e in episodes) / len(solved) if solved else None,
+            "errors": sum(1 for e in episodes if e["error"]),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run agents over a task suite on a process pool.")
+    parser.add_argument("suite", help="task suite directory (see task_suite.py)")
+    parser.add_argument("--agents", nargs="+", default=list(AGENTS), choices=list(AGENTS))
+    parser.add_argument("--results", default=RESULTS, help="one JSON line per finished episode (default: %(default)s)")
+    parser.add_argument("--resume", action="store_true", help="skip the episodes already in --results")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help="warm sandboxes per worker")
+    parser.add_argument("--llm", choices=["oracle", "live"], default="oracle",
+                        help="oracle: offline SolutionLLM; live: the configured model server")
+    parser.add_argument("--latency", type=float, default=0.0, help="oracle model time per call, seconds")
+    parser.add_argument("--docker", choices=["fake", "real"], default="fake")
+    parser.add_argument("--out", help="write the JSON summary here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    def progress(i, n, row):
+        mark = "solved" if row["solved"] else f"failed{' (' + row['error'] + ')' if row['error'] else ''}"
+        print(f"[{i}/{n}] {row['agent']} {row['task']}: {mark} in {row['time']:.2f}s", file=sys.stderr)
+
+    rows, elapsed = run_suite(args.suite, args.agents, args.results, args.workers, args.resume, args.llm,
+                              args.docker, args.pool_size, args.latency, progress)
+    summary = {"agents": summarize(r for r in rows if r["agent"] in args.agents),
+               "episodes": len(rows), "wall_time": elapsed}
+    text = json.dumps(summary, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
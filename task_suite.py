@@ -0,0 +1,281 @@
+import argparse
+import json
+import os
+import posixpath
+import random
+import re
+import sys
+
+# --- TASK SUITE FORMAT ---
+# A suite is a directory with one sub-directory per task:
+#
+#   suite/
+#     calculate_price/
+#       task.json        {"test_cmd": "python3 /app/main.py", "expect": "fail", "group": "...", "max_steps": 9}
+#       repo/...         The project, copied to task.json's "root" (default /app) in the sandbox
+#       solution/...     Optional: the fixed versions of the files the bug is in
+#
+# "expect" is what test_cmd does on the unmodified repo: "fail" for a bug to
+# fix, "pass" for a control task. load_task() turns a task directory into the
+# dict every agent's run_simulation(task, max_steps) takes.
+
+ROOT = "/app"
+TEST_CMD = "python3 /app/main.py"
+
+
+def load_task(path):
+    with open(os.path.join(path, "task.json")) as fh:
+        meta = json.load(fh)
+    root = meta.get("root", ROOT)
+    task = {
+        "name": meta.get("name") or os.path.basename(os.path.normpath(path)),
+        "group": meta.get("group", ""),
+        "test_cmd": meta.get("test_cmd", TEST_CMD),
+        "expect": meta.get("expect", "fail"),
+        "files": _read_dir(os.path.join(path, "repo"), root),
+        "solution": _read_dir(os.path.join(path, "solution"), root),
+    }
+    if "max_steps" in meta:
+        task["max_steps"] = meta["max_steps"]
+    if "bug" in meta:
+        task["bug"] = meta["bug"]
+    return task
+
+
+def load_suite(path):
+    """Every task under `path`, sorted by name."""
+    names = sorted(n for n in os.listdir(path) if os.path.isfile(os.path.join(path, n, "task.json")))
+    return [load_task(os.path.join(path, name)) for name in names]
+
+
+def save_task(suite, task, root=ROOT):
+    """Write a task dict (as load_task returns it) into suite/<name>/."""
+    path = os.path.join(suite, task["name"])
+    meta = {k: task[k] for k in ("group", "test_cmd", "expect", "max_steps", "bug") if k in task}
+    if root != ROOT:
+        meta["root"] = root
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "task.json"), "w") as fh:
+        json.dump(meta, fh, indent=2)
+        fh.write("\n")
+    _write_dir(os.path.join(path, "repo"), task["files"], root)
+    _write_dir(os.path.join(path, "solution"), task.get("solution") or {}, root)
+    return path
+
+
+def _read_dir(local, root):
+    files = {}
+    if not os.path.isdir(local):
+        return files
+    for folder, _, names in os.walk(local):
+        for name in sorted(names):
+            full = os.path.join(folder, name)
+            rel = os.path.relpath(full, local).replace(os.sep, "/")
+            with open(full) as fh:
+                files[posixpath.join(root, rel)] = fh.read()
+    return files
+
+
+def _write_dir(local, files, root):
+    for path, content in files.items():
+        rel = posixpath.relpath(path, root)
+        full = os.path.join(local, *rel.split("/"))
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as fh:
+            fh.write(content)
+
+
+# --- SYNTHETIC BUGS ---
+# Correct functions with argument generators, and single-edit mutations of
+# the kind models are asked to fix (wrong operator, off-by-one, flipped
+# comparison, wrong builtin). Each task hides one mutated function among
+# correct ones spread over several modules; main.py checks it and two others.
+
+TEMPLATES = {
+    "line_total": ("def {name}(price, quantity):\n    return price * quantity\n",
+                   lambda rng: (rng.randint(2, 50), rng.randint(2, 9))),
+    "ratio": ("def {name}(a, b):\n    return a / b\n",
+              lambda rng: (rng.randint(10, 99), rng.randint(2, 9))),
+    "sum_values": ("def {name}(values):\n    total = 0\n    for v in values:\n        total += v\n    return total\n",
+                   lambda rng: ([rng.randint(1, 20) for _ in range(rng.randint(3, 6))],)),
+    "triangular": ("def {name}(n):\n    return sum(range(1, n + 1))\n",
+                   lambda rng: (rng.randint(3, 30),)),
+    "at_least": ("def {name}(values, threshold):\n    return [v for v in values if v >= threshold]\n",
+                 lambda rng: ([rng.randint(0, 9) for _ in range(8)], rng.randint(2, 7))),
+    "with_tax": ("def {name}(amount, rate):\n    return round(amount * (1 + rate), 2)\n",
+                 lambda rng: (rng.randint(10, 500), rng.choice([0.05, 0.1, 0.2]))),
+    "shout": ("def {name}(text):\n    return text.strip().upper() + '!'\n",
+              lambda rng: (rng.choice(["  hello ", "fix me", " ok"]),)),
+    "last_item": ("def {name}(items):\n    return items[-1]\n",
+                  lambda rng: ([rng.randint(0, 99) for _ in range(rng.randint(2, 6))],)),
+    "clamp": ("def {name}(value, low, high):\n    if value < low:\n        return low\n"
+              "    if value > high:\n        return high\n    return value\n",
+              lambda rng: (rng.choice([rng.randint(-20, -1), rng.randint(11, 40)]), 0, 10)),
+    "fibonacci": ("def {name}(n):\n    a, b = 0, 1\n    for _ in range(n):\n        a, b = b, a + b\n    return a\n",
+                  lambda rng: (rng.randint(5, 20),)),
+}
+MUTATIONS = [
+    (r" \* ", " + "), (r" \+ ", " - "), (r" / ", " // "), (r">=", ">"), (r"< ", "<= "),
+    (r"> ", ">= "), (r"n \+ 1", "n"), (r"\[-1\]", "[0]"), (r"upper", "lower"),
+    (r"\+= v", "= v"), (r"1 \+ rate", "rate"), (r"return low", "return high"),
+    (r"range\(n\)", "range(n - 1)"), (r"\(1, ", "(0, "),
+]
+
+
+def generate_task(rng, name, modules=3, functions=4):
+    """One synthetic task dict (with its solution), or None if no mutation changed the checked result."""
+    kinds = list(TEMPLATES)
+    sources = {}        # module -> [(function name, kind)]
+    for m in range(modules):
+        sources[f"mod_{m}"] = [(f"{kind}_{m}_{f}", kind) for f, kind in enumerate(rng.sample(kinds, functions))]
+    module = rng.choice(list(sources))
+    target, kind = rng.choice(sources[module])
+    args = TEMPLATES[kind][1](rng)
+
+    correct = TEMPLATES[kind][0].format(name=target)
+    expected = _call(correct, target, args)
+    mutations = MUTATIONS[:]
+    rng.shuffle(mutations)
+    for pattern, replacement in mutations:
+        head, body = correct.split("\n", 1)
+        if not re.search(pattern, body):
+            continue
+        buggy = head + "\n" + re.sub(pattern, replacement, body, count=1)
+        try:
+            if _call(buggy, target, args) == expected:
+                continue
+        except Exception:
+            pass  # A crash is a fine bug too
+        break
+    else:
+        return None
+
+    files = {}
+    solution = {}
+    for mod, funcs in sources.items():
+        blocks = [TEMPLATES[k][0].format(name=f) for f, k in funcs]
+        text = "\n\n".join(blocks)
+        path = f"{ROOT}/{mod}.py"
+        if mod == module:
+            solution[path] = text
+            text = text.replace(correct, buggy)
+        files[path] = text
+
+    checks = [(module, target, args, expected)]
+    others = [(mod, f, k) for mod, funcs in sources.items() for f, k in funcs if f != target]
+    for mod, f, k in rng.sample(others, min(2, len(others))):
+        other_args = TEMPLATES[k][1](rng)
+        checks.append((mod, f, other_args, _call(TEMPLATES[k][0].format(name=f), f, other_args)))
+    rng.shuffle(checks)
+    files[f"{ROOT}/main.py"] = _test_script(checks)
+    return {
+        "name": name,
+        "group": "synthetic",
+        "test_cmd": TEST_CMD,
+        "expect": "fail",
+        "files": files,
+        "solution": solution,
+        "bug": {"path": f"{ROOT}/{module}.py", "function": target, "mutation": [pattern, replacement]},
+    }
+
+
+def generate_suite(path, n, seed=0, modules=3, functions=4):
+    rng = random.Random(seed)
+    written = []
+    i = 0
+    while len(written) < n:
+        task = generate_task(rng, f"synthetic_{seed}_{i:04d}", modules, functions)
+        i += 1
+        if task is not None:
+            written.append(save_task(path, task))
+    return written
+
+
+def _call(source, name, args):
+    scope = {}
+    exec(source, scope)
+    return scope[name](*args)
+
+
+def _test_script(checks):
+    lines = []
+    for mod in sorted({mod for mod, *_ in checks}):
+        names = sorted({f for m, f, *_ in checks if m == mod})
+        lines.append(f"from {mod} import {', '.join(names)}")
+    lines += ["", "", "def check(label, got, expected):",
+              "    if got != expected:",
+              "        print(f\"FAIL: {label}: expected {expected!r}, got {got!r}\")",
+              "        exit(1)", "", "", "if __name__ == \"__main__\":"]
+    for _, f, args, expected in checks:
+        call = f"{f}({', '.join(repr(a) for a in args)})"
+        lines.append(f"    check({call!r}, {call}, {expected!r})")
+    lines.append("    print(\"SUCCESS: all checks passed.\")")
+    return "\n".join(lines) + "\n"
+
+
+# --- CHECKING ---
+def check_task(d_client, task):
+    """
+    Does the task behave as declared? Runs test_cmd on the repo (must match
+    "expect") and, when there is a solution, on the repo with it applied
+    (must pass). Returns a list of problems, empty when the task is sound.
+    """
+    from sandbox_fs import write_files
+
+    problems = []
+    container = d_client.containers.run("python:3.10-slim", command="tail -f /dev/null", detach=True)
+    try:
+        write_files(container, task["files"])
+        res = container.exec_run(task["test_cmd"])
+        outcome = "pass" if res.exit_code == 0 else "fail"
+        if outcome != task["expect"]:
+            problems.append(f"expected the tests to {task['expect']} on the repo, they {outcome}ed")
+        if task.get("solution"):
+            write_files(container, task["solution"])
+            res = container.exec_run(task["test_cmd"])
+            if res.exit_code != 0:
+                problems.append("tests still fail with the solution applied")
+    finally:
+        container.kill()
+        container.remove()
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create and check task suites.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="write synthetic bug tasks into a suite directory")
+    gen.add_argument("suite")
+    gen.add_argument("--n", type=int, default=50)
+    gen.add_argument("--seed", type=int, default=0)
+    gen.add_argument("--modules", type=int, default=3, help="modules per repo")
+    gen.add_argument("--functions", type=int, default=4, help="functions per module")
+    chk = sub.add_parser("check", help="verify every task fails (or passes) as declared")
+    chk.add_argument("suite")
+    chk.add_argument("--docker", action="store_true", help="use the Docker daemon instead of fake_docker")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        written = generate_suite(args.suite, args.n, args.seed, args.modules, args.functions)
+        print(f"{len(written)} tasks written to {args.suite}")
+        return 0
+
+    if args.docker:
+        import docker
+        d_client = docker.from_env()
+    else:
+        from fake_docker import FakeDockerClient
+        d_client = FakeDockerClient()
+    tasks = load_suite(args.suite)
+    bad = 0
+    for task in tasks:
+        problems = check_task(d_client, task)
+        bad += bool(problems)
+        for problem in problems:
+            print(f"{task['name']}: {problem}")
+    print(f"{bad} of {len(tasks)} tasks are broken")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
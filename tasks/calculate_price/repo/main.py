@@ -0,0 +1,8 @@
+
+from utils import calculate_price
+if __name__ == "__main__":
+    total = calculate_price(10, 2)
+    if total != 20:
+        print(f"FAIL: Expected 20, got {total}")
+        exit(1)
+    print("SUCCESS: Cart total is correct.")
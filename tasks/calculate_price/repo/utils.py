@@ -0,0 +1,3 @@
+
+def calculate_price(price, quantity):
+    return price - quantity  # BUG
@@ -0,0 +1,11 @@
+def divide_numbers(a, b):
+    return a * b  # BUG: multiplication instead of division
+
+
+if __name__ == "__main__":
+    result = divide_numbers(10, 2)
+    expected = 5.0
+    if result != expected:
+        print(f"FAIL: Expected {expected}, got {result}")
+        exit(1)
+    print("SUCCESS: Test Passed!")
@@ -0,0 +1,53 @@
+import pytest
+
+from code_check import CodeRejected, CodeValidator, check_code, extract_code, public_signatures, strip_fences
+
+ORIGINAL = "def divide(a, b):\n    return a * b\n\n\nclass Cart:\n    def add(self, item, qty=1):\n        pass\n"
+FIXED = "def divide(a, b):\n    return a / b"
+
+
+def test_fenced_block():
+    assert extract_code(f"Here you go:\n```python\n{FIXED}\n```\nDone.") == FIXED
+
+
+def test_unclosed_fence_and_other_tags():
+    assert extract_code(f"```py\n{FIXED}\n") == FIXED
+    assert strip_fences("```diff\n-a\n+b\n```") == "-a\n+b"
+
+
+def test_prose_around_unfenced_code():
+    assert extract_code(f"Here is the fixed code:\n\n{FIXED}\n\nThis divides instead.") == FIXED
+
+
+def test_broken_code_is_returned_untouched():
+    broken = "def divide(a, b)\n    return a / b"
+    assert extract_code(broken) == broken
+
+
+def test_syntax_error_names_the_line():
+    with pytest.raises(CodeRejected, match="line 1"):
+        check_code("def divide(a, b)\n    return a / b")
+
+
+def test_signatures_must_be_kept():
+    assert public_signatures(ORIGINAL) == {"divide": "(a, b)", "Cart.add": "(self, item, qty)"}
+    with pytest.raises(CodeRejected, match="was removed"):
+        check_code("def divide(a, b):\n    return a / b\n", ORIGINAL)
+    with pytest.raises(CodeRejected, match="became"):
+        check_code(ORIGINAL.replace("def divide(a, b)", "def divide(a)"), ORIGINAL)
+    check_code(ORIGINAL.replace("a * b", "a / b"), ORIGINAL)
+
+
+def test_validator_counts():
+    validator = CodeValidator()
+    assert validator.clean(f"```python\n{FIXED}\n```", "/x.py") == FIXED
+    with pytest.raises(CodeRejected):
+        validator.clean("def divide(", "/x.py")
+    assert validator.clean("not python", "/notes.txt") == "not python"
+    assert validator.stats == {"checked": 2, "cleaned": 1, "rejected": 1}
+
+
+def test_fenced_example_in_a_docstring_is_kept():
+    source = 'def parse(text):\n    """\n    Example:\n    ```\n    x = 1\n    ```\n    """\n    return text\n'
+    assert extract_code(source) == source
+    assert CodeValidator().clean(source, "/app/parse.py", source) == source
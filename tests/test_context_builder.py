@@ -0,0 +1,28 @@
+from context_builder import ContextBuilder
+
+BIG = "x = 1\n" * 2000
+
+
+def test_reread_of_a_file_that_fits():
+    history = ContextBuilder(max_tokens=2000)
+    history.record_read("/app/utils.py", "def f():\n    pass\n")
+    history.record_read("/app/utils.py", "def f():\n    pass\n")
+    assert "(unchanged, see FILES)" in history.render()
+    assert "=== /app/utils.py ===\ndef f():" in history.render()
+
+
+def test_reread_of_a_clipped_file_says_so():
+    history = ContextBuilder(max_tokens=2000)
+    history.record_read("/app/big.py", BIG)
+    history.record_read("/app/big.py", BIG)
+    text = history.render()
+    assert "unchanged, see FILES" not in text
+    assert "start and end only in FILES" in text
+    assert "[clipped]" in text
+
+
+def test_file_too_long_to_show():
+    history = ContextBuilder(max_tokens=40)
+    history.record_read("/app/big.py", BIG)
+    text = history.render()
+    assert "(too long to show)" in text and "re-read if needed" not in text
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import llm_backends
+from llm_backends import FakeBackend, MicroBatcher, Router
+
+
+def test_router_sends_each_model_to_its_backend():
+    small, big = FakeBackend(lambda p: "small"), FakeBackend(lambda p: "big")
+    router = Router({"local": small, "gpu": big}, routes={"tiny": "local"}, default="gpu")
+    assert router.generate("x", model="tiny") == "small"
+    assert router.generate("x", model="coder") == "big"
+    assert len(router.metrics.calls) == 2
+
+
+def test_from_env_builds_a_router_for_per_role_backends(monkeypatch):
+    monkeypatch.setattr(llm_backends, "ROLE_MODELS", {"navigate": "tiny", "patch": "coder"})
+    monkeypatch.setenv("AGENT_LLM_BACKEND", "fake")
+    monkeypatch.setenv("AGENT_LLM_PATCH_BACKEND", "fake")
+    monkeypatch.setenv("AGENT_LLM_PATCH_URL", "http://gpu-box:8000/v1")
+    client = llm_backends.from_env()
+    assert isinstance(client, Router)
+    assert client.backend_for("coder") is not client.backend_for("tiny")
+    assert client.backend_for("coder").model == "coder"
+
+
+def test_from_env_single_backend(monkeypatch):
+    monkeypatch.setenv("AGENT_LLM_BACKEND", "fake")
+    monkeypatch.setenv("AGENT_LLM_BATCH", "4")
+    assert isinstance(llm_backends.from_env(), MicroBatcher)
+
+
+def test_from_env_rejects_ambiguous_routes(monkeypatch):
+    monkeypatch.setattr(llm_backends, "ROLE_MODELS", {"navigate": "same", "patch": "same"})
+    monkeypatch.setenv("AGENT_LLM_PATCH_BACKEND", "fake")
+    with pytest.raises(ValueError):
+        llm_backends.from_env()
+
+
+def test_scripted_fake_backend():
+    backend = FakeBackend(["one", "two"])
+    assert [backend.generate("x") for _ in range(3)] == ["one", "two", "two"]
+
+
+def test_backends_do_not_import_the_fake_server():
+    code = "import sys, llm_backends; print('fake_ollama' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert out.stdout.strip() == "False"
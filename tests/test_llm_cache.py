@@ -0,0 +1,71 @@
+import llm_client
+from llm_backends import FakeBackend
+from llm_cache import CachedLLM
+from stream_parsers import ExplorerActionParser
+
+GREEDY = {"temperature": 0.0}
+
+
+def counting_backend():
+    prompts = []
+    return FakeBackend(lambda prompt: prompts.append(prompt) or f"answer {len(prompts)}"), prompts
+
+
+def test_greedy_calls_are_answered_once():
+    backend, prompts = counting_backend()
+    llm = CachedLLM(backend)
+    assert llm.generate("fix it", options=GREEDY) == llm.generate("fix it", options=GREEDY) == "answer 1"
+    assert llm.generate("fix it", options=GREEDY, model="other") == "answer 2"
+    assert llm.generate("fix it", options=GREEDY, format="json") == "answer 3"
+    assert len(prompts) == 3 and llm.stats["memory_hits"] == 1
+
+
+def test_sampled_calls_are_not_cached():
+    backend, prompts = counting_backend()
+    llm = CachedLLM(backend)
+    llm.generate("fix it", options={"temperature": 0.7})
+    llm.generate("fix it")   # Ollama's default temperature is 0.8
+    assert len(prompts) == 2 and llm.stats["bypassed"] == 2
+
+
+def test_stream_and_generate_are_kept_apart():
+    backend, prompts = counting_backend()
+    llm = CachedLLM(backend)
+    llm.generate("p", options=GREEDY)
+    llm.stream("p", parser=ExplorerActionParser(), options=GREEDY)
+    llm.stream("p", parser=ExplorerActionParser(), options=GREEDY)
+    assert len(prompts) == 2
+
+
+def test_lru_and_ttl():
+    backend, prompts = counting_backend()
+    llm = CachedLLM(backend, max_entries=1)
+    llm.generate("a", options=GREEDY)
+    llm.generate("b", options=GREEDY)
+    llm.generate("a", options=GREEDY)
+    assert len(prompts) == 3
+    llm = CachedLLM(backend, ttl=-1)
+    llm.generate("a", options=GREEDY)
+    llm.generate("a", options=GREEDY)
+    assert len(prompts) == 5
+
+
+def test_disk_tier_survives_the_process(tmp_path):
+    db = str(tmp_path / "answers.db")
+    backend, prompts = counting_backend()
+    first = CachedLLM(backend, db_path=db)
+    first.generate("fix it", options=GREEDY)
+    first.close()
+    second = CachedLLM(backend, db_path=db)
+    assert second.generate("fix it", options=GREEDY) == "answer 1"
+    assert second.stats["disk_hits"] == 1 and len(prompts) == 1
+    assert second.hit_rate() == 1.0
+
+
+def test_get_client_opts_in_from_the_environment(monkeypatch):
+    monkeypatch.setattr(llm_client, "_default_client", None)
+    monkeypatch.setenv("AGENT_LLM_BACKEND", "fake")
+    monkeypatch.setenv("AGENT_LLM_CACHE", "1")
+    client = llm_client.get_client()
+    assert isinstance(client, CachedLLM) and client._db is None
+    assert llm_client.get_client() is client
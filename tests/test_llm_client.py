@@ -0,0 +1,117 @@
+import pytest
+import requests
+
+import llm_client
+from fake_ollama import FakeOllamaServer
+from llm_client import LLMError, LLMMetrics, OllamaClient
+from stream_parsers import ExplorerActionParser
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, lines=(), error=None):
+        self.status_code = status_code
+        self.body = body or {}
+        self.lines = lines
+        self.error = error
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self.body
+
+    def iter_lines(self):
+        yield from self.lines
+        if self.error:
+            raise self.error
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Answers each post() with the next of `answers`; an exception is raised instead."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.posts = 0
+
+    def post(self, url, **kwargs):
+        self.posts += 1
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(llm_client.time, "sleep", slept.append)
+    return slept
+
+
+def test_generate_over_one_session():
+    with FakeOllamaServer(["one", "two"]) as server:
+        client = OllamaClient(url=server.url)
+        assert [client.generate("a"), client.generate("b")] == ["one", "two"]
+        assert [r["prompt"] for r in server.requests] == ["a", "b"]
+        client.close()
+    summary = client.metrics.summary()
+    assert (summary["calls"], summary["failed"], summary["retries"]) == (2, 0, 0)
+
+
+def test_connection_errors_are_retried_with_backoff(sleeps):
+    client = OllamaClient(backoff=0.5)
+    client.session = FakeSession(requests.ConnectionError("refused"), FakeResponse(503),
+                                 FakeResponse(body={"response": "OK", "eval_count": 1}))
+    assert client.generate("ping") == "OK"
+    assert sleeps == [0.5, 1.0]
+    assert client.metrics.summary()["retries"] == 2
+
+
+def test_client_errors_are_not_retried(sleeps):
+    client = OllamaClient()
+    client.session = FakeSession(FakeResponse(404))
+    with pytest.raises(LLMError) as e:
+        client.generate("ping")
+    assert e.value.attempts == 1 and sleeps == []
+    assert client.metrics.summary()["failed"] == 1
+
+
+def test_retries_run_out(sleeps):
+    client = OllamaClient(max_retries=2)
+    client.session = FakeSession(*[requests.Timeout("slow")] * 3)
+    with pytest.raises(LLMError, match="after 3 attempts"):
+        client.generate("ping")
+    assert client.session.posts == 3 and len(sleeps) == 2
+
+
+def test_broken_stream_counts_as_failed():
+    client = OllamaClient()
+    client.session = FakeSession(FakeResponse(lines=[b'{"response": "READ"}'],
+                                              error=requests.ConnectionError("reset")))
+    with pytest.raises(LLMError, match="broke off"):
+        client.stream("ping")
+    assert client.metrics.summary()["failed"] == 1
+
+
+def test_stream_hangs_up_once_the_action_is_known():
+    answer = "READ_FILE /app/utils.py\n" + "word " * 200
+    with FakeOllamaServer([answer]) as server:
+        client = OllamaClient(url=server.url)
+        assert client.stream("ping", parser=ExplorerActionParser()) == "READ_FILE /app/utils.py"
+        client.close()
+    assert client.metrics.summary()["cancelled"] == 1
+
+
+def test_metrics_keep_only_the_last_calls():
+    metrics = LLMMetrics(max_calls=3)
+    for i in range(4):
+        metrics.record(ok=True, latency=i, retries=0, prompt_tokens=0, completion_tokens=1)
+    mark = metrics.mark()
+    metrics.record(ok=False, latency=9, retries=1, prompt_tokens=0, completion_tokens=0)
+    assert len(metrics.calls) == 3 and metrics.total == 5
+    assert metrics.summary()["completion_tokens"] == 2
+    assert metrics.summary(since=mark) == {**metrics.summary(since=mark), "calls": 1, "failed": 1, "retries": 1}
@@ -0,0 +1,40 @@
+import pytest
+
+from patching import PatchError, apply_patch, is_patch
+
+ORIGINAL = "def total(price, quantity):\n    return price + quantity\n\n\ndef ok():\n    return 1\n"
+
+
+def test_search_replace():
+    patch = "<<<<<<< SEARCH\n    return price + quantity\n=======\n    return price * quantity\n>>>>>>> REPLACE"
+    assert is_patch(patch)
+    assert "return price * quantity" in apply_patch(ORIGINAL, patch, "utils.py")
+
+
+def test_search_replace_ignores_indentation():
+    patch = "<<<<<<< SEARCH\nreturn price + quantity\n=======\nreturn price * quantity\n>>>>>>> REPLACE"
+    assert "    return price * quantity\n" in apply_patch(ORIGINAL, patch)
+
+
+def test_unified_diff():
+    diff = ("--- a/utils.py\n+++ b/utils.py\n@@ -1,2 +1,2 @@\n def total(price, quantity):\n"
+            "-    return price + quantity\n+    return price * quantity\n")
+    assert apply_patch(ORIGINAL, diff, "utils.py").startswith("def total(price, quantity):\n    return price * q")
+
+
+def test_search_not_found():
+    patch = "<<<<<<< SEARCH\n    return nothing\n=======\n    return 0\n>>>>>>> REPLACE"
+    with pytest.raises(PatchError, match="not found"):
+        apply_patch(ORIGINAL, patch)
+
+
+def test_result_must_parse():
+    patch = "<<<<<<< SEARCH\n    return price + quantity\n=======\n    return price *\n>>>>>>> REPLACE"
+    with pytest.raises(PatchError, match="does not parse"):
+        apply_patch(ORIGINAL, patch, "utils.py")
+
+
+def test_not_a_patch():
+    assert not is_patch(ORIGINAL)
+    with pytest.raises(PatchError):
+        apply_patch(ORIGINAL, ORIGINAL)
@@ -0,0 +1,66 @@
+from fake_docker import FakeDockerClient
+from prefetch import Prefetcher
+from repo_index import RepoIndex
+from sandbox_fs import write_files
+from tools import TOOLS, ToolCall, ToolContext, ToolResult
+from verify_cache import Workspace
+
+FILES = {
+    "/app/main.py": "from utils import total\nassert total(2, 3) == 6, 'wrong total'\nprint('SUCCESS')\n",
+    "/app/utils.py": "def total(price, quantity):\n    return price + quantity\n",
+    "/app/helpers.py": "def unused():\n    pass\n",
+}
+TRACEBACK = ('Traceback (most recent call last):\n  File "/app/helpers.py", line 2, in <module>\n'
+             'AssertionError: wrong total')
+
+
+def make_prefetcher(**kwargs):
+    container = FakeDockerClient().containers.run("python:3.10-slim", detach=True)
+    write_files(container, FILES)
+    write = lambda container, path, content: write_files(container, {path: content})
+    ctx = ToolContext(container, "python3 /app/main.py", write, workspace=Workspace(FILES), index=RepoIndex(FILES))
+    ctx.prefetch = Prefetcher(ctx, TOOLS, **kwargs)
+    return ctx, ctx.prefetch
+
+
+def test_predict_puts_the_traceback_first():
+    ctx, prefetcher = make_prefetcher()
+    failed = [(ToolCall("run_test", {}), ToolResult(TRACEBACK, 1))]
+    assert [tuple(c.args.values())[0] for c in prefetcher.predict(failed)] == [
+        "/app/helpers.py", "/app/main.py", "/app/utils.py", "/app"]
+    prefetcher.close()
+    ctx, prefetcher = make_prefetcher(max_speculative=2)
+    assert len(prefetcher.predict(failed)) == 2
+    prefetcher.close()
+
+
+def test_a_correct_guess_is_served_from_the_buffer():
+    ctx, prefetcher = make_prefetcher()
+    prefetcher.speculate()
+    prefetcher.speculate()   # Already in flight at this digest: not issued twice
+    assert prefetcher.stats["issued"] == 3
+    result = TOOLS.dispatch(ToolCall("read_file", {"path": "utils.py"}), ctx)
+    assert result.content == FILES["/app/utils.py"]
+    assert prefetcher.stats["hits"] == 1 and prefetcher.hit_rate() == 1 / 3
+    prefetcher.close()
+    assert prefetcher.stats["discarded"] == 2
+
+
+def test_a_write_discards_what_was_prefetched():
+    ctx, prefetcher = make_prefetcher()
+    prefetcher.speculate()
+    new = "def total(price, quantity):\n    return price * quantity\n"
+    TOOLS.dispatch(ToolCall("write_file", {"path": "/app/utils.py", "content": new}), ctx)
+    assert prefetcher.stats["discarded"] == 3
+    assert TOOLS.dispatch(ToolCall("read_file", {"path": "/app/utils.py"}), ctx).content == new
+    assert prefetcher.stats["hits"] == 0
+    prefetcher.close()
+
+
+def test_results_from_an_older_workspace_are_not_served():
+    ctx, prefetcher = make_prefetcher()
+    prefetcher.speculate()
+    ctx.workspace.update({"/app/utils.py": "total = None\n"})
+    assert prefetcher.take("read_file", {"path": "/app/utils.py"}) is None
+    assert prefetcher.stats == {"issued": 3, "hits": 0, "misses": 1, "discarded": 1}
+    prefetcher.close()
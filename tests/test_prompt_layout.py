@@ -0,0 +1,44 @@
+from fake_ollama import FakeOllamaServer
+from llm_client import OllamaClient
+from prompt_layout import PromptLayout, new_tokens, report_prefill, shared_prefix
+
+LAYOUT = PromptLayout("""
+    TOOLS: read_file, write_file, run_test
+    INSTRUCTIONS: answer with one JSON action.
+    """, suffix="\nNEXT ACTION:")
+
+
+def test_render_keeps_the_static_text_first():
+    prompt = LAYOUT.render("TASK: fix utils.py", "HISTORY: run_test failed")
+    assert prompt.startswith("TOOLS: read_file, write_file, run_test\nINSTRUCTIONS:")
+    assert prompt.endswith("TASK: fix utils.py\n\nHISTORY: run_test failed\nNEXT ACTION:")
+
+
+def test_only_the_text_after_the_shared_prefix_is_new():
+    first = LAYOUT.render("TASK: fix utils.py", "HISTORY:")
+    second = LAYOUT.render("TASK: fix utils.py", "HISTORY: run_test failed")
+    assert shared_prefix(first, second) == first.index("HISTORY:") + len("HISTORY:")
+    tokens, fresh = new_tokens(new_tokens((), first)[0], second)
+    assert "".join(tokens) == second
+    assert fresh == 4   # " run_test", " failed", "\nNEXT", " ACTION:"
+
+
+def test_report_prefill_reads_the_servers_prompt_eval(capsys):
+    with FakeOllamaServer(responder=lambda payload: "{}", prefill_latency=0.001) as server:
+        client = OllamaClient(url=server.url)
+        mark = client.metrics.mark()
+        client.generate(LAYOUT.render("TASK: fix utils.py", "HISTORY:"))
+        full = report_prefill(client, mark)
+        mark = client.metrics.mark()
+        client.generate(LAYOUT.render("TASK: fix utils.py", "HISTORY: run_test failed"))
+        step = report_prefill(client, mark)
+    assert 0 < step < full
+    assert "new prompt tokens" in capsys.readouterr().out
+
+
+def test_report_prefill_without_server_timings():
+    with FakeOllamaServer(responder=lambda payload: "{}") as server:
+        client = OllamaClient(url=server.url)
+        mark = client.metrics.mark()
+        client.generate("hello")
+        assert report_prefill(client, mark) is None
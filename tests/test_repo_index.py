@@ -0,0 +1,55 @@
+from fake_docker import FakeDockerClient
+from repo_index import MAX_MATCHES, RepoIndex
+from sandbox_fs import write_files
+
+FILES = {
+    "/app/pricing.py": ("TAX = 0.2\n\n\nclass Cart:\n    def total(self, items):\n"
+                        "        return sum(price(i) for i in items)\n\n\n"
+                        "def price(item):\n    return item.cost * (1 + TAX)\n"),
+    "/app/main.py": "from pricing import Cart\n\nprint(Cart().total([]))\n",
+    "/app/README.md": "def not_python(): pass\n",
+}
+
+
+def test_definitions_callers_and_importers():
+    index = RepoIndex(FILES)
+    assert [(s.qualname, s.kind, s.lineno) for s in index.definitions("total")] == [("Cart.total", "method", 5)]
+    assert index.definitions("Cart.total") == index.definitions("total")
+    assert index.definitions("Other.total") == []
+    assert [(c.path, c.caller) for c in index.callers("price")] == [("/app/pricing.py", "Cart.total")]
+    assert index.importers("Cart") == ["/app/main.py"]
+    assert index.definitions("TAX")[0].kind == "variable"
+    assert "/app/README.md" not in index.sources
+
+
+def test_descriptions_quote_the_source():
+    index = RepoIndex(FILES)
+    text = index.describe_definition("Cart")
+    assert text.startswith("=== /app/pricing.py:4 (class Cart) ===\nclass Cart:")
+    assert text.endswith("Imported by: /app/main.py")
+    assert index.describe_callers("total") == "/app/main.py:3 in <module>: print(Cart().total([]))"
+    assert index.describe_definition("missing") is None and index.describe_callers("missing") is None
+
+
+def test_describe_callers_is_capped():
+    calls = "".join(f"f({n})\n" for n in range(MAX_MATCHES + 3))
+    text = RepoIndex({"/app/many.py": "def f(x): pass\n" + calls}).describe_callers("f")
+    assert text.splitlines()[-1] == "... 3 more call sites"
+
+
+def test_update_replaces_a_files_entries():
+    index = RepoIndex(FILES)
+    index.update("/app/pricing.py", "def price(item):\n    return item.cost\n")
+    assert index.definitions("Cart") == [] and index.callers("price") == []
+    assert [s.lineno for s in index.definitions("price")] == [1]
+    index.update("/app/main.py", "from pricing import (\n")
+    assert "/app/main.py" in index.errors and index.importers("Cart") == []
+    index.update("/app/main.py", FILES["/app/main.py"])
+    assert index.errors == {}
+
+
+def test_from_container_reads_python_files():
+    container = FakeDockerClient().containers.run("python:3.10-slim", detach=True)
+    write_files(container, FILES)
+    index = RepoIndex.from_container(container)
+    assert set(index.sources) == {"/app/pricing.py", "/app/main.py"}
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from fake_docker import FakeDockerClient
+from sandbox_exec import SandboxExecutor
+from sandbox_limits import TIMEOUT_EXIT, with_timeout
+
+
+@pytest.fixture
+def executor(tmp_path):
+    app = tmp_path / "app"
+    app.mkdir()
+    (app / "main.py").write_text("print('SUCCESS')\n")
+    (app / "loop.py").write_text("while True:\n    pass\n")
+    container = FakeDockerClient().containers.run("python:3.10-slim", detach=True)
+    executor = SandboxExecutor.spawn_local(str(tmp_path))
+    executor.container = container   # Anything the daemon does not answer lands here
+    yield executor
+    executor.close()
+
+
+def test_daemon_answers_reads_and_runs(executor):
+    assert executor.exec_run("cat /app/main.py").output == b"print('SUCCESS')\n"
+    res = executor.exec_run("python3 /app/main.py")
+    assert (res.exit_code, res.output) == (0, b"SUCCESS\n")
+    assert executor.container.exec_count == 0
+
+
+def test_timed_test_runs_stay_on_the_daemon(executor):
+    res = executor.exec_run(with_timeout("python3 /app/main.py", 30))
+    assert res.exit_code == 0 and executor.calls == 1
+    res = executor.exec_run(with_timeout("python3 /app/loop.py", 0.5))
+    assert res.exit_code == TIMEOUT_EXIT
+    assert executor.container.exec_count == 0
+
+
+def test_other_commands_fall_through(executor):
+    assert executor.exec_run(["true"]).exit_code == 0
+    assert executor.container.exec_count == 1
+
+
+def _gone(pid, wait=2.0):
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        try:
+            with open(f"/proc/{pid}/stat") as fh:
+                if fh.read().split(") ")[-1].startswith("Z"):
+                    return True
+        except FileNotFoundError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_timeout_kills_what_the_test_started(executor, tmp_path):
+    pidfile = tmp_path / "child.pid"
+    (tmp_path / "app" / "spawn.py").write_text(
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        f"open({str(pidfile)!r}, 'w').write(str(child.pid))\n"
+        "time.sleep(60)\n")
+    res = executor.exec_run(with_timeout("python3 /app/spawn.py", 1))
+    assert res.exit_code == TIMEOUT_EXIT
+    assert _gone(int(pidfile.read_text()))
+
+
+def test_shell_timeout_kills_the_whole_pipeline(executor, tmp_path):
+    pidfile = tmp_path / "sleep.pid"
+    res = executor.run(f"sleep 60 & echo $! > {pidfile}; wait", timeout=0.5)
+    assert res["exit_code"] == TIMEOUT_EXIT and res["timed_out"]
+    assert _gone(int(pidfile.read_text()))
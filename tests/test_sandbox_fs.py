@@ -0,0 +1,33 @@
+import io
+import tarfile
+
+from fake_docker import FakeDockerClient
+from sandbox_fs import Snapshot, build_tar, read_files, write_files
+
+
+def test_build_tar_has_files_only():
+    files = {"/app/pkg/mod.py": "x = 1\n", "/tmp/.executor_daemon.py": "pass\n"}
+    with tarfile.open(fileobj=io.BytesIO(build_tar(files))) as tar:
+        members = {m.name: m for m in tar}
+        assert set(members) == {"app/pkg/mod.py", "tmp/.executor_daemon.py"}   # /tmp keeps its 1777
+        assert members["app/pkg/mod.py"].mode == 0o644
+        assert tar.extractfile(members["app/pkg/mod.py"]).read() == b"x = 1\n"
+
+
+def test_write_and_read_back():
+    container = FakeDockerClient().containers.run("python:3.10-slim", detach=True)
+    files = {"/app/main.py": "print('hi')\n", "/app/utils.py": "def f():\n    pass\n"}
+    write_files(container, files)
+    assert read_files(container, list(files) + ["/app/missing.py"]) == files
+
+
+def test_snapshot_restore_and_fork():
+    client = FakeDockerClient()
+    a, b = (client.containers.run("python:3.10-slim", detach=True) for _ in range(2))
+    write_files(a, {"/app/utils.py": "original\n"})
+    snapshot = Snapshot.take(a, ["/app"])
+    write_files(a, {"/app/utils.py": "patched\n", "/app/new.py": "extra\n"})
+    snapshot.restore(a)
+    assert a.files == {"/app/utils.py": "original\n"}
+    snapshot.fork([b])
+    assert b.files == a.files
@@ -0,0 +1,37 @@
+from fake_docker import FakeDockerClient
+from sandbox_limits import TestTimeouts as Timeouts  # A Test* name would be collected
+from sandbox_limits import (MAX_TIMEOUT, MIN_TIMEOUT, TIMEOUT_EXIT, container_limits, split_timeout,
+                            start_container, with_timeout)
+
+
+def test_with_timeout_round_trip():
+    assert with_timeout("python3 /app/main.py", 2.5) == "timeout -k 1 2.5 python3 /app/main.py"
+    assert split_timeout(with_timeout(["python3", "/app/main.py"], 30)) == (30.0, ["python3", "/app/main.py"])
+    assert split_timeout(["python3", "/app/main.py"]) == (None, ["python3", "/app/main.py"])
+
+
+def test_timeouts_learn_from_passing_runs():
+    timeouts = Timeouts(default=30, factor=3)
+    assert timeouts.timeout("task") == 30
+    timeouts.record("task", 0.1, 0)
+    assert timeouts.timeout("task") == MIN_TIMEOUT
+    timeouts.record("task", 10, 0)
+    assert timeouts.timeout("task") == 30
+    timeouts.record("task", 100, 0)
+    assert timeouts.timeout("task") == MAX_TIMEOUT
+    assert timeouts.stats == {"runs": 3, "timeouts": 0}
+
+
+def test_failing_runs_do_not_shorten_the_timeout():
+    timeouts = Timeouts(default=30)
+    timeouts.record("task", 0.1, 1)     # A bug that fails on the first assertion
+    timeouts.record("task", 999, TIMEOUT_EXIT)
+    assert timeouts.timeout("task") == 30
+    assert timeouts.stats == {"runs": 2, "timeouts": 1}
+
+
+def test_containers_start_with_limits():
+    client = FakeDockerClient()
+    container = start_container(client, "python:3.10-slim")
+    assert container.limits == container_limits()
+    assert container.limits["memswap_limit"] == container.limits["mem_limit"]
@@ -0,0 +1,68 @@
+from fake_docker import FakeDockerClient
+from sandbox_fs import write_files
+from sandbox_output import CappedSandbox, OutputCapture
+
+NOISY = "import sys\nfor i in range(5000):\n    print('line', i)\nraise ValueError('boom')\n"
+RUNAWAY = "while True:\n    print('x' * 1000)\n"
+
+
+def make_sandbox(files, **kwargs):
+    container = FakeDockerClient().containers.run("python:3.10-slim", detach=True)
+    write_files(container, files)
+    return CappedSandbox(container, **kwargs)
+
+
+def test_capture_keeps_head_and_tail():
+    capture = OutputCapture(10, 10)
+    for i in range(100):
+        capture.feed(b"%05d\n" % i)
+    text = capture.render()
+    assert capture.truncated and capture.total == 600
+    assert text.startswith(b"00000\n0000") and text.endswith(b"00099\n")
+    assert b"[580 bytes omitted]" in text
+
+
+def test_traceback_that_scrolled_away_is_kept():
+    capture = OutputCapture(16, 16)
+    capture.feed(b"Traceback (most recent call last):\n  File \"/app/x.py\", line 3\nValueError: boom\n")
+    capture.feed(b"." * 1000 + b"\n")
+    text = capture.render()
+    assert b"LAST TRACEBACK (from the omitted output):" in text and text.rstrip().endswith(b"ValueError: boom")
+
+
+def test_short_output_is_untouched():
+    sandbox = make_sandbox({"/app/main.py": "print('SUCCESS')\n"})
+    res = sandbox.exec_run("python3 /app/main.py")
+    assert res == (0, b"SUCCESS\n", False)
+
+
+def test_long_test_output_is_capped_with_the_error():
+    sandbox = make_sandbox({"/app/main.py": NOISY}, limits={"run": (256, 256)})
+    res = sandbox.exec_run("python3 /app/main.py")
+    assert res.exit_code == 1 and res.truncated
+    assert len(res.output) < 2048 and b"ValueError: boom" in res.output
+    assert sandbox.saved() > 40000
+
+
+def test_runaway_output_is_killed():
+    sandbox = make_sandbox({"/app/loop.py": RUNAWAY}, kill_on_overflow=True, kill_after=100000)
+    res = sandbox.exec_run("python3 /app/loop.py")
+    assert res.exit_code == 137 and res.output.endswith(b"bytes of output]")
+    assert sandbox.output_stats["killed"] == 1
+
+
+def test_exit_code_waits_for_the_exec_to_finish():
+    sandbox = make_sandbox({"/app/main.py": "raise SystemExit(3)\n"})
+    api = sandbox.container.client.api
+    inspect = api.exec_inspect
+    polls = []
+
+    def lagging_inspect(exec_id):
+        polls.append(exec_id)
+        if len(polls) < 3:   # Stream closed, process not reaped yet
+            return {"ExitCode": None, "Running": True}
+        return inspect(exec_id)
+
+    api.exec_inspect = lagging_inspect
+    assert sandbox.exec_run("python3 /app/main.py").exit_code == 3
+    assert len(polls) == 3
@@ -0,0 +1,93 @@
+import threading
+
+from fake_docker import FakeDockerClient
+from sandbox_fs import write_files
+from sandbox_pool import SandboxPool
+
+
+def make_pool(size=2, **kwargs):
+    client = FakeDockerClient()
+    return client, SandboxPool(client, size=size, **kwargs).start(background=False)
+
+
+def test_checkout_reuses_warm_containers():
+    client, pool = make_pool(size=1)
+    container = pool.checkout()
+    pool.checkin(container)
+    assert pool.checkout() is container
+    assert pool.stats["warm_hits"] == 2 and pool.stats["cold_starts"] == 0
+    assert client.containers.started == 1
+
+
+def test_empty_pool_cold_starts():
+    _, pool = make_pool(size=1)
+    pool.checkout()
+    pool.checkout()
+    assert pool.stats["cold_starts"] == 1
+
+
+def test_reset_removes_everything_written():
+    _, pool = make_pool(size=1)
+    container = pool.checkout()
+    write_files(container, {"/app/main.py": "x", "/utils.py": "y", "/tmp/.executor_daemon.py": "z"})
+    pool.checkin(container)
+    assert container.files == {}
+    assert pool.idle_count() == 1
+
+
+def test_unhealthy_and_worn_out_containers_are_replaced():
+    _, pool = make_pool(size=1, max_uses=2)
+    container = pool.checkout()
+    pool.checkin(container)
+    container = pool.checkout()
+    pool.checkin(container)               # Second use: retired
+    assert container.status == "removed"
+    container = pool.checkout()
+    container.kill()
+    pool.checkin(container, healthy=False)
+    assert pool.stats["destroyed"] == 2
+
+
+def test_concurrent_checkins_lose_no_counts():
+    _, pool = make_pool(size=8, max_uses=1000)
+    containers = [pool.checkout() for _ in range(8)]
+    barrier = threading.Barrier(8)
+
+    def cycle(container):
+        barrier.wait()
+        for _ in range(20):
+            pool.checkin(container)
+            container = pool.checkout()
+        pool.checkin(container)
+
+    threads = [threading.Thread(target=cycle, args=(c,)) for c in containers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert pool.stats["warm_hits"] + pool.stats["cold_starts"] == 8 + 8 * 20
+
+
+def test_refill_checks_idle_containers_one_at_a_time():
+    _, pool = make_pool(size=3)
+    available = []
+    check = pool.is_healthy
+    pool.is_healthy = lambda container: available.append(pool.idle_count()) or check(container)
+    pool.refill()
+    assert available == [2, 2, 2]
+    assert pool.idle_count() == 3
+
+
+def test_refill_does_not_grow_past_size():
+    _, pool = make_pool(size=1)
+    borrowed = pool.checkout()
+    create = pool._create
+
+    def create_while_checkin():
+        pool.checkin(borrowed)   # Fills the pool while the new container starts
+        return create()
+
+    pool._create = create_while_checkin
+    pool.refill()
+    assert pool.idle_count() == 1
+    assert pool.stats["destroyed"] == 1
@@ -0,0 +1,46 @@
+from fake_docker import FakeDockerClient
+from sandbox_exec import SandboxExecutor
+from sandbox_limits import ResourceMeter
+from sandbox_output import CappedSandbox
+from sandbox_pool import SandboxPool
+from sandbox_session import close_sandbox, open_sandbox, report_episode
+
+
+def test_capped_sandbox_goes_back_to_the_pool_bare():
+    client = FakeDockerClient()
+    pool = SandboxPool(client, size=1).start(background=False)
+    sandbox = open_sandbox(client, pool, cap_output=True)
+    assert isinstance(sandbox, CappedSandbox) and pool.idle_count() == 0
+    close_sandbox(sandbox, pool)
+    assert pool.idle_count() == 1
+    assert pool.checkout() is sandbox.container
+
+
+def test_executor_is_closed_before_checkin(tmp_path):
+    client = FakeDockerClient()
+    pool = SandboxPool(client, size=1).start(background=False)
+    container = pool.checkout()
+    executor = SandboxExecutor.spawn_local(str(tmp_path))
+    executor.container = container
+    close_sandbox(CappedSandbox(executor, stream=False), pool)
+    assert executor._closer is None
+    assert pool.checkout() is container
+
+
+def test_without_a_pool_the_container_is_removed():
+    client = FakeDockerClient()
+    sandbox = open_sandbox(client)
+    close_sandbox(sandbox)
+    assert sandbox.status == "removed"
+
+
+def test_report_episode(capsys):
+    client = FakeDockerClient()
+    sandbox = open_sandbox(client, cap_output=True)
+    meter = ResourceMeter(sandbox)
+    sandbox.exec_run("ls /")
+    usage = report_episode(sandbox, meter)
+    out = capsys.readouterr().out
+    assert "[Output Cap]" in out
+    assert usage is None or "[Resources]" in out
+    close_sandbox(sandbox)
@@ -0,0 +1,59 @@
+import threading
+import time
+
+from scheduler import EpisodeScheduler, _fair_order
+
+
+class SleepyAgent:
+    """Stand-in agent: each episode sleeps, and the peak number running at once is kept."""
+
+    def __init__(self, seconds=0.05, fail=()):
+        self.seconds = seconds
+        self.fail = set(fail)
+        self.running = 0
+        self.peak = 0
+        self.budgets = {}
+        self._lock = threading.Lock()
+
+    def run_simulation(self, task, max_steps):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.budgets[task["name"]] = max_steps
+        try:
+            time.sleep(self.seconds)
+            if task["name"] in self.fail:
+                raise RuntimeError("sandbox died")
+            return {"solved": True, "steps": 2}
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def tasks(n, groups=1):
+    return [{"name": f"t{i}", "group": f"g{i % groups}"} for i in range(n)]
+
+
+def test_groups_take_turns():
+    order = _fair_order([{"name": "a1", "group": "a"}, {"name": "a2", "group": "a"}, {"name": "a3", "group": "a"},
+                         {"name": "b1", "group": "b"}])
+    assert [t["name"] for t in order] == ["a1", "b1", "a2", "a3"]
+
+
+def test_episodes_overlap_up_to_the_concurrency():
+    agent = SleepyAgent()
+    report = EpisodeScheduler(agent, concurrency=4).run(tasks(12))
+    assert report["solved"] == 12 and report["episodes"] == 12
+    assert agent.peak == 4
+    assert report["wall_time"] < 12 * agent.seconds / 2
+
+
+def test_step_budget_and_errors():
+    agent = SleepyAgent(seconds=0, fail={"t1"})
+    batch = tasks(3)
+    batch[2]["max_steps"] = 3
+    report = EpisodeScheduler(agent, concurrency=2, step_budget=5).run(batch)
+    assert agent.budgets == {"t0": 5, "t1": 5, "t2": 3}
+    assert report["errors"] == 1 and report["solved"] == 2
+    failed = next(r for r in report["results"] if r["name"] == "t1")
+    assert failed["error"] == "sandbox died" and not failed["solved"]
@@ -0,0 +1,30 @@
+from stream_parsers import ExplorerActionParser, JSONObjectParser
+
+
+def feed_all(parser, text):
+    for i, ch in enumerate(text):
+        if parser.feed(ch):
+            return i + 1
+    return None
+
+
+def test_short_command_stops_after_first_line():
+    parser = ExplorerActionParser()
+    text = "READ_FILE /app/utils.py\nI will now read the file"
+    assert feed_all(parser, text) == len("READ_FILE /app/utils.py\n")
+    assert parser.result == "READ_FILE /app/utils.py"
+
+
+def test_write_file_streams_to_the_end():
+    parser = ExplorerActionParser()
+    text = "WRITE_FILE /app/utils.py\ndef f():\n    pass\n"
+    assert feed_all(parser, text) is None
+    assert not parser.done
+
+
+def test_json_object_ends_at_closing_brace():
+    parser = JSONObjectParser()
+    text = '{"action": "write_file", "content": "x = {\\"a\\": \\"}\\"}"} trailing'
+    stop = feed_all(parser, text)
+    assert parser.result == text[:text.index("} trailing") + 1]
+    assert stop == len(parser.result)
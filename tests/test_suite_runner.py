@@ -0,0 +1,45 @@
+import os
+import random
+
+import suite_runner
+import task_suite
+from fake_docker import FakeDockerClient
+
+
+def test_generated_tasks_fail_and_their_solution_passes(tmp_path):
+    paths = task_suite.generate_suite(str(tmp_path), 3, seed=7)
+    tasks = task_suite.load_suite(str(tmp_path))
+    assert [t["name"] for t in tasks] == sorted(p.rsplit("/", 1)[-1] for p in paths)
+    for task in tasks:
+        assert task_suite.check_task(FakeDockerClient(), task) == []
+        assert task["bug"]["path"] in task["files"] and task["solution"]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    task = task_suite.generate_task(random.Random(1), "one")
+    task_suite.save_task(str(tmp_path), task)
+    loaded = task_suite.load_task(str(tmp_path / "one"))
+    assert {k: loaded[k] for k in task} == task
+
+
+def test_run_suite_writes_one_row_per_episode_and_resumes(tmp_path):
+    suite = tmp_path / "suite"
+    task_suite.generate_suite(str(suite), 2, seed=3)
+    results = str(tmp_path / "results.jsonl")
+    agents = ["agi_agent_v4"]
+    rows, _ = suite_runner.run_suite(str(suite), agents, results, workers=1)
+    assert len(rows) == 2 and all(r["solved"] and r["error"] is None for r in rows)
+
+    with open(results, "a") as fh:
+        fh.write('{"agent": "agi_agent_v4", "ta')   # A line cut short by a crash
+    ran = []
+    rows, _ = suite_runner.run_suite(str(suite), agents, results, workers=1, resume=True,
+                                     progress=lambda i, n, row: ran.append(row))
+    assert ran == [] and len(rows) == 2
+
+    report = suite_runner.summarize(rows)["agi_agent_v4"]
+    assert report["solve_rate"] == 1.0 and report["errors"] == 0
+
+
+def test_results_default_outside_the_checkout():
+    assert not suite_runner.RESULTS.startswith(os.getcwd())
@@ -0,0 +1,96 @@
+import time
+
+from fake_docker import FakeDockerClient
+from sandbox_fs import write_files
+from tools import TOOLS, ToolCall, ToolContext, ToolRegistry, ToolResult
+from verify_cache import Workspace
+
+FILES = {
+    "/app/main.py": "from utils import total\nassert total(2, 3) == 6, 'wrong total'\nprint('SUCCESS')\n",
+    "/app/utils.py": "def total(price, quantity):\n    return price + quantity\n",
+}
+PATCH = "<<<<<<< SEARCH\n    return price + quantity\n=======\n    return price * quantity\n>>>>>>> REPLACE"
+
+
+def make_ctx(files=FILES, workspace=None):
+    container = FakeDockerClient().containers.run("python:3.10-slim", detach=True)
+    write_files(container, files)
+    write = lambda container, path, content: write_files(container, {path: content})
+    return ToolContext(container, "python3 /app/main.py", write,
+                       workspace=Workspace(files) if workspace is None else workspace)
+
+
+def test_parse_text_takes_the_first_command_line():
+    call = TOOLS.parse_text("I will fix it.\nWRITE_FILE /app/utils.py\n```python\nx = 1  # RUN_TEST\n```")
+    assert call == ToolCall("write_file", {"path": "/app/utils.py", "content": "x = 1  # RUN_TEST"})
+    assert TOOLS.parse_text("no command here") is None
+
+
+def test_invalid_calls_are_answered_not_run():
+    ctx = make_ctx()
+    assert "Unknown action" in TOOLS.dispatch(ToolCall("rm_rf", {}), ctx).output
+    assert "needs a 'path'" in TOOLS.dispatch(ToolCall("read_file", {}), ctx).output
+    assert ctx.container.exec_count == 0
+
+
+def test_relative_paths_share_one_workspace_entry():
+    ctx = make_ctx()
+    result = TOOLS.dispatch(ToolCall("patch_file", {"path": "utils.py", "patch": PATCH}), ctx)
+    assert result.passed
+    assert set(ctx.workspace.contents) == set(FILES)
+    assert "price * quantity" in ctx.workspace.contents["/app/utils.py"]
+    assert TOOLS.dispatch(ToolCall("read_file", {"path": "./utils.py"}), ctx).content == result.content
+
+
+def test_patch_reads_files_the_workspace_does_not_know():
+    ctx = make_ctx(workspace=Workspace())
+    result = TOOLS.dispatch(ToolCall("patch_file", {"path": "/app/../app/utils.py", "patch": PATCH}), ctx)
+    assert result.exit_code == 0
+    assert "price * quantity" in ctx.workspace.contents["/app/utils.py"]
+
+
+def test_write_runs_the_tests_and_rejects_broken_code_on_the_host():
+    ctx = make_ctx()
+    result = TOOLS.dispatch(ToolCall("write_file", {"path": "utils.py", "content": "def total(price"}), ctx)
+    assert result.output.startswith("Not written: SyntaxError")
+    assert ctx.container.files["/app/utils.py"] == FILES["/app/utils.py"]
+    result = TOOLS.dispatch(ToolCall("run_test", {}), ctx)
+    assert result.exit_code == 1 and "wrong total" in result.output and not result.passed
+
+
+def slow_registry(delay=0.1):
+    registry = ToolRegistry()
+
+    @registry.register("look", {"path": (str, "")}, read_only=True)
+    def look(ctx, path):
+        time.sleep(delay)
+        return ToolResult(f"looked at {path}", 0)
+
+    @registry.register("save", {"path": (str, "")}, barrier=True)
+    def save(ctx, path):
+        return ToolResult(f"saved {path}", 0)
+
+    return registry
+
+
+def test_dispatch_many_runs_read_only_calls_together():
+    registry = slow_registry()
+    calls = [ToolCall("look", {"path": f"/app/{n}.py"}) for n in range(4)]
+    start = time.perf_counter()
+    results = registry.dispatch_many(calls, make_ctx())
+    assert time.perf_counter() - start < 0.3
+    assert [r.output for r in results] == [f"looked at /app/{n}.py" for n in range(4)]
+
+
+def test_dispatch_many_stops_after_a_barrier():
+    registry = slow_registry(delay=0)
+    calls = [ToolCall("look", {"path": "a.py"}), ToolCall("save", {"path": "a.py"}),
+             ToolCall("look", {"path": "b.py"})]
+    results = registry.dispatch_many(calls, make_ctx())
+    assert [r.output for r in results] == ["looked at /app/a.py", "saved /app/a.py"]
+
+
+def test_json_batches_are_capped():
+    decision = {"actions": [{"action": "read_file", "path": f"{n}.py"} for n in range(5)]}
+    assert len(TOOLS.parse_json_batch(decision, 3)) == 3
+    assert TOOLS.parse_json_batch({"action": "run_test"}, 3) == [ToolCall("run_test", {})]
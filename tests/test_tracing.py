@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+
+from fake_collector import FakeCollector
+from tracing import NULL_SPAN, JsonlExporter, OTLPExporter, Tracer, flame_summary
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+        self.flushes = 0
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        pass
+
+
+def test_disabled_tracer_is_a_no_op():
+    tracer = Tracer()
+    assert tracer.start("episode") is NULL_SPAN
+    with tracer.span("think") as span:
+        span.set(x=1)
+    assert tracer.current() is None
+
+
+def test_spans_nest_and_the_root_collects_its_trace():
+    exporter = ListExporter()
+    tracer = Tracer([exporter])
+    root = tracer.start("episode")
+    with tracer.span("think") as think:
+        with tracer.span("parse"):
+            pass
+    with tracer.span("tool.run_test"):
+        pass
+    root.end(solved=True)
+    assert think.parent_id == root.span_id
+    assert {s.trace_id for s in exporter.spans} == {root.trace_id}
+    assert [s.name for s in root.trace_spans] == ["parse", "think", "tool.run_test", "episode"]
+    assert exporter.flushes == 1 and tracer.current() is None
+
+
+def test_errors_are_recorded():
+    tracer = Tracer([ListExporter()])
+    try:
+        with tracer.span("tool.write_file") as span:
+            raise ValueError("disk full")
+    except ValueError:
+        pass
+    assert span.attrs["error"] == "ValueError: disk full"
+
+
+def test_worker_threads_join_the_callers_trace():
+    tracer = Tracer([ListExporter()])
+    root = tracer.start("episode")
+    parent = tracer.current()
+    children = []
+    thread = threading.Thread(target=lambda: children.append(tracer.start("candidate", parent=parent).end()))
+    thread.start()
+    thread.join()
+    root.end()
+    assert children[0].parent_id == root.span_id and children[0] in root.trace_spans
+
+
+def test_flame_summary_counts_self_time():
+    tracer = Tracer([ListExporter()])
+    root = tracer.start("episode")
+    with tracer.span("think"):
+        time.sleep(0.05)
+    root.end()
+    rows = dict((name, seconds) for name, seconds, _ in flame_summary(root))
+    assert rows["think"] >= 0.05 and rows["episode"] < rows["think"]
+
+
+def test_jsonl_and_otlp_exporters(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    with FakeCollector() as collector:
+        tracer = Tracer([JsonlExporter(str(path)), OTLPExporter(collector.url)])
+        with tracer.span("episode", agent="AgentJSON", steps=3, solved=True):
+            pass
+        tracer.close()
+        assert [s["name"] for s in collector.spans] == ["episode"]
+        attrs = {a["key"]: a["value"] for a in collector.spans[0]["attributes"]}
+    assert attrs == {"agent": {"stringValue": "AgentJSON"}, "steps": {"intValue": "3"},
+                     "solved": {"boolValue": True}}
+    assert json.loads(path.read_text())["attrs"] == {"agent": "AgentJSON", "steps": 3, "solved": True}
@@ -0,0 +1,47 @@
+import verify_cache
+from fake_docker import FakeDockerClient
+from sandbox_fs import write_files
+from verify_cache import Workspace
+
+FILES = {"/app/main.py": "print('SUCCESS')\n"}
+
+
+def test_digest_follows_contents_not_order():
+    a = Workspace({"/a.py": "1", "/b.py": "2"})
+    b = Workspace({"/b.py": "2", "/a.py": "1"})
+    assert a.digest() == b.digest()
+    b.update({"/a.py": "changed"})
+    assert a.digest() != b.digest()
+    assert b.contents["/a.py"] == "changed"
+
+
+def test_same_workspace_is_tested_once():
+    container = FakeDockerClient().containers.run("python:3.10-slim", detach=True)
+    write_files(container, FILES)
+    cache = verify_cache.TestCache()
+    first, cached = cache.run(container, "python3 /app/main.py", Workspace(FILES))
+    assert (first.exit_code, cached) == (0, False)
+    again, cached = cache.run(container, "python3 /app/main.py", Workspace(FILES))
+    assert again == first and cached
+    assert container.exec_count == 1
+    assert cache.hit_rate() == 0.5
+
+
+def test_timed_out_runs_are_not_cached():
+    container = FakeDockerClient().containers.run("python:3.10-slim", detach=True)
+    files = {"/app/loop.py": "while True:\n    pass\n"}
+    write_files(container, files)
+    cache = verify_cache.TestCache()
+    for _ in range(2):
+        res, cached = cache.run(container, "python3 /app/loop.py", Workspace(files), timeout=0.2)
+        assert (res.exit_code, cached) == (verify_cache.TIMEOUT_EXIT, False)
+    assert cache.stats == {"hits": 0, "misses": 2}
+
+
+def test_oldest_entries_are_evicted():
+    container = FakeDockerClient().containers.run("python:3.10-slim", detach=True)
+    write_files(container, FILES)
+    cache = verify_cache.TestCache(max_entries=1)
+    cache.run(container, "python3 /app/main.py", Workspace(FILES))
+    cache.run(container, "python3 /app/main.py", Workspace({"/other.py": ""}))
+    assert not cache.run(container, "python3 /app/main.py", Workspace(FILES))[1]
@@ -0,0 +1,305 @@
+import asyncio
+import collections
+import inspect
+import re
+import time
+
+from code_check import CodeRejected, CodeValidator, strip_fences
+from patching import PatchError, apply_patch
+from sandbox_fs import absolute, read_files
+from sandbox_limits import TIMEOUT_EXIT
+from verify_cache import ExecResult, TestCache, Workspace
+from tracing import tracer
+
+# --- TOOL REGISTRY ---
+# One table of tools shared by every agent. A tool is declared once (name,
+# parameter schema, how it appears in plain-text answers) and the registry
+# builds the parsers from those declarations: dispatch is a dict lookup, the
+# text parser is a single precompiled regex, and arguments are validated
+# before a handler ever touches the sandbox.
+
+REQUIRED = object()  # Schema marker for parameters without a default
+WORKDIR = "/app"     # Relative paths in tool calls are taken from here (task_suite's default root)
+
+ToolCall = collections.namedtuple("ToolCall", "name args")
+# output: what the model sees next; content: file text read or written (for the history);
+# cached: the test result came from the TestCache instead of a real run
+ToolResult = collections.namedtuple("ToolResult", "output exit_code passed content cached",
+                                    defaults=(None, False, None, False))
+
+
+class ToolContext:
+    """Everything a handler may touch during one episode."""
+
+    def __init__(self, container, test_cmd, write, tests=None, workspace=None, index=None, prefetch=None,
+                 timeouts=None, task="", validator=None, cwd=WORKDIR):
+        self.container = container
+        self.cwd = cwd
+        self.test_cmd = test_cmd
+        self.task = task                          # Task name: the key for learned test timeouts
+        self.timeouts = timeouts                  # TestTimeouts shared across episodes; None = no limit
+        self.write = write                        # write(container, path, content)
+        self.tests = tests or TestCache()
+        self.workspace = workspace or Workspace()
+        self.index = index                        # RepoIndex, kept current on every write
+        self.prefetch = prefetch                  # Prefetcher serving reads started during think()
+        self.validator = validator or CodeValidator()  # Host-side check of every .py file before it is written
+
+
+class Tool:
+    __slots__ = ("name", "handler", "params", "arg", "body", "read_only", "barrier", "is_async")
+
+    def __init__(self, name, handler, params, arg, body, read_only, barrier):
+        self.name = name
+        self.handler = handler
+        self.params = params        # {param: (type, default or REQUIRED)}
+        self.arg = arg              # Text form: param taken from the word after the command
+        self.body = body            # Text form: param taken from the lines after the command
+        self.read_only = read_only  # Safe to run concurrently with other read-only calls
+        self.barrier = barrier      # Ends a batch: later actions were planned without its result
+        self.is_async = inspect.iscoroutinefunction(handler)
+
+
+class ToolRegistry:
+    def __init__(self):
+        self.tools = {}
+        self._text_pattern = None
+
+    def register(self, name, params=None, arg=None, body=None, read_only=False, barrier=False):
+        """Decorator: @registry.register("read_file", {"path": (str, REQUIRED)}, arg="path")."""
+        def decorator(handler):
+            self.tools[name] = Tool(name, handler, params or {}, arg, body, read_only, barrier)
+            self._text_pattern = None
+            return handler
+        return decorator
+
+    def names(self):
+        return list(self.tools)
+
+    # --- Parsing ---
+    def parse_json(self, decision):
+        """{"action": "read_file", "path": ...} -> ToolCall."""
+        if not isinstance(decision, dict):
+            return ToolCall(None, {})
+        args = {k: v for k, v in decision.items() if k != "action"}
+        return ToolCall(decision.get("action"), args)
+
+    def parse_json_batch(self, decision, limit):
+        """
+        {"actions": [{...}, ...]} -> up to `limit` ToolCalls, in order.
+        A bare single-action object is a batch of one.
+        """
+        if isinstance(decision, dict) and isinstance(decision.get("actions"), list):
+            return [self.parse_json(item) for item in decision["actions"][:limit]]
+        return [self.parse_json(decision)]
+
+    def parse_text(self, text):
+        """
+        Plain-text answers (AgentExplorer): the first line that *starts* with a
+        command wins, so a WRITE_FILE whose code mentions RUN_TEST stays a write.
+        Returns None when no command is found.
+        """
+        if self._text_pattern is None:
+            verbs = "|".join(re.escape(name.upper()) for name in self.tools)
+            self._text_pattern = re.compile(
+                rf"^[ \t>*`]*({verbs})\b[ \t]*([^\s`]*)[^\n]*(?:\n([\s\S]*))?", re.MULTILINE)
+        match = self._text_pattern.search(text)
+        if not match:
+            return None
+        tool = self.tools[match.group(1).lower()]
+        args = {}
+        if tool.arg and match.group(2):
+            args[tool.arg] = match.group(2)
+        if tool.body:
+            args[tool.body] = strip_fences(match.group(3) or "")
+        return ToolCall(tool.name, args)
+
+    def validate(self, call, ctx=None):
+        """
+        Returns (tool, args) or raises ValueError with a message meant for the
+        model. With a ctx, a path argument is made absolute from ctx.cwd, so the
+        workspace, the validator and the prefetch buffer all see one key per file.
+        """
+        tool = self.tools.get(call.name)
+        if tool is None:
+            raise ValueError(f"Unknown action {call.name!r}. Available: {', '.join(self.tools)}")
+        args = {}
+        for param, (kind, default) in tool.params.items():
+            value = call.args.get(param, default)
+            if value is REQUIRED:
+                raise ValueError(f"{call.name} needs a {param!r} argument")
+            if not isinstance(value, kind):
+                raise ValueError(f"{call.name}: {param!r} must be a {kind.__name__}")
+            args[param] = value
+        if ctx is not None and isinstance(args.get("path"), str):
+            args["path"] = absolute(args["path"], ctx.cwd)
+        return tool, args
+
+    # --- Dispatch ---
+    def dispatch(self, call, ctx, parent=None):
+        try:
+            tool, args = self.validate(call, ctx)
+        except ValueError as e:
+            return ToolResult(str(e))
+        if ctx.prefetch is not None and tool.read_only and not tool.barrier:
+            result = ctx.prefetch.take(call.name, args)
+            if result is not None:
+                return result
+        with tracer.span(f"tool.{call.name}", parent=parent, path=args.get("path", "")) as span:
+            if tool.is_async:
+                result = asyncio.run(tool.handler(ctx, **args))
+            else:
+                result = tool.handler(ctx, **args)
+            span.set(exit_code=result.exit_code, output_bytes=len(result.output), cached=result.cached)
+        return result
+
+    async def adispatch(self, call, ctx, parent=None):
+        tool = self.tools.get(call.name)
+        if tool is not None and tool.is_async:
+            try:
+                tool, args = self.validate(call, ctx)
+            except ValueError as e:
+                return ToolResult(str(e))
+            with tracer.span(f"tool.{call.name}", parent=parent, path=args.get("path", "")):
+                return await tool.handler(ctx, **args)
+        # Blocking handlers (docker exec) run on a worker thread
+        return await asyncio.to_thread(self.dispatch, call, ctx, parent)
+
+    def dispatch_many(self, calls, ctx):
+        """
+        Runs calls in order; each run of consecutive read-only calls is
+        executed concurrently. Stops after a barrier (a write or a test run),
+        since the rest of the plan could not take its result into account.
+        Returns one result per call that ran, so len(results) <= len(calls).
+        """
+        results = []
+        i = 0
+        while i < len(calls):
+            j = i
+            while j < len(calls) and self._concurrent(calls[j]):
+                j += 1
+            if j - i > 1:
+                results.extend(asyncio.run(self._gather(calls[i:j], ctx)))
+                i = j
+                continue
+            results.append(self.dispatch(calls[i], ctx))
+            tool = self.tools.get(calls[i].name)
+            i += 1
+            if tool is not None and tool.barrier:
+                break
+        return results
+
+    def _concurrent(self, call):
+        tool = self.tools.get(call.name)
+        return tool is not None and tool.read_only and not tool.barrier
+
+    async def _gather(self, calls, ctx):
+        parent = tracer.current()
+        return await asyncio.gather(*(self.adispatch(call, ctx, parent) for call in calls))
+
+    # --- Observation ---
+    def record(self, history, call, result):
+        """Feed one result into a ContextBuilder the way every agent does."""
+        path = call.args.get("path") or call.args.get("name", "")
+        if call.name == "read_file" and result.content is not None:
+            history.record_read(path, result.content)
+        elif call.name in ("write_file", "patch_file") and result.content is not None:
+            history.record_write(path, result.content)
+        else:
+            history.record(call.name, path if isinstance(path, str) else "", result.output, result.exit_code)
+
+
+# --- Built-in tools ---
+TOOLS = ToolRegistry()
+
+
+def run_tests(ctx):
+    """ctx.test_cmd through the TestCache, under the task's learned timeout. Returns (result, cached)."""
+    if ctx.timeouts is None:
+        return ctx.tests.run(ctx.container, ctx.test_cmd, ctx.workspace)
+    timeout = ctx.timeouts.timeout(ctx.task)
+    start = time.perf_counter()
+    res, cached = ctx.tests.run(ctx.container, ctx.test_cmd, ctx.workspace, timeout)
+    if cached:
+        return res, cached
+    ctx.timeouts.record(ctx.task, time.perf_counter() - start, res.exit_code)
+    if res.exit_code == TIMEOUT_EXIT:
+        note = f"\n[Timed out after {timeout:g}s: the tests normally finish well within that. Infinite loop?]"
+        res = ExecResult(res.exit_code, res.output + note.encode())
+    return res, cached
+
+
+@TOOLS.register("run_test", read_only=True, barrier=True)
+def run_test(ctx):
+    res, cached = run_tests(ctx)
+    output = res.output.decode("utf-8").strip()
+    return ToolResult(output, res.exit_code, res.exit_code == 0 and "SUCCESS" in output, cached=cached)
+
+
+@TOOLS.register("list_files", {"path": (str, ".")}, arg="path", read_only=True)
+def list_files(ctx, path):
+    res = ctx.container.exec_run(f"ls -R {path}")
+    return ToolResult(res.output.decode("utf-8").strip(), res.exit_code)
+
+
+@TOOLS.register("read_file", {"path": (str, REQUIRED)}, arg="path", read_only=True)
+def read_file(ctx, path):
+    res = ctx.container.exec_run(f"cat {path}")
+    output = res.output.decode("utf-8")
+    if getattr(res, "truncated", False):
+        # Only head and tail came back (sandbox_output): not the file, so it is not recorded as one
+        return ToolResult(output, res.exit_code)
+    return ToolResult(output, res.exit_code, content=output)
+
+
+@TOOLS.register("write_file", {"path": (str, REQUIRED), "content": (str, REQUIRED)}, arg="path", body="content",
+                barrier=True)
+def write_file(ctx, path, content):
+    try:
+        content = ctx.validator.clean(content, path, ctx.workspace.contents.get(path))
+    except CodeRejected as e:
+        # Caught on the host: the model hears about it on its next turn, without a write or a test run
+        return ToolResult(f"Not written: {e}. Send the whole corrected file again.", 1)
+    ctx.write(ctx.container, path, content)
+    ctx.workspace.update({path: content})
+    if ctx.prefetch is not None:
+        ctx.prefetch.invalidate()
+    if ctx.index is not None:
+        ctx.index.update(path, content)
+    # Heuristic: Immediately verify after writing
+    with tracer.span("verify") as span:
+        res, cached = run_tests(ctx)
+        span.set(exit_code=res.exit_code, output_bytes=len(res.output), cached=cached)
+    return ToolResult(res.output.decode("utf-8").strip(), res.exit_code, res.exit_code == 0, content, cached)
+
+
+@TOOLS.register("patch_file", {"path": (str, REQUIRED), "patch": (str, REQUIRED)}, arg="path", body="patch",
+                barrier=True)
+def patch_file(ctx, path, patch):
+    """Search/replace blocks or a unified diff, applied on the host; the sandbox gets the result."""
+    original = ctx.workspace.contents.get(path)
+    if original is None:
+        original = read_files(ctx.container, [path]).get(absolute(path))  # Keyed by absolute path
+    if original is None:
+        return ToolResult(f"Patch not applied: {path} does not exist. Use write_file.", 1)
+    try:
+        patched = apply_patch(original, patch, path)
+    except PatchError as e:
+        return ToolResult(f"Patch not applied ({e}). Send the whole file with write_file instead.", 1)
+    return write_file(ctx, path, patched)
+
+
+@TOOLS.register("find_definition", {"name": (str, REQUIRED)}, arg="name", read_only=True)
+def find_definition(ctx, name):
+    found = ctx.index.describe_definition(name) if ctx.index is not None else None
+    if found is None:
+        return ToolResult(f"No definition of {name!r} in the index", 1)
+    return ToolResult(found, 0)
+
+
+@TOOLS.register("find_callers", {"name": (str, REQUIRED)}, arg="name", read_only=True)
+def find_callers(ctx, name):
+    found = ctx.index.describe_callers(name) if ctx.index is not None else None
+    if found is None:
+        return ToolResult(f"No calls to {name!r} in the index", 1)
+    return ToolResult(found, 0)
@@ -0,0 +1,275 @@
+import json
+import os
+import random
+import threading
+import time
+
+# --- CONFIGURATION ---
+TRACE_FILE = os.environ.get("AGENT_TRACE")            # JSONL path; tracing is off when unset
+OTLP_ENDPOINT = os.environ.get("AGENT_TRACE_OTLP")     # e.g. http://localhost:4318/v1/traces
+OTLP_BATCH = 64
+
+
+class Span:
+    """One timed operation. Use as a context manager, or start()/end() by hand."""
+
+    __slots__ = ("tracer", "name", "attrs", "trace_id", "span_id", "parent_id",
+                 "start_ns", "end_ns", "trace_spans")
+
+    def __init__(self, tracer, name, attrs, parent):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.trace_spans = None   # Filled on the root span when the episode ends
+
+    @property
+    def duration(self):
+        return ((self.end_ns or time.perf_counter_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def end(self, **attrs):
+        if self.end_ns is None:
+            self.attrs.update(attrs)
+            self.end_ns = time.perf_counter_ns()
+            self.tracer._finish(self)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.end()
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attrs": self.attrs,
+        }
+
+
+class _NullSpan:
+    """Returned when tracing is off: every call is a no-op."""
+
+    trace_spans = None
+    duration = 0.0
+
+    def set(self, **attrs):
+        return self
+
+    def end(self, **attrs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    def __init__(self, exporters=()):
+        self.exporters = list(exporters)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open_traces = {}
+
+    @property
+    def enabled(self):
+        return bool(self.exporters)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        """The innermost open span on this thread (hand it to worker threads as parent=)."""
+        stack = self._stack() if self.exporters else None
+        return stack[-1] if stack else None
+
+    def start(self, name, parent=None, **attrs):
+        """Open a span as a child of `parent`, or of the current one on this thread."""
+        if not self.exporters:
+            return NULL_SPAN
+        stack = self._stack()
+        span = Span(self, name, attrs, parent or (stack[-1] if stack else None))
+        stack.append(span)
+        if span.parent_id is None:
+            with self._lock:
+                self._open_traces[span.trace_id] = []
+        return span
+
+    span = start  # `with tracer.span("think"):` reads better
+
+    def _finish(self, span):
+        stack = self._stack()
+        if span in stack:
+            del stack[stack.index(span):]
+        with self._lock:
+            spans = self._open_traces.get(span.trace_id)
+            if spans is not None:
+                spans.append(span)
+            if span.parent_id is None:
+                span.trace_spans = self._open_traces.pop(span.trace_id, [])
+        for exporter in self.exporters:
+            exporter.export(span)
+        if span.parent_id is None:
+            for exporter in self.exporters:
+                exporter.flush()
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
+
+
+# --- Exporters ---
+class JsonlExporter:
+    def __init__(self, path):
+        self._fh = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict())
+        with self._lock:
+            self._fh.write(line + "\n")
+
+    def flush(self):
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+class OTLPExporter:
+    """Batches spans and POSTs them as OTLP/HTTP JSON to a collector."""
+
+    def __init__(self, endpoint, service="agi-agent", batch=OTLP_BATCH):
+        import requests
+
+        self.endpoint = endpoint
+        self.service = service
+        self.batch = batch
+        self.session = requests.Session()
+        self._pending = []
+        self._lock = threading.Lock()
+        # perf_counter has no epoch; anchor it once to wall-clock time
+        self._epoch_offset = time.time_ns() - time.perf_counter_ns()
+
+    def export(self, span):
+        with self._lock:
+            self._pending.append(span)
+            full = len(self._pending) >= self.batch
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            spans, self._pending = self._pending, []
+        if not spans:
+            return
+        try:
+            self.session.post(self.endpoint, json=self._payload(spans), timeout=5)
+        except Exception as e:
+            print(f"   [Trace Error]: Could not reach collector: {e}")
+
+    def _payload(self, spans):
+        def attr(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attr("service.name", self.service)]},
+            "scopeSpans": [{
+                "scope": {"name": "tracing"},
+                "spans": [{
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    "parentSpanId": s.parent_id or "",
+                    "name": s.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(s.start_ns + self._epoch_offset),
+                    "endTimeUnixNano": str(s.end_ns + self._epoch_offset),
+                    "attributes": [attr(k, v) for k, v in s.attrs.items()],
+                } for s in spans],
+            }],
+        }]}
+
+    def close(self):
+        self.flush()
+        self.session.close()
+
+
+# --- Flame summary ---
+def flame_summary(root):
+    """
+    Self time per span name for one finished episode, e.g. how much went to
+    think (model latency) versus tool.* (exec_run) versus container.start.
+    Returns [(name, seconds, share_of_episode)], largest first. Spans that ran
+    concurrently (best-of-N candidates) can add up to more than 100%.
+    """
+    spans = root.trace_spans or []
+    child_time = {}
+    for span in spans:
+        if span.parent_id:
+            child_time[span.parent_id] = child_time.get(span.parent_id, 0.0) + span.duration
+    totals = {}
+    for span in spans:
+        self_time = max(0.0, span.duration - child_time.get(span.span_id, 0.0))
+        totals[span.name] = totals.get(span.name, 0.0) + self_time
+    total = root.duration or 1e-9
+    return sorted(((name, t, t / total) for name, t in totals.items()), key=lambda row: -row[1])
+
+
+def print_flame_summary(root, width=30):
+    rows = flame_summary(root)
+    if not rows:
+        return
+    print(f"\n   [Trace]: {root.name} took {root.duration:.2f}s")
+    for name, seconds, share in rows:
+        bar = "█" * max(1, int(share * width)) if share > 0.005 else ""
+        print(f"   {name:<18} {seconds:8.3f}s {share:6.1%} {bar}")
+
+
+def configure(jsonl_path=None, otlp_endpoint=None):
+    """Point the process-wide tracer at new sinks. With no sinks it stays a no-op."""
+    exporters = []
+    if jsonl_path:
+        exporters.append(JsonlExporter(jsonl_path))
+    if otlp_endpoint:
+        exporters.append(OTLPExporter(otlp_endpoint))
+    tracer.close()
+    tracer.exporters = exporters
+    return tracer
+
+
+def get_tracer():
+    return tracer
+
+
+tracer = Tracer()
+if TRACE_FILE or OTLP_ENDPOINT:
+    configure(TRACE_FILE, OTLP_ENDPOINT)
@@ -0,0 +1,95 @@
+import collections
+import hashlib
+import threading
+
+from sandbox_limits import TIMEOUT_EXIT, with_timeout
+
+# --- CONFIGURATION ---
+MAX_ENTRIES = 4096
+
+# Same shape as docker's ExecResult, so callers cannot tell a cached run from a real one
+ExecResult = collections.namedtuple("ExecResult", "exit_code output")
+
+
+class Workspace:
+    """
+    Content hash of the sandbox, maintained from the writes the agent performs
+    (seed files + every write_file), so it never has to be read back from the
+    container. Files changed behind the agent's back (e.g. by the test itself)
+    are not seen, which is fine for read-only test commands.
+
+    The text of every file is kept as well (contents), so patches can be
+    applied on the host without reading the file back first.
+    """
+
+    def __init__(self, files=None):
+        self.contents = {}
+        self._hashes = {}
+        self._digest = None
+        if files:
+            self.update(files)
+
+    def update(self, files):
+        for path, content in files.items():
+            self.contents[path] = content
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            self._hashes[path] = hashlib.sha256(content).hexdigest()
+        self._digest = None
+
+    def digest(self):
+        if self._digest is None:
+            h = hashlib.sha256()
+            for path in sorted(self._hashes):
+                h.update(f"{path}\0{self._hashes[path]}\n".encode("utf-8"))
+            self._digest = h.hexdigest()
+        return self._digest
+
+
+class TestCache:
+    """
+    Memoizes test runs by (workspace digest, command). Pass one instance to
+    several agents, or keep it on an agent across run_simulation() calls, to
+    share results between episodes of the same task: identical seed files give
+    an identical digest, so a known-bad first run_test is answered for free.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(self, container, cmd, workspace, timeout=None):
+        """
+        exec_run(cmd) unless this exact workspace has already been tested.
+        With a timeout the command runs under coreutils timeout; a run that
+        hit it is not cached, since a later, longer limit may let it finish.
+        Returns (result, cached).
+        """
+        key = (workspace.digest(), cmd)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached, True
+            self.stats["misses"] += 1
+
+        res = container.exec_run(with_timeout(cmd, timeout) if timeout else cmd)
+        result = ExecResult(res.exit_code, res.output)
+        if timeout and res.exit_code == TIMEOUT_EXIT:
+            return result, False
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result, False
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()